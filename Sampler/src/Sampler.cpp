@@ -221,6 +221,204 @@ void Sampler::named_free(const vector<string> &tokens) {
     mem.named_free(name);
 }
 
+void Sampler::run_for(const vector<string> &tokens, const vector<Line> &body) {
+    // require 3 arguments: var, start, stop
+    if (tokens.size() < 4) {
+        cerr << "Too few arguments for " << tokens[0] << " (block ignored)" << endl;
+        cerr << "usage (example): " << tokens[0] << " i 0 10" << endl;
+        return;
+    }
+    if (tokens.size() > 5) {
+        cerr << "Ignoring excess arguments for " << tokens[0] << endl;
+        cerr << "usage (example): " << tokens[0] << " i 0 10 1" << endl;
+    }
+
+    // parse arguments
+    const string &var = tokens[1];
+    const long start = atol(tokens[2].c_str());
+    const long stop = atol(tokens[3].c_str());
+    const long step = tokens.size() > 4 ? atol(tokens[4].c_str()) : 1;
+
+    // step must not be 0
+    if (step == 0) {
+        cerr << "Loop step must not be 0 (block ignored)" << endl;
+        return;
+    }
+
+    // remember shadowed variable
+    const map<string, string>::iterator shadowed = variables.find(var);
+    const bool was_set = shadowed != variables.end();
+    const string old_value = was_set ? shadowed->second : "";
+
+    // execute the body for each value
+    for (long i = start; step > 0 ? i < stop : i > stop; i += step) {
+        ostringstream value;
+        value << i;
+        variables[var] = value.str();
+        for (vector<Line>::const_iterator line = body.begin(); line != body.end(); ++line)
+            process_line(*line);
+    }
+
+    // restore variable
+    if (was_set)
+        variables[var] = old_value;
+    else
+        variables.erase(var);
+}
+
+void Sampler::define_block(const vector<string> &tokens, const vector<Line> &body) {
+    // require 1 argument: name
+    if (tokens.size() < 2) {
+        cerr << "Too few arguments for " << tokens[0] << " (block ignored)" << endl;
+        cerr << "usage (example): " << tokens[0] << " block1" << endl;
+        return;
+    }
+    if (tokens.size() > 2) {
+        cerr << "Ignoring excess arguments for " << tokens[0] << endl;
+        cerr << "usage (example): " << tokens[0] << " block1" << endl;
+    }
+
+    // store the block
+    blocks[tokens[1]] = body;
+}
+
+void Sampler::do_block(const vector<string> &tokens) {
+    // require 1 argument: name
+    if (tokens.size() < 2) {
+        cerr << "Too few arguments for " << tokens[0] << " (command ignored)" << endl;
+        cerr << "usage (example): " << tokens[0] << " block1" << endl;
+        return;
+    }
+    if (tokens.size() > 2) {
+        cerr << "Ignoring excess arguments for " << tokens[0] << endl;
+        cerr << "usage (example): " << tokens[0] << " block1" << endl;
+    }
+
+    const string &name = tokens[1];
+
+    // block must exist
+    const map<string, vector<Line> >::const_iterator block = blocks.find(name);
+    if (block == blocks.end()) {
+        cerr << "Unknown block: " << name << " (command ignored)" << endl;
+        return;
+    }
+    // block must not be running
+    if (blocks_active.count(name)) {
+        cerr << "Recursive block: " << name << " (command ignored)" << endl;
+        return;
+    }
+
+    // execute the block (on a copy, in case it redefines itself)
+    const vector<Line> body = block->second;
+    blocks_active.insert(name);
+    for (vector<Line>::const_iterator line = body.begin(); line != body.end(); ++line)
+        process_line(*line);
+    blocks_active.erase(name);
+}
+
+string Sampler::substitute(const string &token) const {
+    string result;
+    size_t pos = 0;
+    while (true) {
+        const size_t dollar = token.find('$', pos);
+        if (dollar == string::npos)
+            break;
+        result.append(token, pos, dollar - pos);
+
+        // variable name: ${name} or $name
+        size_t begin = dollar + 1, end;
+        if (begin < token.size() && token[begin] == '{') {
+            begin++;
+            end = token.find('}', begin);
+            if (end == string::npos) {
+                // unterminated: keep as is
+                result.append(token, dollar, string::npos);
+                return result;
+            }
+            pos = end + 1;
+        } else {
+            end = begin;
+            while (end < token.size() && (isalnum(token[end]) || token[end] == '_'))
+                end++;
+            pos = end;
+        }
+
+        // replace known variables
+        const map<string, string>::const_iterator var = variables.find(token.substr(begin, end - begin));
+        if (var != variables.end())
+            result.append(var->second);
+        else
+            result.append(token, dollar, pos - dollar);
+    }
+    result.append(token, pos, string::npos);
+    return result;
+}
+
+void Sampler::process_line(const Line &line) {
+    const vector<string> &tokens = line.tokens;
+
+    // recording a block
+    if (recording_depth > 0) {
+        if (tokens[0][0] == '{')
+            recording_depth++;
+        else if (tokens[0] == "}")
+            recording_depth--;
+        if (recording_depth > 0) {
+            recording.push_back(line);
+            return;
+        }
+
+        // block complete
+        vector<string> head;
+        vector<Line> body;
+        head.swap(recording_head);
+        body.swap(recording);
+
+        // replace loop variables in the head (e.g., loop bounds)
+        for (vector<string>::iterator token = head.begin(); token != head.end(); ++token)
+            if (token->find('$') != string::npos)
+                *token = substitute(*token);
+
+        if (head[0] == "{for")
+            run_for(head, body);
+        else
+            define_block(head, body);
+        return;
+    }
+
+    // begin recording a block
+    if (tokens[0] == "{for" || tokens[0] == "{def") {
+        recording_head = tokens;
+        recording_depth = 1;
+        return;
+    }
+
+    // replace loop variables
+    if (!variables.empty()) {
+        Line substituted;
+        substituted.hidden = line.hidden;
+        for (vector<string>::const_iterator token = tokens.begin(); token != tokens.end(); ++token)
+            substituted.tokens.push_back(token->find('$') == string::npos ? *token : substitute(*token));
+        execute(substituted);
+        return;
+    }
+
+    execute(line);
+}
+
+void Sampler::execute(const Line &line) {
+    const vector<string> &tokens = line.tokens;
+
+    // check for commands
+    map<string, void (Sampler:: *)(const vector<string> &)>::iterator command = commands.find(tokens[0]);
+    if (command != commands.end())
+        // command detected
+        (this->*(command->second))(tokens);
+    else
+        // interpret call
+        add_call(tokens, line.hidden);
+}
+
 void Sampler::add_call(const vector<string> &tokens, bool hidden=false) {
     const string &routine = tokens[0];
 
@@ -390,7 +588,6 @@ void Sampler::add_signature(const Signature &signature) {
 
 void Sampler::start() {
     // special commands
-    map<string, void (Sampler:: *)(const vector<string> &)> commands;
     commands["set_counters"] = &Sampler::set_counters;
     commands["{omp"] = &Sampler::omp_start;
     commands["{seq"] = &Sampler::seq_start;
@@ -408,6 +605,7 @@ void Sampler::start() {
     commands["coffset"] = &Sampler::named_offset<complex<float> >;
     commands["zoffset"] = &Sampler::named_offset<complex<double> >;
     commands["free"] = &Sampler::named_free;
+    commands["do"] = &Sampler::do_block;
     commands["go"] = &Sampler::go;
     commands["info"] = &Sampler::info;
     commands["print"] = &Sampler::print;
@@ -418,6 +616,9 @@ void Sampler::start() {
     seq_active = false;
 #endif
 
+    // initially: not recording
+    recording_depth = 0;
+
     // read stdin by lines
     string line;
     while (getline(cin, line)) {
@@ -433,27 +634,25 @@ void Sampler::start() {
         const bool hidden = isspace(line[0]);
 
         // remove leading spaces
-        line = line.substr(line.find_first_not_of(" \t\n\v\f\r"));
+        const size_t begin = line.find_first_not_of(" \t\n\v\f\r");
 
         // ignore empty lines
-        if (line.size() == 0)
+        if (begin == string::npos)
             continue;
 
         // tokenize line
-        vector<string> tokens;
-        istringstream iss(line);
-        copy(istream_iterator<string>(iss), istream_iterator<string>(), back_inserter(tokens));
-
-        // check for commands
-        map<string, void (Sampler:: *)(const vector<string> &)>::iterator command = commands.find(tokens[0]);
-        if (command != commands.end())
-            // command detected
-            (this->*(command->second))(tokens);
-        else
-            // interpret call
-            add_call(tokens, hidden);
+        Line tokenized;
+        tokenized.hidden = hidden;
+        istringstream iss(line.substr(begin));
+        copy(istream_iterator<string>(iss), istream_iterator<string>(), back_inserter(tokenized.tokens));
+
+        process_line(tokenized);
     }
 
+    // unterminated block
+    if (recording_depth > 0)
+        cerr << "Unterminated block " << recording_head[0] << " (block ignored)" << endl;
+
     // process remaining calls
     go(vector<string>());
 }
@@ -8,8 +8,21 @@
 
 #include <vector>
 #include <map>
+#include <set>
 #include <string>
 
+/** A tokenized input line.
+ * Lines inside `{for` and `{def` blocks are stored in this form, so that
+ * repeated executions don't need to parse the input again.
+ */
+struct Line {
+    /** The line's tokens. */
+    std::vector<std::string> tokens;
+
+    /** Is the output of a call on this line hidden? */
+    bool hidden;
+};
+
 /** Main class.
  * This class contains the main control flow.  It reads the input stream,
  * executes the encountered commands and creates the list of calls.
@@ -44,6 +57,30 @@ class Sampler {
         bool seq_active;
 #endif
 
+        /** Map of command names to member functions. */
+        std::map<std::string, void (Sampler:: *)(const std::vector<std::string> &)> commands;
+
+        /** Map of block names to their recorded lines (see \ref process_line).
+         */
+        std::map<std::string, std::vector<Line> > blocks;
+
+        /** Names of the blocks currently executed (to prevent recursion). */
+        std::set<std::string> blocks_active;
+
+        /** Current values of the loop variables. */
+        std::map<std::string, std::string> variables;
+
+        /** Opening line of the block currently being recorded. */
+        std::vector<std::string> recording_head;
+
+        /** Lines recorded for the current block. */
+        std::vector<Line> recording;
+
+        /** Nesting depth of the block currently being recorded.
+         * 0 if no block is recorded.
+         */
+        std::size_t recording_depth;
+
 #ifdef PAPI_ENABLED
         /** List of PAPI counter identifiers.
          * The selection of PAPI counters is fixed for each block of sampling
@@ -144,6 +181,63 @@ class Sampler {
          */
         void named_free(const std::vector<std::string> &tokens);
 
+        /** Command `{for` *var start stop* `[` *step* `]`: Begin a loop.
+         * All following lines up to the matching `}` are recorded (see \ref
+         * process_line) and then executed for each value of the loop variable
+         * *var* from *start* (inclusive) to *stop* (exclusive) in steps of
+         * *step* (default: 1).  Within the loop, `$`*var* and `${`*var*`}`
+         * are replaced by the variable's current value.
+         *
+         * \param tokens    command + arguments: `{for` *var start stop* `[` *step* `]`
+         * \param body  The recorded lines.
+         */
+        void run_for(const std::vector<std::string> &tokens, const std::vector<Line> &body);
+
+        /** Command `{def` *name*: Begin a named block.
+         * All following lines up to the matching `}` are recorded (see \ref
+         * process_line) and stored in \ref blocks for later execution with
+         * `do`.
+         *
+         * \param tokens    command + arguments: `{def` *name*
+         * \param body  The recorded lines.
+         */
+        void define_block(const std::vector<std::string> &tokens, const std::vector<Line> &body);
+
+        /** Command `do` *name*: Execute a named block.
+         * Executes the lines of a block previously recorded with `{def`.
+         *
+         * \param tokens    command + arguments: `do` *name*
+         * - *name*: The name of a defined block.
+         */
+        void do_block(const std::vector<std::string> &tokens);
+
+        /** Replace loop variables in a token.
+         * Replaces occurrences of `$`*var* and `${`*var*`}` for all
+         * variables in \ref variables.
+         *
+         * \param token The token.
+         * \return The token with the variables replaced.
+         */
+        std::string substitute(const std::string &token) const;
+
+        /** Process a tokenized line.
+         * Inside a `{for` or `{def` block, the line is only recorded.  When the
+         * block's closing `}` is reached, the block is executed or stored.
+         * Otherwise, loop variables are replaced and the line is treated as a
+         * command or a sampling call.
+         *
+         * \param line  The tokenized line.
+         */
+        void process_line(const Line &line);
+
+        /** Execute a line.
+         * Invokes the command corresponding to the line's first token or
+         * registers the line as a sampling call (\ref add_call).
+         *
+         * \param line  The tokenized line.
+         */
+        void execute(const Line &line);
+
         /** Register a new call.
          * If a \ref signatures contains a Signature for the specified kernel
          * a corresponding CallParser is added to \ref callparsers.
@@ -215,6 +309,9 @@ class Sampler {
          * | `*malloc`      | *name size*            | \ref named_malloc |
          * | `*offset`      | *name offset new_name* | \ref named_offset |
          * | `free`         | *name*                 | \ref named_free   |
+         * | `{for`         | *var start stop* `[` *step* `]` | \ref run_for |
+         * | `{def`         | *name*                 | \ref define_block |
+         * | `do`           | *name*                 | \ref do_block     |
          * | `go`           |                        | \ref go           |
          * | `info`         | *kernel_name*          | \ref info         |
          * | `print`        | *text*                 | \ref print        |
@@ -121,6 +121,7 @@ def main():
         "papi_counters_max": papi_counters_max,
         "papi_enabled": papi_counters_max > 0,
         "omp_enabled": os.environ["OPENMP"] == "1",
+        "loops_enabled": True,
         "cpu_model": os.environ["CPU_MODEL"],
         "frequency": float(os.environ["FREQUENCY_HZ"]),
     }
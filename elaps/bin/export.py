@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+"""Export ELAPS:Reports to CSV, Parquet, or HDF5."""
+
+from __future__ import print_function
+
+import os
+import sys
+import argparse
+import multiprocessing
+
+from .. import defines
+from .. import io as elapsio
+from .. import export
+
+
+def report_files(paths):
+    """Find the Report files in files and directories (recursively).
+
+    Generates the files' paths and their paths relative to the given
+    directory (the basename for given files).
+    """
+    for path in paths:
+        if not os.path.isdir(path):
+            yield path, os.path.basename(path)
+            continue
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames.sort()
+            for filename in sorted(filenames):
+                if filename.endswith("." + defines.report_extension):
+                    filepath = os.path.join(dirpath, filename)
+                    yield filepath, os.path.relpath(filepath, path)
+
+
+def export_file(job):
+    """Export one Report file (in a worker process)."""
+    filename, outfilename, fmt, chunksize = job
+    try:
+        # don't write cache files next to the Reports
+        report = elapsio.load_report(filename, cache=False)
+        name = os.path.splitext(os.path.basename(filename))[0]
+        export.export_report(report, outfilename, fmt, name, chunksize)
+    except Exception as e:
+        return filename, outfilename, "%s: %s" % (type(e).__name__, e)
+    return filename, outfilename, None
+
+
+def main():
+    """Main entry point."""
+    # parse args
+    parser = argparse.ArgumentParser(
+        description="Export ELAPS Reports to CSV, Parquet, or HDF5 (one row "
+        "per range value, repetition, sumrange value, and call).  Each "
+        "conversion holds its Report's measurements in memory (about 8 bytes "
+        "per measured counter) and one chunk of rows."
+    )
+    parser.add_argument(
+        "report", nargs="+",
+        help="ELAPS Report (.%s) or directory of Reports" %
+        defines.report_extension
+    )
+    parser.add_argument("-f", "--format", default="csv",
+                        choices=sorted(export.writers),
+                        help="output format (default: csv)")
+    parser.add_argument("-o", "--outdir",
+                        help="output directory, keeping the structure of "
+                        "given directories (default: next to the Reports)")
+    parser.add_argument("-j", "--jobs", type=int,
+                        default=multiprocessing.cpu_count(),
+                        help="number of parallel conversions (default: #CPUs)")
+    parser.add_argument("--chunksize", type=int, default=1 << 16,
+                        help="rows per written chunk (default: %(default)s)")
+    args = parser.parse_args()
+
+    # conversion jobs
+    extension = defines.export_extensions[args.format]
+    jobs = []
+    outfilenames = {}
+    for filename, relname in report_files(args.report):
+        if not filename.endswith("." + defines.report_extension):
+            parser.error("%r is not a Report (.%s)" %
+                         (filename, defines.report_extension))
+        if args.outdir:
+            # keep the directory structure below the given directories
+            filebase = os.path.join(args.outdir, relname)
+        else:
+            filebase = filename
+        outfilename = "%s.%s" % (os.path.splitext(filebase)[0], extension)
+        outfilename = os.path.normpath(outfilename)
+        if outfilename in outfilenames:
+            parser.error("%r and %r are both exported to %r" %
+                         (outfilenames[outfilename], filename, outfilename))
+        outfilenames[outfilename] = filename
+        jobs.append((filename, outfilename, args.format, args.chunksize))
+
+    # output directories
+    for outdir in set(os.path.dirname(outfilename)
+                      for outfilename in outfilenames):
+        if outdir and not os.path.isdir(outdir):
+            os.makedirs(outdir)
+
+    # convert in parallel
+    pool = multiprocessing.Pool(max(1, min(args.jobs, len(jobs))))
+    failed = False
+    for filename, outfilename, error in pool.imap_unordered(export_file,
+                                                            jobs):
+        if error:
+            print("ERROR: Can't export %r (%s)" % (filename, error),
+                  file=sys.stderr)
+            failed = True
+        else:
+            print("%s -> %s" % (filename, outfilename))
+    pool.close()
+    pool.join()
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -21,15 +21,17 @@ def main():
     args = parser.parse_args()
 
     for filename in args.report:
-        # load experiment
+        # load experiment and count results
+        tracker = elapsio.ReportProgress(filename)
         try:
-            fin = open(filename)
-            ex = elapsio.load_experiment_string(fin.readline())
+            progress = tracker.update()
         except:
+            progress = None
+        if progress is None:
             print("ERROR: Can't load %r" % filename, file=sys.stderr)
             continue
-        nresults = ex.nresults()
-        progress = min(nresults, len(fin.readlines()) - 1)
+        nresults = tracker.nresults
+        progress = min(nresults, progress)
 
         # print progress
         print("%s:\t%d/%d\t(%d %%)" % (filename, progress, nresults,
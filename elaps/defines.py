@@ -25,6 +25,12 @@ experiment_extensions = ("ele", "els", "ees") + report_extensions
 script_extension = "sh"
 calls_extension = "calls"
 error_extension = "err"
+report_cache_extension = "npz"
+report_cache_version = 1
+export_extensions = {"csv": "csv", "parquet": "parquet", "hdf5": "h5"}
+
+# write buffer for Sampler command (.calls) files
+calls_buffersize = 1 << 20
 
 # colors
 colors = [
@@ -48,8 +54,21 @@ plot_styles = {
     "avg": {"zorder": 3, "linestyle": "-."},
     "min-max": {"zorder": 3, "hatch": "...", "facecolor": (0, 0, 0, 0)},
     "std": {"zorder": 3, "alpha": .25},
+    "p5": {"zorder": 3, "linestyle": ":"},
+    "p25": {"zorder": 3, "linestyle": "--", "linewidth": .5},
+    "p75": {"zorder": 3, "linestyle": "--", "linewidth": .5},
+    "p95": {"zorder": 3, "linestyle": ":"},
+    "p99": {"zorder": 3, "linestyle": ":", "linewidth": .5},
+    "tmean": {"zorder": 3, "linestyle": "-", "linewidth": 2},
+    "p5-p95": {"zorder": 3, "alpha": .15},
+    "p25-p75": {"zorder": 3, "alpha": .3},
+    "mad": {"zorder": 3, "alpha": .2},
+    "ci": {"zorder": 3, "alpha": .4},
 }
 
+# statistics plotted as bands between two statistics
+stat_bands = [("min", "max"), ("p5", "p95"), ("p25", "p75")]
+
 # PlayMat
 viz_scale = 100
 default_dim = 1000
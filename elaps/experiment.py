@@ -5,14 +5,33 @@ from __future__ import print_function
 import os
 import warnings
 from collections import defaultdict
+from contextlib import contextmanager
 from itertools import chain
 from copy import deepcopy
 from numbers import Number
 
+import numpy as np
+
 from elaps import defines
 from elaps import symbolic
 from elaps import signature
 
+# datatype prefixes for malloc, offset, and gerand commands
+cmdprefixes = {
+    signature.Data: "",
+    signature.iData: "i",
+    signature.sData: "s",
+    signature.dData: "d",
+    signature.cData: "c",
+    signature.zData: "z",
+    signature.Work: "",
+    signature.iWork: "i",
+    signature.sWork: "s",
+    signature.dWork: "d",
+    signature.cWork: "c",
+    signature.zWork: "z",
+}
+
 
 class Experiment(object):
 
@@ -20,6 +39,10 @@ class Experiment(object):
 
     def __init__(self, other=None, **kwargs):
         """Initialize experiment from (optional) other experiment."""
+        # cache for derived state (see get_operand(), operands, ...)
+        self._cache = {}
+        self._cache_pins = 0
+
         # empty experiment
         self.note = ""
         self.sampler = None
@@ -37,8 +60,8 @@ class Experiment(object):
         self.vary = {}
 
         # initialize from argument
-        otherdict = other.__dict__ if isinstance(other, Experiment) else {}
-        for key, value in chain(otherdict, kwargs.items()):
+        otherdict = other.attributes() if isinstance(other, Experiment) else {}
+        for key, value in chain(otherdict.items(), kwargs.items()):
             if hasattr(self, key):
                 setattr(self, key, value)
             else:
@@ -54,7 +77,7 @@ class Experiment(object):
         empty = Experiment()
 
         # Only print non-default attribute values
-        changed = dict((key, value) for key, value in self.__dict__.items()
+        changed = dict((key, value) for key, value in self.attributes().items()
                        if value != getattr(empty, key))
 
         # remove kernels and backend
@@ -136,11 +159,53 @@ class Experiment(object):
         """Compare with other Experiment for equality."""
         if not isinstance(other, type(self)):
             return False
-        return self.__dict__ == other.__dict__
+        return self.attributes() == other.attributes()
+
+    def __getstate__(self):
+        """Pickle the attributes (without caches and the backend)."""
+        state = self.attributes()
+        if state["sampler"] and "backend" in state["sampler"]:
+            state["sampler"] = state["sampler"].copy()
+            del state["sampler"]["backend"]
+        return state
+
+    def __setstate__(self, state):
+        """Initialize from pickled attributes."""
+        self.__init__(**state)
 
     def copy(self):
         """Create a deep copy of the experiment."""
-        return Experiment(**deepcopy(self.__dict__))
+        return Experiment(**deepcopy(self.attributes()))
+
+    def attributes(self):
+        """Get the attributes (without the internal caches)."""
+        return dict((key, value) for key, value in self.__dict__.items()
+                    if not key.startswith("_"))
+
+    # derived state cache
+    def cache_clear(self):
+        """Clear the derived state (operands, connections, ...)."""
+        self._cache.clear()
+
+    def cache_validate(self):
+        """Clear the derived state if the calls were changed directly."""
+        if self._cache_pins:
+            return
+        fingerprint = [(id(getattr(call, "sig", None)), list(call))
+                       for call in self.calls]
+        if self._cache.get(None) != fingerprint:
+            self._cache.clear()
+            self._cache[None] = fingerprint
+
+    @contextmanager
+    def cache_pinned(self):
+        """Context in which the calls don't change (no cache validation)."""
+        self.cache_validate()
+        self._cache_pins += 1
+        try:
+            yield
+        finally:
+            self._cache_pins -= 1
 
     # properties
     @property
@@ -159,13 +224,16 @@ class Experiment(object):
     @property
     def operands(self):
         """List of all operands."""
-        return tuple(set([
-            call[argid]
-            for call in self.calls
-            if isinstance(call, signature.Call)
-            for argid in call.sig.dataargs()
-            if isinstance(call[argid], str)
-        ]))
+        self.cache_validate()
+        if "operands" not in self._cache:
+            self._cache["operands"] = tuple(set([
+                call[argid]
+                for call in self.calls
+                if isinstance(call, signature.Call)
+                for argid in call.sig.dataargs()
+                if isinstance(call[argid], str)
+            ]))
+        return self._cache["operands"]
 
     @property
     def range_var(self):
@@ -699,6 +767,9 @@ class Experiment(object):
         if argid == 0:
             raise IndexError("Cannot set routine name (argument 0)")
 
+        if not check_only:
+            self.cache_clear()
+
         arg = call.sig[argid]
 
         if isinstance(arg, signature.Arg):
@@ -898,6 +969,7 @@ class Experiment(object):
             return
 
         # set new call
+        self.cache_clear()
         if callid == len(self.calls):
             self.calls.append(None)
         self.calls[callid] = call
@@ -919,6 +991,7 @@ class Experiment(object):
         if check_only:
             return
 
+        self.cache_clear()
         self.calls.pop(callid)
 
     def set_calls(self, calls, force=False, check_only=False):
@@ -943,6 +1016,7 @@ class Experiment(object):
             return
 
         # set new calls
+        self.cache_clear()
         self.calls = []
         for call in calls:
             self.set_call(-1, call, force=force)
@@ -1108,6 +1182,10 @@ class Experiment(object):
     # inference
     def get_operand(self, name):
         """Get an operand information dict."""
+        self.cache_validate()
+        if ("operand", name) in self._cache:
+            return self._cache["operand", name].copy()
+
         # get any call that contains name
         try:
             call, name_argid = next(
@@ -1167,12 +1245,19 @@ class Experiment(object):
         lds = [symbolic.simplify(ld, **argdict) for ld in lds]
         operand["lds"] = tuple(lds)
 
-        return operand
+        self._cache["operand", name] = operand
+        return operand.copy()
 
     def update_vary(self, name=None):
         """Update the vary attributes."""
         if name is None:
             operands = self.operands
+            if len(self.vary) == len(operands) and all(
+                    name in self.vary and
+                    set(self.vary[name]) == set(("with", "along", "offset"))
+                    for name in operands):
+                # nothing to update
+                return
             for name in list(self.vary):
                 if name not in operands:
                     del self.vary[name]
@@ -1261,6 +1346,7 @@ class Experiment(object):
                 ld *= self.nreps
 
         call[ldargid] = symbolic.simplify(ld)
+        self.cache_clear()
 
     def infer_lds(self, callid=None):
         """Infer all leading dimensions."""
@@ -1305,6 +1391,7 @@ class Experiment(object):
         # infer argument
         call[argid] = None
         call.complete()
+        self.cache_clear()
 
     def infer_lworks(self, callid=None):
         """Infer all leading dimensions."""
@@ -1333,6 +1420,7 @@ class Experiment(object):
         for argid in argids:
             for con_callid, con_argid in connections[callid, argid]:
                 self.calls[con_callid][con_argid] = call[argid]
+        self.cache_clear()
 
     def apply_connections_to(self, callid, argid=None, connections=None):
         """Apply operand-connections from this call."""
@@ -1345,6 +1433,7 @@ class Experiment(object):
         for argid in argids:
             for con_callid, con_argid in connections[callid, argid]:
                 call[argid] = self.calls[con_callid][con_argid]
+        self.cache_clear()
 
     def check_sanity(self, raise_=False):
         """Check if the experiment is self-consistent."""
@@ -1394,47 +1483,102 @@ class Experiment(object):
 
     def generate_cmds_counters(self):
         """Generate Sampler commands to set the counters."""
-        cmds = []
         if len(self.papi_counters):
-            cmds += [
-                ["########################################"],
-                ["# counters                             #"],
-                ["########################################"],
-                [],
-                ["set_counters"] + self.papi_counters,
-                [], []
-            ]
-        return cmds
+            yield ["########################################"]
+            yield ["# counters                             #"]
+            yield ["########################################"]
+            yield []
+            yield ["set_counters"] + list(self.papi_counters)
+            yield []
+            yield []
+
+    def generate_operand_offsets(self, name, table):
+        """Generate an operand's offset commands and required sizes.
+
+        Yields (cmd, range_val, size) with the operand size required up to
+        this point, where cmd is None for entries that only update the size.
+        """
+        operand = self.get_operand(name)
+        vary = self.vary[name]
+        cmdprefix = cmdprefixes[operand["type"]]
+
+        # size and offset increments on the grid
+        sizes = table.array(operand["size"])
+        steps = table.array(1)
+        for idx in range(vary["along"]):
+            # multiply leading dimensions for skipped dims
+            steps = steps * table.array(operand["lds"][idx])
+        if vary["along"] < len(operand["dims"]):
+            # dimension for traversed dim
+            steps = steps * table.array(operand["dims"][vary["along"]])
+        # add custom offset
+        steps = (steps + table.array(vary["offset"])).tolist()
+        sizes = sizes.tolist()
+
+        size_max = 0
+        # go over range
+        for rangeidx, range_val in enumerate(table.range_vals):
+            if range_val is not None:
+                # comment
+                yield ["#", self.range_var, "=", range_val], range_val, size_max
+
+            offset = 0
+
+            rep_vals = None,
+            if "rep" in vary["with"]:
+                rep_vals = range(self.nreps_at(range_val))
 
-    def generate_cmds_operands(self, range_vals):
-        """Generate Sampler commands to allocate operands."""
-        cmds = []
+            # go over repetitions
+            for rep in rep_vals:
+                # offset for repetitions
+                if "rep" not in vary["with"]:
+                    offset = 0
+
+                if not self.sumrange or self.sumrange_var not in vary["with"]:
+                    # operand doesn't vary in sumrange (1 offset)
+                    yield [
+                        cmdprefix + "offset", name, offset,
+                        self.sampler_varname(name, range_val, rep, None)
+                    ], range_val, size_max
+                else:
+                    # comment (multiple offsets)
+                    yield ["#", "repetition", rep], range_val, size_max
+
+                # offset for rep
+                offset_rep = offset
+                # go over sumrange
+                for point in table.points(rangeidx):
+                    sumrange_val = table.point_sumrange_vals[point]
+                    cmd = None
+                    if self.sumrange and self.sumrange_var in vary["with"]:
+                        # operand varies in sumrange (offset)
+                        cmd = [
+                            cmdprefix + "offset", name, offset,
+                            self.sampler_varname(name, range_val, rep,
+                                                 sumrange_val)
+                        ]
+                    else:
+                        # offset is the same every iteration
+                        offset = offset_rep
+                    # current needed size
+                    size_max = max(size_max, offset + sizes[point])
+                    yield cmd, range_val, size_max
+                    # next offset
+                    offset += steps[point]
+
+    def generate_cmds_operands(self, table, operand_range_sizes=None):
+        """Generate Sampler commands to allocate operands.
+
+        If given, operand_range_sizes is filled with the operand sizes needed
+        up to each range value (for data randomization).
+        """
+        if operand_range_sizes is None:
+            operand_range_sizes = {}
 
         if len(self.operands):
-            cmds += [
-                ["########################################"],
-                ["# operands                             #"],
-                ["########################################"]
-            ]
-
-        # datatype prefixes for malloc and offset commands
-        cmdprefixes = {
-            signature.Data: "",
-            signature.iData: "i",
-            signature.sData: "s",
-            signature.dData: "d",
-            signature.cData: "c",
-            signature.zData: "z",
-            signature.Work: "",
-            signature.iWork: "i",
-            signature.sWork: "s",
-            signature.dWork: "d",
-            signature.cWork: "c",
-            signature.zWork: "z",
-        }
-
-        # collect data sizes for randomization
-        operand_range_sizes = {}
+            yield ["########################################"]
+            yield ["# operands                             #"]
+            yield ["########################################"]
 
         # go over all operands
         for name in sorted(self.operands):
@@ -1443,122 +1587,66 @@ class Experiment(object):
             cmdprefix = cmdprefixes[operand["type"]]
 
             # comment
-            cmds += [[], ["#", name]]
+            yield []
+            yield ["#", name]
 
             # init operand size collection
             operand_range_sizes[name] = {}
 
             if not vary["with"]:
                 # argument doesn't vary
-                size = max(self.ranges_eval(operand["size"], None))
-                cmds.append([cmdprefix + "malloc", name, size])
+                size = self.operand_size_max(operand["size"], table)
+                yield [cmdprefix + "malloc", name, size]
                 operand_range_sizes[name][None] = size
                 continue
             # operand varies
 
-            # init result variables
-            offsetcmds = []
+            # first pass: needed size (without storing the offsets)
             size_max = 0
-            # go over range
-            for range_val in range_vals:
-                if range_val is not None:
-                    # comment
-                    offsetcmds.append(["#", self.range_var, "=", range_val])
-
-                # prepare sumrange
-                sumrange_vals = self.sumrange_vals_at(range_val)
-
-                offset = 0
-
-                rep_vals = None,
-                if "rep" in vary["with"]:
-                    rep_vals = range(self.nreps_at(range_val))
-
-                # go over repetitions
-                for rep in rep_vals:
-                    # offset for repetitions
-                    if "rep" not in vary["with"]:
-                        offset = 0
-
-                    if (not self.sumrange or
-                            self.sumrange_var not in vary["with"]):
-                        # operand doesn't vary in sumrange (1 offset)
-                        offsetcmds.append([
-                            cmdprefix + "offset", name, offset,
-                            self.sampler_varname(name, range_val, rep, None)
-                        ])
-                    else:
-                        # comment (multiple offsets)
-                        offsetcmds.append(["#", "repetition", rep])
-
-                    # offset for rep
-                    offset_rep = offset
-                    # go over sumrange
-                    for sumrange_val in sumrange_vals:
-                        if self.sumrange and self.sumrange_var in vary["with"]:
-                            # operand varies in sumrange (offset)
-                            offsetcmds.append([
-                                cmdprefix + "offset", name, offset,
-                                self.sampler_varname(name, range_val, rep,
-                                                     sumrange_val)
-                            ])
-                        else:
-                            # offset is the same every iteration
-                            offset = offset_rep
-                        # compute current needed size
-                        size = next(self.ranges_eval(
-                            operand["size"], range_val, sumrange_val
-                        ))
-                        size_max = max(size_max, offset + size)
-                        # compute next offset
-                        dim = 1
-                        for idx in range(vary["along"]):
-                            # multiply leading dimensions for skipped dims
-                            dim *= next(self.ranges_eval(
-                                operand["lds"][idx], range_val, sumrange_val
-                            ))
-                        # dimension for traversed dim
-                        if vary["along"] < len(operand["dims"]):
-                            dim *= next(self.ranges_eval(
-                                operand["dims"][vary["along"]], range_val,
-                                sumrange_val
-                            ))
-                        # add custom offset
-                        offset += dim + next(self.ranges_eval(
-                            vary["offset"], range_val, sumrange_val
-                        ))
-
-                # operand size collection
+            for _, range_val, size_max in self.generate_operand_offsets(
+                    name, table):
                 operand_range_sizes[name][range_val] = size_max
 
             # malloc with needed size before offsetting
-            cmds.append([cmdprefix + "malloc", name,  size_max])
-            cmds += offsetcmds
+            yield [cmdprefix + "malloc", name, size_max]
+
+            # second pass: offsets
+            for cmd, _, _ in self.generate_operand_offsets(name, table):
+                if cmd is not None:
+                    yield cmd
 
         if len(self.operands):
-            cmds += [[], []]
+            yield []
+            yield []
 
-        return cmds
+    def generate_cmds_randomize(self, range_val, operand_range_sizes):
+        """Generate Sampler commands to randomize the operands."""
+        for name in sorted(self.operands):
+            cmdprefix = cmdprefixes[self.get_operand(name)["type"]]
+            sizes = operand_range_sizes[name]
+            size = sizes.get(range_val, sizes.get(None))
+            yield [" %sgerand" % cmdprefix, size, 1, name, size]
 
-    def generate_cmds_sumrange(self, range_val, rep, sumrange_vals):
+    def generate_cmds_sumrange(self, table, rangeidx, rep):
         """Generate Sampler commands for one one range and rep."""
-        cmds = []
+        range_val = table.range_vals[rangeidx]
 
         # open parallel constructs
         if self.sumrange and self.sumrange_parallel:
             # begin omp range (parallel region)
-            cmds.append(["{omp"])
+            yield ["{omp"]
 
         # go over sumrange
-        for sumrange_val in sumrange_vals:
+        for point in table.points(rangeidx):
+            sumrange_val = table.point_sumrange_vals[point]
 
             # open parallel constructs
             if self.calls_parallel and not self.sumrange_parallel:
                 # begin parallel calls
-                cmds.append(["{omp"])
+                yield ["{omp"]
             elif self.sumrange_parallel and not self.calls_parallel:
                 # begin sequential calls (in parallel region)
-                cmds.append(["{seq"])
+                yield ["{seq"]
 
             # go over calls
             for call in self.calls:
@@ -1566,10 +1654,8 @@ class Experiment(object):
                     # call with signature
 
                     # evaluate symbolic arguments
-                    call = call.sig(*[
-                        next(self.ranges_eval(val, range_val, sumrange_val))
-                        for val in call[1:]
-                    ])
+                    call = call.sig(*[table.value(val, point)
+                                      for val in call[1:]])
                     # format for the sampler
                     cmd = call.format_sampler()
                     # place operand variables
@@ -1588,123 +1674,138 @@ class Experiment(object):
                             # chars don't need further processing
                             continue
                         if type(value) is list:
-                            value = [next(self.ranges_eval(
-                                value[0], range_val, sumrange_val
-                            ))]
+                            value = [table.value(value[0], point)]
                             # TODO: parse list argument
                         else:
                             # parse scalar arguments
-                            value = next(self.ranges_eval(
-                                value, range_val, sumrange_val
-                            ))
+                            value = table.value(value, point)
                         cmd[argid] = value
 
                 # add created call
-                cmds.append(cmd)
+                yield cmd
 
             # close parallel constructs
             if self.calls_parallel and not self.sumrange_parallel:
                 # end parallel calls (parallel region)
-                cmds.append(["}"])
+                yield ["}"]
             elif self.sumrange_parallel and not self.calls_parallel:
                 # end sequential calls (in parallel region)
-                cmds.append(["}"])
+                yield ["}"]
 
         # close parallel constructs
         if self.sumrange and self.sumrange_parallel:
             # end omp range (parallel region)
-            cmds.append(["}"])
+            yield ["}"]
 
-        return cmds
+    def generate_cmds_calls(self, table, operand_range_sizes=None,
+                            compact=False):
+        """Generate Sampler commands for kernel invocations.
 
-    def generate_cmds_calls(self, range_vals):
-        """Generate Sampler commands for kernel invocations."""
-        cmds = [
-            ["########################################"],
-            ["# calls                                #"],
-            ["########################################"]
-        ]
+        operand_range_sizes (from generate_cmds_operands()) is required for
+        range_randomize_data.  If compact, repetitions are generated as
+        Sampler loops ({for rep ...}) instead of being unrolled; range values
+        and sumrange iterations are always unrolled.
+        """
+        yield ["########################################"]
+        yield ["# calls                                #"]
+        yield ["########################################"]
 
         if self.shuffle:
             nreps = self.nreps_at(None)
             # go over repetitions
-            for rep in range(nreps):
-                if self.range and nreps > 1:
-                    cmds += [[], ["#", "repetition",  rep]]
+            rep_vals = range(nreps)
+            if compact and nreps > 1:
+                # loop over repetitions in the Sampler
+                rep_vals = "${rep}",
+                yield ["{for", "rep", 0, nreps]
+            for rep in rep_vals:
+                if self.range and nreps > 1 and not compact:
+                    yield []
+                    yield ["#", "repetition", rep]
 
                 # go over range
-                for range_val in range_vals:
-                    if self.range and len(range_vals) > 1:
+                for rangeidx, range_val in enumerate(table.range_vals):
+                    if self.range and len(table.range_vals) > 1:
                         # comment
-                        cmds += [[], ["#", str(self.range_var), "=",
-                                      range_val]]
+                        yield []
+                        yield ["#", str(self.range_var), "=", range_val]
 
                     # randomize operand
                     if self.range_randomize_data:
-                        for name in sorted(self.operands):
-                            cmdprefix = cmdprefixes[
-                                self.get_operand(name)["type"]
-                            ]
-                            size = operand_range_sizes[name][range_val]
-                            cmds.append([" %sgerand" % cmdprefix, size, 1,
-                                         name, size])
-
-                    # set up sumrange values
-                    sumrange_vals = self.sumrange_vals_at(range_val)
+                        for cmd in self.generate_cmds_randomize(
+                                range_val, operand_range_sizes):
+                            yield cmd
 
-                    cmds += self.generate_cmds_sumrange(range_val, rep,
-                                                        sumrange_vals)
+                    for cmd in self.generate_cmds_sumrange(table, rangeidx,
+                                                           rep):
+                        yield cmd
 
                 # execute repetition
-                cmds.append(["go"])
+                yield ["go"]
+            if compact and nreps > 1:
+                yield ["}"]
         else:
             # go over range
-            for range_val in range_vals:
-                if self.range and len(range_vals) > 1:
+            for rangeidx, range_val in enumerate(table.range_vals):
+                if self.range and len(table.range_vals) > 1:
                     # comment
-                    cmds += [[], ["#", str(self.range_var), "=", range_val]]
+                    yield []
+                    yield ["#", str(self.range_var), "=", range_val]
 
                 # randomize operand
                 if self.range_randomize_data:
-                    for name in sorted(self.operands):
-                        cmdprefix = cmdprefixes[self.get_operand(name)["type"]]
-                        size = operand_range_sizes[name][range_val]
-                        cmds.append([" %sgerand" % cmdprefix, size, 1, name,
-                                     size])
-
-                # set up sumrange values
-                sumrange_vals = self.sumrange_vals_at(range_val)
+                    for cmd in self.generate_cmds_randomize(
+                            range_val, operand_range_sizes):
+                        yield cmd
 
                 # go over repetitions
                 nreps = self.nreps_at(range_val)
+                if compact and nreps > 1:
+                    # loop over repetitions in the Sampler
+                    yield ["{for", "rep", 0, nreps]
+                    for cmd in self.generate_cmds_sumrange(table, rangeidx,
+                                                           "${rep}"):
+                        yield cmd
+                    yield ["}"]
+                    nreps = 0
                 for rep in range(nreps):
                     if self.sumrange and nreps > 1:
                         # comment
-                        cmds += [[], ["#", "repetition",  rep]]
+                        yield []
+                        yield ["#", "repetition", rep]
 
-                    cmds += self.generate_cmds_sumrange(range_val, rep,
-                                                        sumrange_vals)
+                    for cmd in self.generate_cmds_sumrange(table, rangeidx,
+                                                           rep):
+                        yield cmd
 
                 # execute range iteration
-                cmds.append(["go"])
+                yield ["go"]
 
-        return cmds
+    def generate_cmds(self, range_val=None, compact=False):
+        """Generate commands for the Sampler (one at a time).
 
-    def generate_cmds(self, range_val=None):
-        """Generate commands for the Sampler."""
+        If compact, the commands use the Sampler's loop blocks where possible
+        (requires a Sampler with loops_enabled).
+        """
         self.update_vary()
 
-        cmds = []
-
         range_vals = range_val,
         if range_val is None:
             range_vals = tuple(self.range_vals)
 
-        cmds += self.generate_cmds_counters()
-        cmds += self.generate_cmds_operands(range_vals)
-        cmds += self.generate_cmds_calls(range_vals)
+        # operand sizes (collected during allocation) for randomization
+        operand_range_sizes = {}
+
+        with self.cache_pinned():
+            # all expressions are evaluated on this grid
+            table = RangesTable(self, range_vals)
 
-        return cmds
+            for cmd in chain(
+                self.generate_cmds_counters(),
+                self.generate_cmds_operands(table, operand_range_sizes),
+                self.generate_cmds_calls(table, operand_range_sizes, compact)
+            ):
+                yield cmd
 
     def submit_prepare(self, filebase):
         """Create all files needed to run the experiment."""
@@ -1754,6 +1855,9 @@ class Experiment(object):
         # timing
         script += "date +%%s >> \"%s\"\n" % reportfile
 
+        # use Sampler loops if available
+        compact = self.sampler.get("loops_enabled", False)
+
         # check for varying #threads
         range_vals = None,
         if isinstance(self.nthreads, symbolic.Expression):
@@ -1767,10 +1871,11 @@ class Experiment(object):
                 callfile = "%s.%d.%s" % (filebase, range_val,
                                          defines.calls_extension)
 
-            # commands file
-            with open(callfile, "w") as fout:
-                for cmd in self.generate_cmds(range_val):
-                    print(*cmd, file=fout)
+            # commands file (written as they are generated)
+            with open(callfile, "w", defines.calls_buffersize) as fout:
+                fout.writelines(" ".join(map(str, cmd)) + "\n"
+                                for cmd in self.generate_cmds(range_val,
+                                                              compact))
 
             # kernel thread count
             nthreads = self.nthreads_at(range_val)
@@ -1896,6 +2001,21 @@ class Experiment(object):
                         symbolic.__dict__)
         return expr
 
+    def operand_size_max(self, expr, table):
+        """Get the exact maximum of an operand size for the ranges.
+
+        Uses the interval bounds only if they are tight (constant size) and
+        the grid table if it covers all range values.
+        """
+        bounds = self.ranges_bounds(expr)
+        if bounds is not None and bounds[0] == bounds[1]:
+            return bounds[1]
+        if tuple(table.range_vals) == tuple(self.range_vals) and len(table):
+            sizes = table.array(expr)
+            if sizes.dtype != object:
+                return sizes.max().item()
+        return max(self.ranges_eval(expr, None))
+
     def ranges_eval(self, expr, range_val=None, sumrange_val=None):
         """Evaluate an symbolic expression for the ranges."""
         range_val_fixed = range_val
@@ -1920,14 +2040,88 @@ class Experiment(object):
                     expr, **self.ranges_valdict(range_val, sumrange_val)
                 )
 
+    def ranges_intervals(self, dorange=True, dosumrange=True):
+        """Create a dictionary of (min, max) for the range variables.
+
+        Returns None if the bounds are not numeric.
+        """
+        intervals = {}
+        if self.range and dorange:
+            try:
+                interval = (symbolic.min(self.range_vals),
+                            symbolic.max(self.range_vals))
+            except (TypeError, ValueError):
+                return None
+            if not all(isinstance(val, Number) for val in interval):
+                return None
+            intervals[str(self.range_var)] = interval
+        if self.sumrange and dosumrange:
+            sumrange_vals = self.sumrange_vals
+            if isinstance(sumrange_vals, symbolic.Range):
+                # values lie between the subranges' starts and stops
+                sumrange_vals = [val for start, _, stop
+                                 in sumrange_vals.subranges
+                                 for val in (start, stop)]
+            bounds = [symbolic.interval(val, intervals)
+                      for val in sumrange_vals]
+            if not bounds or None in bounds:
+                return None
+            intervals[str(self.sumrange_var)] = (min(lo for lo, _ in bounds),
+                                                 max(hi for _, hi in bounds))
+        return intervals
+
+    def ranges_bounds(self, expr, dorange=True, dosumrange=True):
+        """Get guaranteed (min, max) bounds for an expression for the ranges.
+
+        Returns None if no numeric bounds are found.
+        """
+        intervals = self.ranges_intervals(dorange, dosumrange)
+        if intervals is None:
+            return None
+        return symbolic.bounds(expr, **intervals)
+
     def ranges_eval_minmax(self, expr, dorange=True, dosumrange=True):
-        """Get the minimum for an symbolic expression for the ranges."""
-        # range values
-        range_vals = None,
-        if dorange:
-            range_vals = (symbolic.min(self.range_vals),
-                          symbolic.max(self.range_vals))
+        """Get the minimum and maximum of an expression for the ranges.
 
+        The interval bounds (see ranges_bounds()) are only used if they are
+        tight, i.e., for constant expressions and expressions of only the
+        range variable that attain the bounds at the range's ends; otherwise
+        the expression is evaluated for all range (and sumrange) values.
+        """
+        bounds = self.ranges_bounds(expr, dorange, dosumrange)
+        if bounds is not None:
+            if bounds[0] == bounds[1]:
+                # constant
+                return bounds
+            if (self.range and dorange and not (
+                    self.sumrange and dosumrange and
+                    symbolic.dependson(expr, str(self.sumrange_var))
+            )):
+                # range variable only: tight if attained at the ends
+                ends = [
+                    symbolic.simplify(expr, **self.ranges_valdict(range_val))
+                    for range_val in (symbolic.min(self.range_vals),
+                                      symbolic.max(self.range_vals))
+                ]
+                if (min(ends), max(ends)) == tuple(bounds):
+                    return bounds
+
+        if dorange:
+            # exact minimum and maximum
+            table = RangesTable(self)
+            if dosumrange:
+                values = table.array(expr)
+            else:
+                values = table.range_array(expr)
+            if not len(values):
+                return None, None
+            if values.dtype != object:
+                return values.min().item(), values.max().item()
+            values = values.tolist()
+            return min(values), max(values)
+
+        # without the range: ends of the sumrange
+        range_vals = None,
         values = []
 
         # go over the range
@@ -1965,6 +2159,7 @@ class Experiment(object):
         for call in self.calls:
             for argid, value in enumerate(call):
                 call[argid] = symbolic.simplify(value, **kwargs)
+        self.cache_clear()
         self.update_vary()
         for vary in self.vary.values():
             vary["offset"] = symbolic.simplify(vary["offset"], **kwargs)
@@ -1976,21 +2171,30 @@ class Experiment(object):
     def operands_maxdim(self):
         """Get maximum size along any operand dimension."""
         maxdim = 0
-        for name in self.operands:
-            operand = self.get_operand(name)
-            if not operand["dims"]:
-                return None
-            if issubclass(operand["type"], signature.Work):
-                continue
-            for dim in operand["dims"]:
-                max_ = self.ranges_eval_minmax(dim)[1]
-                if not isinstance(max_, Number):
+        with self.cache_pinned():
+            for name in self.operands:
+                operand = self.get_operand(name)
+                if not operand["dims"]:
                     return None
-                maxdim = max(maxdim, max_)
+                if issubclass(operand["type"], signature.Work):
+                    continue
+                for dim in operand["dims"]:
+                    max_ = self.ranges_eval_minmax(dim)[1]
+                    if not isinstance(max_, Number):
+                        return None
+                    maxdim = max(maxdim, max_)
         return maxdim
 
     def get_connections(self):
         """Update connections between arguments based on coinciding operand."""
+        self.cache_validate()
+        if "connections" not in self._cache:
+            self._cache["connections"] = self.compute_connections()
+        return dict((key, val[:])
+                    for key, val in self._cache["connections"].items())
+
+    def compute_connections(self):
+        """Compute connections between arguments (see get_connections())."""
         sizes = defaultdict(list)
         for callid, call in enumerate(self.calls):
             if not isinstance(call, signature.Call):
@@ -2043,15 +2247,165 @@ class Experiment(object):
 
     def nresults(self):
         """How many results the current experiment would produce."""
-        nresults = 0
-        for range_val in self.range_vals:
-            for rep in range(self.nreps_at(range_val)):
-                if self.sumrange and self.sumrange_parallel:
-                    nresults += 1
-                else:
-                    for sumrange_val in self.sumrange_vals_at(range_val):
-                        if self.calls_parallel:
-                            nresults += 1
-                        else:
-                            nresults += len(self.calls)
+        table = RangesTable(self)
+        nreps = table.range_array(self.nreps)
+        if self.sumrange and self.sumrange_parallel:
+            return int(nreps.sum())
+        nresults = int(np.dot(nreps, np.diff(table.offsets)))
+        if not self.calls_parallel:
+            nresults *= len(self.calls)
         return nresults
+
+
+class RangesTable(object):
+
+    """Expressions evaluated on an Experiment's (range x sumrange) grid.
+
+    The grid points are ordered by range value and then by sumrange value;
+    offsets[i]:offsets[i + 1] are the points for range_vals[i].
+    """
+
+    def __init__(self, experiment, range_vals=None):
+        """Set up the grid for (a subset of) the experiment's range values."""
+        self.experiment = experiment
+        if range_vals is None:
+            range_vals = tuple(experiment.range_vals)
+        self.range_vals = range_vals
+
+        # sumrange values for each range value
+        self.sumrange_vals = [experiment.sumrange_vals_at(range_val)
+                              for range_val in range_vals]
+        self.offsets = np.cumsum([0] + [len(sumrange_vals) for sumrange_vals
+                                        in self.sumrange_vals])
+
+        # values for each grid point
+        self.point_range_vals = [
+            range_val
+            for range_val, sumrange_vals in zip(range_vals, self.sumrange_vals)
+            for _ in sumrange_vals
+        ]
+        self.point_sumrange_vals = [
+            sumrange_val
+            for sumrange_vals in self.sumrange_vals
+            for sumrange_val in sumrange_vals
+        ]
+
+        # evaluated expressions
+        self.arrays = {}
+        self.lists = {}
+        self.range_arrays = {}
+
+    def __len__(self):
+        """Number of grid points."""
+        return len(self.point_sumrange_vals)
+
+    def points(self, rangeidx):
+        """Grid points for a range value (by index)."""
+        return xrange(self.offsets[rangeidx], self.offsets[rangeidx + 1])
+
+    @staticmethod
+    def key(expr):
+        """Dictionary key for an expression (distinguishing 1 and 1.0)."""
+        return type(expr), expr
+
+    @staticmethod
+    def asarray(values):
+        """Convert evaluated values to an array (object if not numeric)."""
+        if all(isinstance(value, Number) for value in values):
+            return np.array(values)
+        array = np.empty(len(values), dtype=object)
+        array[:] = values
+        return array
+
+    @staticmethod
+    def int64_safe(expr, varnames, arrays):
+        """Check that an expression's integer evaluation can't overflow.
+
+        Based on the expression's bounds for the arrays' value intervals.
+        """
+        intervals = dict((varname, (array.min().item(), array.max().item()))
+                         for varname, array in zip(varnames, arrays))
+        bounds = symbolic.bounds(expr, **intervals)
+        return bounds is not None and max(map(abs, bounds)) < 1 << 62
+
+    def evaluate(self, expr, range_vals, sumrange_vals):
+        """Evaluate an expression for lists of range and sumrange values."""
+        if not isinstance(expr, symbolic.Expression):
+            return self.asarray(len(range_vals) * [expr])
+        ex = self.experiment
+
+        # compiled and vectorized evaluation
+        varnames = []
+        arrays = []
+        if ex.range:
+            varnames.append(str(ex.range_var))
+            arrays.append(np.asarray(range_vals))
+        if ex.sumrange and None not in sumrange_vals:
+            varnames.append(str(ex.sumrange_var))
+            arrays.append(np.asarray(sumrange_vals))
+        if all(array.dtype != object for array in arrays):
+            try:
+                with np.errstate(all="raise"):
+                    values = expr.compile(varnames, vectorized=True)(*arrays)
+                values = np.array(np.broadcast_to(values, len(range_vals)))
+                if (values.dtype.kind in "iu" and len(values) and
+                        not self.int64_safe(expr, varnames, arrays)):
+                    # possibly overflowed: evaluate with Python ints
+                    pass
+                elif values.dtype != object:
+                    return values
+            except (NameError, TypeError, ValueError, ArithmeticError):
+                pass
+
+        # fall back to symbolic evaluation
+        return self.asarray([
+            symbolic.simplify(expr, **ex.ranges_valdict(range_val,
+                                                        sumrange_val))
+            for range_val, sumrange_val in zip(range_vals, sumrange_vals)
+        ])
+
+    def array(self, expr):
+        """Evaluate an expression on all grid points."""
+        key = self.key(expr)
+        if key not in self.arrays:
+            self.arrays[key] = self.evaluate(expr, self.point_range_vals,
+                                             self.point_sumrange_vals)
+        return self.arrays[key]
+
+    def range_array(self, expr):
+        """Evaluate an expression for each range value (without sumrange)."""
+        key = self.key(expr)
+        if key not in self.range_arrays:
+            self.range_arrays[key] = self.evaluate(
+                expr, self.range_vals, len(self.range_vals) * [None]
+            )
+        return self.range_arrays[key]
+
+    def value(self, expr, point):
+        """Evaluate an expression at one grid point."""
+        try:
+            key = self.key(expr)
+            if key not in self.lists:
+                self.lists[key] = self.array(expr).tolist()
+            return self.lists[key][point]
+        except TypeError:
+            # unhashable expression
+            return symbolic.simplify(expr, **self.experiment.ranges_valdict(
+                self.point_range_vals[point], self.point_sumrange_vals[point]
+            ))
+
+    def range_sums(self, expr):
+        """Sum an expression over the sumrange for each range value.
+
+        Returns None for range values where the sum is not numeric.
+        """
+        array = self.array(expr)
+        if array.dtype == object:
+            return [
+                sum(array[start:stop])
+                if all(isinstance(value, Number)
+                       for value in array[start:stop]) else None
+                for start, stop in zip(self.offsets[:-1], self.offsets[1:])
+            ]
+        cumsum = np.concatenate(([0], np.cumsum(array)))
+        return (cumsum[self.offsets[1:]] - cumsum[self.offsets[:-1]]).tolist()
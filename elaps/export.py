@@ -0,0 +1,179 @@
+"""Columnar (tidy) export of ELAPS:Reports."""
+
+from __future__ import division
+
+import csv
+from collections import OrderedDict
+
+import numpy as np
+
+from elaps import defines
+
+
+def report_columns(report):
+    """Column names of a Report's export.
+
+    One row per (range value, repetition, sumrange value, call) has the
+    report name, these indices (where the experiment has them), the counters,
+    and the flops (where known).
+    """
+    ex = report.experiment
+    columns = ["report"]
+    if ex.range:
+        columns.append("range_val")
+    columns.append("rep")
+    if ex.sumrange and not ex.sumrange_parallel:
+        columns.append("sumrange_val")
+    if not (ex.sumrange_parallel or ex.calls_parallel):
+        columns += ["callid", "call"]
+    columns += report.counters
+    if not np.isnan(report_flops(report)).all():
+        columns.append("flops")
+    return columns
+
+
+def report_flops(report):
+    """Array [callid, rangeidx * nsumrange + sumrangeidx]: flops (or NaN).
+
+    With calls_parallel (sumrange_parallel), the calls (and the sumrange) are
+    summed up (axes of length 1).
+    """
+    ex = report.experiment
+    flops = np.array(report.flops(sumrange=not ex.sumrange_parallel),
+                     dtype=float)
+    if ex.sumrange_parallel or ex.calls_parallel:
+        flops = flops.sum(axis=0, keepdims=True)
+    return flops
+
+
+def report_chunks(report, name="", chunksize=1 << 16):
+    """Generate the rows of a Report's export in chunks.
+
+    Each chunk is an OrderedDict mapping the columns (see report_columns())
+    to arrays of at most chunksize rows.  Only one chunk's rows are held in
+    memory at a time.
+    """
+    report.values_check()
+    ex = report.experiment
+    columns = report_columns(report)
+    values = report.values
+    mask = np.ma.getmaskarray(values)[..., 0]
+    shape = mask.shape
+    blocksize = int(np.prod(shape[1:]))
+
+    flops = report_flops(report)
+
+    def chunk(idxs):
+        """Generate the chunk for flat measurement indices."""
+        rangeidxs, reps, sumrangeidxs, callids = np.unravel_index(idxs,
+                                                                  shape)
+        counters = values.data[rangeidxs, reps, sumrangeidxs, callids]
+        columndata = dict(
+            (counter, counters[:, counterid])
+            for counterid, counter in enumerate(report.counters)
+        )
+        columndata["report"] = np.repeat(np.array([name]), len(idxs))
+        columndata["rep"] = reps
+        if "range_val" in columns:
+            columndata["range_val"] = np.array(report.range_vals)[rangeidxs]
+        if "sumrange_val" in columns:
+            columndata["sumrange_val"] = np.array([
+                report.sumrange_vals[rangeidx][sumrangeidx]
+                for rangeidx, sumrangeidx in zip(rangeidxs.tolist(),
+                                                 sumrangeidxs.tolist())
+            ])
+        if "call" in columns:
+            columndata["callid"] = callids
+            columndata["call"] = np.array([call[0]
+                                           for call in ex.calls])[callids]
+        if "flops" in columns:
+            columndata["flops"] = flops[
+                callids, rangeidxs * (flops.shape[1] // shape[0]) +
+                sumrangeidxs
+            ]
+        return OrderedDict((column, columndata[column]) for column in columns)
+
+    pending = []
+    npending = 0
+    for rangeidx in range(shape[0]):
+        idxs = np.flatnonzero(~mask[rangeidx]) + rangeidx * blocksize
+        while len(idxs):
+            pending.append(idxs[:chunksize - npending])
+            npending += len(pending[-1])
+            idxs = idxs[len(pending[-1]):]
+            if npending == chunksize:
+                yield chunk(np.concatenate(pending))
+                pending = []
+                npending = 0
+    if npending:
+        yield chunk(np.concatenate(pending))
+
+
+def write_csv(chunks, filepath):
+    """Write chunks to a CSV file (with a header line)."""
+    with open(filepath, "wb") as fout:
+        writer = csv.writer(fout)
+        for chunkid, chunk in enumerate(chunks):
+            if not chunkid:
+                writer.writerow(chunk.keys())
+            writer.writerows(zip(*[column.tolist()
+                                   for column in chunk.values()]))
+
+
+def write_parquet(chunks, filepath):
+    """Write chunks to a Parquet file (one row group per chunk)."""
+    import pyarrow
+    import pyarrow.parquet
+
+    writer = None
+    try:
+        for chunk in chunks:
+            table = pyarrow.Table.from_arrays(
+                [pyarrow.array(column) for column in chunk.values()],
+                names=chunk.keys()
+            )
+            if writer is None:
+                writer = pyarrow.parquet.ParquetWriter(filepath, table.schema)
+            writer.write_table(table)
+    finally:
+        if writer is not None:
+            writer.close()
+
+
+def write_hdf5(chunks, filepath, key="report"):
+    """Write chunks to an HDF5 file (as an appendable pandas table)."""
+    import pandas
+
+    with pandas.HDFStore(filepath, "w") as store:
+        for chunk in chunks:
+            # string columns have the same widths in all chunks
+            min_itemsize = dict((column, values.dtype.itemsize)
+                                for column, values in chunk.items()
+                                if values.dtype.kind == "S")
+            store.append(key, pandas.DataFrame(chunk), format="table",
+                         index=False, min_itemsize=min_itemsize)
+
+
+writers = {
+    "csv": write_csv,
+    "parquet": write_parquet,
+    "hdf5": write_hdf5,
+}
+
+
+def export_report(report, filepath, fmt=None, name="", chunksize=1 << 16):
+    """Export a Report to a CSV, Parquet, or HDF5 file.
+
+    The format is determined from the file extension unless given (see
+    defines.export_extensions).
+    """
+    if fmt is None:
+        extension = filepath.rsplit(".", 1)[-1]
+        for fmt, fmt_extension in defines.export_extensions.items():
+            if extension == fmt_extension:
+                break
+        else:
+            raise ValueError("unknown export format: %r" % filepath)
+    if fmt not in writers:
+        raise ValueError("unknown export format: %r" % fmt)
+    writers[fmt](report_chunks(report, name, chunksize), filepath)
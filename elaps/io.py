@@ -2,8 +2,11 @@
 
 import os
 import imp
+import cPickle
 from collections import defaultdict
 
+import numpy as np
+
 from elaps import defines
 from elaps import symbolic
 from elaps import signature
@@ -98,12 +101,17 @@ def load_experiment_string(string, _globals={}):
     ex = eval(string, _globals)
     if not isinstance(ex, experiment.Experiment):
         raise TypeError("not an Experiment")
+    load_experiment_backend(ex)
+    return ex
+
+
+def load_experiment_backend(ex):
+    """Load the backend for an Experiment's Sampler."""
     try:
         ex.sampler["backend"] = None
         ex.sampler["backend"] = load_backend(ex.sampler["backend_name"])
     except:
         pass
-    return ex
 
 
 def load_experiment(filepath):
@@ -226,21 +234,32 @@ def load_papinames():
                               eval(fin.read(), {}))
 
 
-def load_report(filepath, discard_first_repetitions=False):
-    """Load a Report from a file."""
-    with open(filepath) as fin:
-        experiment = load_experiment_string(fin.readline())
-        rawdata = []
-        for line in fin:
-            vals = []
-            for val in line.split():
-                try:
-                    val = int(val)
-                except:
-                    pass
-                vals.append(val)
-            rawdata.append(vals)
-    rep = report.Report(experiment, rawdata)
+def load_report(filepath, discard_first_repetitions=False, cache=True,
+                streaming=False):
+    """Load a Report from a file (or its up-to-date cache file).
+
+    With streaming, only summaries of the measurements are kept (no cache);
+    the first repetitions are then discarded while parsing.
+    """
+    rep = None
+    if cache and not streaming:
+        rep = load_report_cache(filepath)
+    if rep is None:
+        stat = os.stat(filepath)
+        with open(filepath) as fin:
+            header = fin.readline()
+            experiment = load_experiment_string(header)
+            offset = [fin.tell()]
+            rep = report.Report(
+                experiment, lines=iter_lines(fin, offset),
+                streaming=streaming,
+                discard_first_repetitions=(streaming and
+                                           discard_first_repetitions)
+            )
+        rep.fileheader = header
+        rep.fileoffset = offset[0]
+        if cache and not streaming and not rep.truncated:
+            write_report_cache(rep, filepath, stat)
     if discard_first_repetitions:
         return rep.discard_first_repetitions()
     errfile = "%s.%s" % (filepath[:-4], defines.error_extension)
@@ -249,6 +268,124 @@ def load_report(filepath, discard_first_repetitions=False):
     return rep
 
 
+def iter_lines(fin, offset):
+    """Iterate over a file's lines, counting complete lines' bytes."""
+    for line in fin:
+        if line[-1:] == "\n":
+            offset[0] += len(line)
+        yield line
+
+
+def update_report(rep, filepath):
+    """Append lines written to a truncated report file since loading.
+
+    Returns the indices of the range values with new measurements, or None
+    if the file was replaced and needs to be loaded again.
+    """
+    if not rep.truncated:
+        return []
+    if (not hasattr(rep, "fileoffset") or
+            os.path.getsize(filepath) < rep.fileoffset):
+        return None
+    with open(filepath) as fin:
+        if fin.readline() != rep.fileheader:
+            return None
+        fin.seek(rep.fileoffset)
+        offset = [rep.fileoffset]
+        rangeidxs = rep.append_lines(iter_lines(fin, offset))
+    rep.fileoffset = offset[0]
+    errfile = "%s.%s" % (filepath[:-4], defines.error_extension)
+    if os.path.isfile(errfile) and os.path.getsize(errfile):
+        rep.error = True
+    return rangeidxs
+
+
+class ReportProgress(object):
+
+    """Progress of a (running) report file, counting lines incrementally."""
+
+    def __init__(self, filepath, experiment=None):
+        """Initialize for a report file (and its Experiment, if known)."""
+        self.filepath = filepath
+        self.experiment = experiment
+        self.nresults = None
+        if experiment is not None:
+            self.nresults = experiment.nresults()
+        self.offset = 0
+        self.nlines = 0
+
+    def update(self, chunksize=1 << 20):
+        """Count the lines appended since the last update.
+
+        Returns the number of results (None if the file doesn't exist).
+        """
+        if not os.path.isfile(self.filepath):
+            return None
+        if os.path.getsize(self.filepath) < self.offset:
+            # file was replaced
+            self.offset = 0
+            self.nlines = 0
+        with open(self.filepath) as fin:
+            if self.experiment is None:
+                self.experiment = load_experiment_string(fin.readline())
+                self.nresults = self.experiment.nresults()
+            fin.seek(self.offset)
+            for chunk in iter(lambda: fin.read(chunksize), ""):
+                self.nlines += chunk.count("\n")
+                self.offset += len(chunk)
+        return self.progress()
+
+    def progress(self):
+        """Number of results (without experiment and start time lines)."""
+        return self.nlines - 2
+
+
+def report_cache_key(stat):
+    """Key identifying a report file's version (format, size, mtime)."""
+    return [defines.report_cache_version, stat.st_size, stat.st_mtime]
+
+
+def load_report_cache(filepath):
+    """Load a Report from its cache file (None if missing or outdated)."""
+    cachefile = "%s.%s" % (filepath, defines.report_cache_extension)
+    try:
+        stat = os.stat(filepath)
+        with np.load(cachefile) as cache:
+            if cache["key"].tolist() != report_cache_key(stat):
+                return None
+            state = cPickle.loads(cache["state"].tostring())
+            state["values"] = np.ma.MaskedArray(cache["data"], cache["mask"])
+    except:
+        return None
+    rep = report.Report.__new__(report.Report)
+    rep.__setstate__(state)
+    load_experiment_backend(rep.experiment)
+    return rep
+
+
+def write_report_cache(rep, filepath, stat):
+    """Write a Report's cache file (for the report file's stat)."""
+    cachefile = "%s.%s" % (filepath, defines.report_cache_extension)
+    tmpfile = "%s.%d" % (cachefile, os.getpid())
+    state = rep.__getstate__()
+    values = state.pop("values")
+    try:
+        state = cPickle.dumps(state, 2)
+    except:
+        return
+    try:
+        with open(tmpfile, "wb") as fout:
+            np.savez(
+                fout, key=np.array(report_cache_key(stat), dtype=float),
+                data=values.data, mask=np.ma.getmaskarray(values),
+                state=np.frombuffer(state, dtype=np.uint8)
+            )
+        os.rename(tmpfile, cachefile)
+    except (IOError, OSError):
+        if os.path.isfile(tmpfile):
+            os.remove(tmpfile)
+
+
 def load_metric_file(filepath):
     """Load a metric from a file."""
     name = os.path.basename(filepath)[:-3]
@@ -291,5 +428,7 @@ def get_counter_metric(counter, name=None, doc=None):
     def metric(data, **kwargs):
         return data.get(counter)
     metric.name = name
+    metric.vectorized = True
+    metric.linear = True
     metric.__doc__ = doc
     return metric
@@ -12,3 +12,5 @@ def metric(data, **kwargs):
     return data.get("cycles")
 
 metric.name = "time [cycles]"
+metric.vectorized = True
+metric.linear = True
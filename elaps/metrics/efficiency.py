@@ -2,8 +2,10 @@
 
 from __future__ import division
 
+import numpy as np
 
-def metric(data, experiment, nthreads, selector, **kwargs):
+
+def metric(data, experiment, nthreads, calls, **kwargs):
     """Relative utilization of the hardware's floating point units.
 
     Computed as:
@@ -20,15 +22,9 @@ def metric(data, experiment, nthreads, selector, **kwargs):
         return None
 
     # get datatype
-    datatypes = set()
-    calls = experiment.calls
-    ncalls = len(calls)
-    for callid, call in enumerate(calls):
-        if selector([int(callid == i) for i in range(ncalls)]) != 0:
-            # selector responds to call i
-            if not hasattr(call, "sig"):
-                return None
-            datatypes.add(call.sig.datatype())
+    if calls is None or not all(hasattr(call, "sig") for call in calls):
+        return None
+    datatypes = set(call.sig.datatype() for call in calls)
     if len(datatypes) != 1:
         return None
     datatype = datatypes.pop()
@@ -41,8 +37,9 @@ def metric(data, experiment, nthreads, selector, **kwargs):
         ipc = sampler["dflops/cycle"]
     else:
         return None
-    ncores = min(sampler["ncores"], nthreads)
+    ncores = np.minimum(sampler["ncores"], nthreads)
 
     return nops / (cycles * ipc * ncores)
 
 metric.name = "efficiency"
+metric.vectorized = True
@@ -12,3 +12,5 @@ def metric(data, **kwargs):
     return data.get("flops")
 
 metric.name = "cost [flops]"
+metric.vectorized = True
+metric.linear = True
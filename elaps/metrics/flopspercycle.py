@@ -19,3 +19,4 @@ def metric(data, **kwargs):
     return nops / cycles
 
 metric.name = "performance [flops/cycle]"
+metric.vectorized = True
@@ -22,3 +22,4 @@ def metric(data, experiment, **kwargs):
     return 1e-9 * nops * (freq / cycles)
 
 metric.name = "performance [Gflops/s]"
+metric.vectorized = True
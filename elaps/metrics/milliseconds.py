@@ -20,3 +20,5 @@ def metric(data, experiment, **kwargs):
     return 1000 * cycles / freq
 
 metric.name = "time [ms]"
+metric.vectorized = True
+metric.linear = True
@@ -19,3 +19,5 @@ def metric(data, experiment, **kwargs):
     return cycles / freq
 
 metric.name = "time [s]"
+metric.vectorized = True
+metric.linear = True
@@ -2,6 +2,7 @@
 
 from __future__ import print_function
 
+import numpy as np
 from matplotlib.lines import Line2D
 from matplotlib.patches import Patch
 
@@ -58,15 +59,51 @@ def plot(datas, stat_names=["med"], colors=[], styles={}, xlabel=None,
                           ylabel, legendargs, fig)
 
 
+def stat_bands(stat_names):
+    """Combine pairs of statistics into bands (e.g., "min-max")."""
+    stat_names = stat_names[:]
+    for lower, upper in defines.stat_bands:
+        if lower in stat_names and upper in stat_names:
+            stat_names.insert(stat_names.index(lower), "%s-%s" % (lower, upper))
+            stat_names.remove(lower)
+            stat_names.remove(upper)
+    return stat_names
+
+
+def is_band(stat_name):
+    """Check if a statistic is plotted as a band."""
+    return "-" in stat_name or stat_name in ("std", "mad", "ci")
+
+
+def band(stat_name, data):
+    """Get the lower and upper bounds of a band for a dict of lists."""
+    if stat_name in ("std", "mad"):
+        # deviation around the average/median
+        centers = report.apply_stat("avg" if stat_name == "std" else "med",
+                                    data)
+        widths = report.apply_stat(stat_name, data)
+        lowers = dict((key, centers[key] - widths[key]) for key in widths
+                      if widths[key] is not None)
+        uppers = dict((key, centers[key] + widths[key]) for key in widths
+                      if widths[key] is not None)
+    elif stat_name == "ci":
+        bounds = report.apply_stat("ci", data)
+        lowers = dict((key, bound[0]) for key, bound in bounds.items()
+                      if bound is not None)
+        uppers = dict((key, bound[1]) for key, bound in bounds.items()
+                      if bound is not None)
+    else:
+        lower, upper = stat_name.split("-")
+        lowers = report.apply_stat(lower, data)
+        uppers = report.apply_stat(upper, data)
+    return lowers, uppers
+
+
 def range_plot(datas, stat_names=["med"], colors=[], styles={}, xlabel=None,
                ylabel=None, legendargs={}, figure=None):
     """Plot with range on the x axis."""
-    # min-max stat
-    stat_names = stat_names[:]
-    if "min" in stat_names and "max" in stat_names:
-        stat_names.insert(0, "min-max")
-        stat_names.remove("min")
-        stat_names.remove("max")
+    # bands (min-max, percentiles)
+    stat_names = stat_bands(stat_names)
 
     fig = figure
 
@@ -84,22 +121,13 @@ def range_plot(datas, stat_names=["med"], colors=[], styles={}, xlabel=None,
                                for key, values in data.iteritems()
                                for value in values))
                 axes.plot(xs, ys, color=color, **styles["all"])
-            elif stat_name == "min-max":
-                min_data = report.apply_stat("min", data)
-                max_data = report.apply_stat("max", data)
+            elif is_band(stat_name):
+                min_data, max_data = band(stat_name, data)
                 xs = sorted(set(min_data) & set(max_data))
                 min_ys = [min_data[x] for x in xs]
                 max_ys = [max_data[x] for x in xs]
                 axes.fill_between(xs, min_ys, max_ys, color=color,
-                                  **styles["min-max"])
-            elif stat_name == "std":
-                avg_data = report.apply_stat("avg", data)
-                std_data = report.apply_stat("std", data)
-                xs = sorted(set(std_data) & set(avg_data))
-                min_ys = [avg_data[x] - std_data[x] for x in xs]
-                max_ys = [avg_data[x] + std_data[x] for x in xs]
-                axes.fill_between(xs, min_ys, max_ys, color=color,
-                                  **styles["std"])
+                                  **styles[stat_name])
             else:
                 # all other stats
                 stat_data = report.apply_stat(stat_name, data)
@@ -137,17 +165,13 @@ def range_plot(datas, stat_names=["med"], colors=[], styles={}, xlabel=None,
         legend_style["color"] = color
         legend.append((Line2D([], [], **legend_style), name))
     legend_stat_names = stat_names[:]
-    if "min" in legend_stat_names and "max" in legend_stat_names:
-        legend_stat_names.insert(0, "min-max")
-        legend_stat_names.remove("min")
-        legend_stat_names.remove("max")
     color = styles["legend"]["color"]
     if len(legend_stat_names) > 1:
         for stat_name in legend_stat_names:
             legend_style = styles["legend"].copy()
             if stat_name == "min-max":
                 legend_elem = Patch(edgecolor=color, **styles[stat_name])
-            elif stat_name == "std":
+            elif is_band(stat_name):
                 legend_elem = Patch(color=color, **styles[stat_name])
             else:
                 legend_elem = Line2D([], [], color=color, **styles[stat_name])
@@ -163,12 +187,8 @@ def range_plot(datas, stat_names=["med"], colors=[], styles={}, xlabel=None,
 def bar_plot(datas, stat_names=["med"], colors=[], styles={}, ylabel=None,
              legendargs={}, figure=None):
     """Barplot."""
-    # min-max stat
-    stat_names = stat_names[:]
-    if "min" in stat_names and "max" in stat_names:
-        stat_names.insert(stat_names.index("min"), "min-max")
-        stat_names.remove("min")
-        stat_names.remove("max")
+    # bands (min-max, percentiles)
+    stat_names = stat_bands(stat_names)
 
     fig = figure
 
@@ -189,18 +209,18 @@ def bar_plot(datas, stat_names=["med"], colors=[], styles={}, ylabel=None,
                       for i in range(dl)]
                 ys = data
                 axes.plot(xs, ys, color=color, **styles["all"])
-            elif stat_name == "min-max":
-                min_y = report.apply_stat("min", data)
-                max_y = report.apply_stat("max", data)
-                axes.bar(left, max_y - min_y, width, min_y, color=color,
-                         **styles["bar"])
-            elif stat_name == "std":
-                avg = report.apply_stat("avg", data)
-                std = report.apply_stat("std", data)
-                axes.bar(left, 2 * std, width, avg - std, color=color,
-                         **styles["bar"])
-                axes.plot([left, left + width], [avg, avg], linestyle="--",
-                          color="#000000", zorder=4)
+            elif is_band(stat_name):
+                min_y, max_y = band(stat_name, {None: data})
+                if None not in min_y:
+                    continue
+                axes.bar(left, max_y[None] - min_y[None], width, min_y[None],
+                         color=color, **styles["bar"])
+                if stat_name in ("std", "mad", "ci"):
+                    center = report.apply_stat(
+                        "med" if stat_name == "mad" else "avg", data
+                    )
+                    axes.plot([left, left + width], [center, center],
+                              linestyle="--", color="#000000", zorder=4)
             else:
                 # all other stats
                 value = report.apply_stat(stat_name, data)
@@ -235,3 +255,52 @@ def bar_plot(datas, stat_names=["med"], colors=[], styles={}, ylabel=None,
         axes.legend(*zip(*legend), **args)
 
     return fig
+
+
+def heatmap(data, stat_name="med", xlabel=None, ylabel=None, zlabel=None,
+            figure=None):
+    """Plot a (range x sumrange) grid as a heatmap.
+
+    data is indexed by (range value, sumrange value) (see Report.evaluate()
+    with sumrange); missing grid points are left blank.
+    """
+    # set up figure
+    fig = figure
+    if not fig:
+        from matplotlib import pyplot
+        fig = pyplot.gcf()
+    fig.patch.set_facecolor(defines.face_color)
+    fig.clf()
+    axes = fig.gca()
+    axes.set_axis_bgcolor(defines.background_color)
+    if xlabel:
+        axes.set_xlabel(xlabel)
+    if ylabel:
+        axes.set_ylabel(ylabel)
+
+    stat_data = report.apply_stat(stat_name, data)
+    stat_data = dict((key, value) for key, value in stat_data.items()
+                     if value is not None)
+    if not stat_data:
+        return fig
+
+    # grid
+    range_vals = sorted(set(range_val for range_val, _ in stat_data))
+    sumrange_vals = sorted(set(sumrange_val for _, sumrange_val in stat_data))
+    grid = np.ma.masked_all((len(sumrange_vals), len(range_vals)))
+    for (range_val, sumrange_val), value in stat_data.items():
+        grid[sumrange_vals.index(sumrange_val),
+             range_vals.index(range_val)] = value
+
+    # plot (range and sumrange values as ticks)
+    mesh = axes.pcolormesh(grid, cmap="viridis")
+    axes.set_xticks(np.arange(len(range_vals)) + .5)
+    axes.set_xticklabels(map(str, range_vals))
+    axes.set_yticks(np.arange(len(sumrange_vals)) + .5)
+    axes.set_yticklabels(map(str, sumrange_vals))
+    axes.axis([0, len(range_vals), 0, len(sumrange_vals)])
+    colorbar = fig.colorbar(mesh, ax=axes)
+    if zlabel:
+        colorbar.set_label(zlabel)
+
+    return fig
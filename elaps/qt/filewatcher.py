@@ -0,0 +1,124 @@
+"""File change watcher for ELAPS:PlayMat and ELAPS:Viewer."""
+
+import os
+
+from PyQt4 import QtCore
+from PyQt4.QtCore import pyqtSlot
+
+
+def filestat(path):
+    """Get a file's (size, mtime), or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime
+
+
+class QFileWatcher(QtCore.QObject):
+
+    """Watcher for file changes.
+
+    Files are watched through the operating system (e.g., inotify) where
+    possible; missing files are watched through their directories.  Files
+    the system cannot watch, or that are written from other hosts (e.g., on
+    NFS), are polled in the given interval instead.
+    """
+
+    changed = QtCore.pyqtSignal(str)
+
+    def __init__(self, interval, parent=None):
+        """Initialize the watcher."""
+        QtCore.QObject.__init__(self, parent)
+        self.watcher = QtCore.QFileSystemWatcher(self)
+        self.watcher.fileChanged.connect(self.on_file_changed)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.timer = QtCore.QTimer(
+            self, interval=interval, timeout=self.on_timer
+        )
+
+        # path: polled
+        self.watched = {}
+        # path: directory (for missing files)
+        self.waiting = {}
+        # path: (size, mtime)
+        self.polled = {}
+
+    def add(self, path, poll=False):
+        """Watch a file (poll it if requested or necessary)."""
+        path = os.path.abspath(path)
+        self.remove(path)
+        if not poll:
+            if os.path.exists(path):
+                self.watcher.addPath(path)
+                poll = path not in map(str, self.watcher.files())
+            else:
+                directory = os.path.dirname(path)
+                self.watcher.addPath(directory)
+                poll = directory not in map(str, self.watcher.directories())
+                if not poll:
+                    self.waiting[path] = directory
+        self.watched[path] = poll
+        if poll:
+            self.polled[path] = filestat(path)
+            self.timer.start()
+
+    def remove(self, path):
+        """Stop watching a file."""
+        path = os.path.abspath(path)
+        poll = self.watched.pop(path, None)
+        if poll is None:
+            return
+        if poll:
+            del self.polled[path]
+            if not self.polled:
+                self.timer.stop()
+        elif path in self.waiting:
+            directory = self.waiting.pop(path)
+            if directory not in self.waiting.values():
+                self.watcher.removePath(directory)
+        else:
+            self.watcher.removePath(path)
+
+    def watch(self, paths, polled=()):
+        """Watch exactly the given files (and poll those in polled)."""
+        paths = dict((os.path.abspath(path), False) for path in paths)
+        paths.update((os.path.abspath(path), True) for path in polled)
+        for path in set(self.watched) - set(paths):
+            self.remove(path)
+        for path, poll in paths.iteritems():
+            if self.watched.get(path) != poll:
+                self.add(path, poll)
+
+    # events
+    @pyqtSlot(str)
+    def on_file_changed(self, path):
+        """Event: watched file changed."""
+        path = str(path)
+        if path not in self.watched:
+            return
+        if path not in map(str, self.watcher.files()):
+            # file was removed or replaced
+            self.add(path)
+        self.changed.emit(path)
+
+    @pyqtSlot(str)
+    def on_directory_changed(self, directory):
+        """Event: directory of missing file(s) changed."""
+        directory = str(directory)
+        for path, pathdir in self.waiting.items():
+            if pathdir == directory and os.path.exists(path):
+                self.add(path)
+                self.changed.emit(path)
+
+    @pyqtSlot()
+    def on_timer(self):
+        """Event: poll files."""
+        for path, stat in self.polled.items():
+            if path not in self.polled:
+                # removed in the meantime
+                continue
+            newstat = filestat(path)
+            if newstat != stat:
+                self.polled[path] = newstat
+                self.changed.emit(path)
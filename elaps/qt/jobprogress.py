@@ -5,7 +5,9 @@ import os
 from PyQt4 import QtCore, QtGui
 from PyQt4.QtCore import pyqtSlot
 
+import elaps.io
 from elaps import defines
+from elaps.qt.filewatcher import QFileWatcher
 
 
 class QJobProgress(QtGui.QDockWidget):
@@ -22,10 +24,8 @@ class QJobProgress(QtGui.QDockWidget):
         )
         self.playmat = playmat
 
-        self.timer = QtCore.QTimer(
-            interval=defines.jobprogress_timeout,
-            timeout=self.on_timer
-        )
+        self.watcher = QFileWatcher(defines.jobprogress_timeout, self)
+        self.watcher.changed.connect(self.on_file_changed)
 
         self.UI_init()
 
@@ -63,13 +63,16 @@ class QJobProgress(QtGui.QDockWidget):
 
     def add_job(self, filebase, jobid, experiment):
         """Add a job to track."""
+        reportfile = "%s.%s" % (filebase, defines.report_extension)
+        tracker = elaps.io.ReportProgress(reportfile, experiment)
         job = {
             "jobid": jobid,
             "name": os.path.basename(filebase),
-            "nresults": experiment.nresults(),
+            "nresults": tracker.nresults,
             "progress": 0,
+            "tracker": tracker,
             "filebase": filebase,
-            "reportfile": "%s.%s" % (filebase, defines.report_extension),
+            "reportfile": reportfile,
             "errorfile": "%s.%s" % (filebase, defines.error_extension),
             "experiment": experiment.copy(),
             "stat": "PEND",
@@ -123,28 +126,25 @@ class QJobProgress(QtGui.QDockWidget):
         self.resize_columns()
         self.show()
         self.widget().scrollToBottom()
-        self.timer.start()
+        self.jobs_update([job])
 
     def autohide(self):
         """Hide if empty."""
         if self.widget().topLevelItemCount() == 0:
             self.hide()
 
-    # events
-    @pyqtSlot()
-    def on_timer(self):
-        """Update progress."""
+    def jobs_update(self, jobs):
+        """Update the jobs' progress."""
         # read data
-        for itemid in range(self.widget().topLevelItemCount()):
-            job = self.widget().topLevelItem(itemid).job
+        for job in jobs:
             if job["stat"] in ("ERROR", "DONE", "KILL"):
                 # job is done
                 continue
-            if not os.path.isfile(job["reportfile"]):
+            progress = job["tracker"].update()
+            if progress is None:
                 # job is pending
                 continue
-            with open(job["reportfile"]) as fin:
-                job["progress"] = len(fin.readlines()) - 2
+            job["progress"] = progress
             if job["stat"] == "TOKILL":
                 job["stat"] = "KILL"
             elif job["progress"] >= 0:
@@ -162,9 +162,8 @@ class QJobProgress(QtGui.QDockWidget):
             if job["stat"] in ("RUN", "DONE"):
                 job["actions"]["view"].setDisabled(False)
 
-        for itemid in range(self.widget().topLevelItemCount()):
-            item = self.widget().topLevelItem(itemid)
-            job = item.job
+        for job in jobs:
+            item = job["item"]
             progress = min(max(0, job["progress"]), job["nresults"])
             job["progressbar"].setValue(progress)
             if job["stat"] == "RUN":
@@ -179,6 +178,33 @@ class QJobProgress(QtGui.QDockWidget):
                 item.setText(2, "done")
 
         self.resize_columns()
+        self.jobs_watch()
+
+    def jobs_watch(self):
+        """Watch the files of all unfinished jobs."""
+        paths = []
+        polled = []
+        for job in self.jobs():
+            if job["stat"] in ("ERROR", "DONE", "KILL"):
+                continue
+            files = [job["reportfile"], job["errorfile"]]
+            if job["experiment"].sampler["backend"].name == "local":
+                paths += files
+            else:
+                # remote file systems don't notify about changes
+                polled += files
+        self.watcher.watch(paths, polled)
+
+    # events
+    @pyqtSlot(str)
+    def on_file_changed(self, path):
+        """Event: report or error file changed."""
+        path = str(path)
+        self.jobs_update([
+            job for job in self.jobs()
+            if path in (os.path.abspath(job["reportfile"]),
+                        os.path.abspath(job["errorfile"]))
+        ])
 
     @pyqtSlot(QtGui.QTreeWidgetItem, int)
     def on_double_click(self, item, col):
@@ -266,10 +292,13 @@ class QJobProgress(QtGui.QDockWidget):
     # @pyqtSlot()  # sender() pyqt bug
     def on_kill(self):
         """Event: kill job(s)."""
+        jobs = []
         for job in self.selected_jobs():
             if job["stat"] in ("PEND", "RUN"):
                 job["experiment"].sampler["backend"].kill(job["jobid"])
                 job["stat"] = "TOKILL"
+                jobs.append(job)
+        self.jobs_update(jobs)
 
     # @pyqtSlot()  # sender() pyqt bug
     def on_rerun(self):
@@ -298,10 +327,13 @@ class QJobProgress(QtGui.QDockWidget):
 
     def on_killall_confirmed(self):
         """Event: kill all jobs confirmed."""
+        jobs = []
         for job in self.jobs():
             if job["stat"] in ("PEND", "RUN"):
                 job["experiment"].sampler["backend"].kill(job["jobid"])
                 job["stat"] = "TOKILL"
+                jobs.append(job)
+        self.jobs_update(jobs)
 
     # @pyqtSlot()  # sender() pyqt bug
     def on_remove(self):
@@ -310,6 +342,7 @@ class QJobProgress(QtGui.QDockWidget):
             self.widget().takeTopLevelItem(
                 self.widget().indexOfTopLevelItem(job["item"])
             )
+        self.jobs_watch()
         self.autohide()
 
     @pyqtSlot()
@@ -320,6 +353,7 @@ class QJobProgress(QtGui.QDockWidget):
                 self.widget().indexOfTopLevelItem(job["item"])
             )
         """Event: remove all jobs."""
+        self.jobs_watch()
         self.autohide()
 
     @pyqtSlot()
@@ -330,6 +364,7 @@ class QJobProgress(QtGui.QDockWidget):
                 self.widget().takeTopLevelItem(
                     self.widget().indexOfTopLevelItem(job["item"])
                 )
+        self.jobs_watch()
         self.autohide()
 
     # @pyqtSlot()  # sender() pyqt bug
@@ -15,6 +15,7 @@ from matplotlib.figure import Figure
 import elaps
 from elaps import defines
 from elaps import plot
+from elaps.qt.filewatcher import QFileWatcher
 from elaps.qt.reportitem import QReportItem
 
 
@@ -33,6 +34,8 @@ class Viewer(QtGui.QMainWindow):
         QtGui.QMainWindow.__init__(self)
 
         self.discard_firstrep = True
+        self.discard_warmup = False
+        self.outlier_filter = None
         self.stats_showing = ["med"]
         self.metric_showing = None
         self.colors = defines.colors[::-1]
@@ -49,11 +52,11 @@ class Viewer(QtGui.QMainWindow):
             except:
                 pass
 
-        # truncated report reload timer
-        self.truncated_timer = QtCore.QTimer(
-            interval=defines.truncatedreload_timeout,
-            timeout=self.on_truncated_timer
+        # truncated report watcher
+        self.truncated_watcher = QFileWatcher(
+            defines.truncatedreload_timeout, self
         )
+        self.truncated_watcher.changed.connect(self.on_truncated_changed)
 
         # load reports
         for filename in filenames:
@@ -135,7 +138,15 @@ class Viewer(QtGui.QMainWindow):
                 ("med", "median"),
                 ("max", "maximum"),
                 ("avg", "average"),
-                ("std", "standard deviation")
+                ("std", "standard deviation"),
+                ("p5", "5th percentile"),
+                ("p25", "25th percentile"),
+                ("p75", "75th percentile"),
+                ("p95", "95th percentile"),
+                ("p99", "99th percentile"),
+                ("tmean", "10% trimmed mean"),
+                ("mad", "median absolute deviation"),
+                ("ci", "95% bootstrap confidence interval of the average")
             ):
                 stat = QtGui.QCheckBox(
                     stat_name, toolTip=desc, toggled=self.on_stat_toggle
@@ -153,6 +164,30 @@ class Viewer(QtGui.QMainWindow):
                 toggled=self.on_discard_firstrep_toggle
             )
             firstrepT.addWidget(self.UI_discard_firstrep)
+            self.UI_discard_warmup = QtGui.QCheckBox(
+                "Detect warm-up",
+                toolTip="Ignore the warm-up repetitions detected for each "
+                "range value (MSER-5)",
+                toggled=self.on_discard_warmup_toggle
+            )
+            firstrepT.addWidget(self.UI_discard_warmup)
+
+            # outliers
+            outliersT = self.addToolBar("Outliers")
+            outliersT.pyqtConfigure(movable=False, objectName="Outliers")
+            self.UI_outlier_filter = QtGui.QComboBox()
+            for outlier_filter, desc in (
+                ("", "Keep outliers"),
+                ("iqr", "Remove outliers (IQR fences)"),
+                ("mad", "Remove outliers (MAD z-score)"),
+                ("top", "Remove top 5%")
+            ):
+                self.UI_outlier_filter.addItem(desc,
+                                               QtCore.QVariant(outlier_filter))
+            self.UI_outlier_filter.currentIndexChanged[int].connect(
+                self.on_outlier_filter_change
+            )
+            outliersT.addWidget(self.UI_outlier_filter)
 
         def create_reports():
             """Create the reports list."""
@@ -295,7 +330,10 @@ class Viewer(QtGui.QMainWindow):
         """Load Qt settings."""
         settings = QtCore.QSettings("HPAC", "ELAPS:Viewer")
         state = eval(str(settings.value("state", type=str)), {})
-        self.stats_showing, self.metric_showing, self.discard_firstrep = state
+        self.stats_showing, self.metric_showing, self.discard_firstrep = \
+            state[:3]
+        if len(state) == 5:
+            self.discard_warmup, self.outlier_filter = state[3:]
         self.UI_setting += 1
         self.restoreGeometry(settings.value("geometry",
                                             type=QtCore.QByteArray))
@@ -355,10 +393,6 @@ class Viewer(QtGui.QMainWindow):
                 self.alert("ERROR: Can't load %r" % filename)
             return
 
-        # check if truncated
-        if report.truncated:
-            self.truncated_timer.start()
-
         # add counters
         for counter_name in report.experiment.papi_counters:
             counter_info = self.papi_names[counter_name]
@@ -382,6 +416,7 @@ class Viewer(QtGui.QMainWindow):
         if index is None:
             self.UI_reports.setCurrentItem(UI_report)
         self.UI_setting -= 1
+        self.truncated_watch()
 
         return UI_report
 
@@ -393,6 +428,22 @@ class Viewer(QtGui.QMainWindow):
             self.UI_reports.indexOfTopLevelItem(UI_report)
         )
         self.UI_setting -= 1
+        self.truncated_watch()
+
+    def truncated_watch(self):
+        """Watch the files of all truncated reports."""
+        paths = []
+        polled = []
+        for UI_report in self.UI_reportitems():
+            report = UI_report.report
+            if not report.truncated:
+                continue
+            if report.experiment.sampler["backend_name"] == "local":
+                paths.append(UI_report.filename)
+            else:
+                # remote file systems don't notify about changes
+                polled.append(UI_report.filename)
+        self.truncated_watcher.watch(paths, polled)
 
     def report_reload(self, UI_report, UI_alert=False, log=True):
         """Reload a report."""
@@ -409,6 +460,16 @@ class Viewer(QtGui.QMainWindow):
         if log:
             self.log("Reloaded %r" % UI_report.filename)
 
+    def report_discard(self, report):
+        """Discard warm-up (or first) repetitions and outliers as selected."""
+        if self.discard_warmup:
+            report = report.discard_warmup()
+        elif self.discard_firstrep:
+            report = report.discard_first_repetitions()
+        if self.outlier_filter:
+            report = report.filter_outliers(self.outlier_filter)
+        return report
+
     # PlayMat
     def playmat_start(self, filename=None):
         """Start the PlayMat."""
@@ -427,6 +488,8 @@ class Viewer(QtGui.QMainWindow):
         self.UI_metric_set()
         self.UI_stats_set()
         self.UI_discard_firstrep_set()
+        self.UI_discard_warmup_set()
+        self.UI_outlier_filter_set()
         self.UI_reports_set()
         self.UI_info_set()
         self.UI_plot_set()
@@ -461,6 +524,22 @@ class Viewer(QtGui.QMainWindow):
         self.UI_discard_firstrep.setChecked(self.discard_firstrep)
         self.UI_setting -= 1
 
+    def UI_discard_warmup_set(self):
+        """Set UI element: discard_warmup."""
+        self.UI_setting += 1
+        self.UI_discard_warmup.setChecked(self.discard_warmup)
+        self.UI_setting -= 1
+
+    def UI_outlier_filter_set(self):
+        """Set UI element: outlier_filter."""
+        self.UI_setting += 1
+        self.UI_outlier_filter.setCurrentIndex(
+            self.UI_outlier_filter.findData(
+                QtCore.QVariant(self.outlier_filter or "")
+            )
+        )
+        self.UI_setting -= 1
+
     def UI_reports_set(self):
         """Set UI element: reports."""
         self.UI_setting += 1
@@ -475,7 +554,21 @@ class Viewer(QtGui.QMainWindow):
         current = self.UI_reports.currentItem()
         if current:
             self.UI_info.setWindowTitle("Report %s" % current.reportname)
-            self.UI_info.widget().setText(str(current.experiment))
+            info = str(current.experiment)
+            report = self.report_discard(current.report)
+            for removed, desc in (
+                (self.discard_warmup and report.reps_dropped,
+                 "discarded warm-up repetitions"),
+                (self.outlier_filter and report.outliers_removed,
+                 "removed outliers")
+            ):
+                if removed:
+                    info += "\n\n%s:\n" % desc
+                    info += "\n".join(
+                        "    %s: %d" % (range_val, removed[range_val])
+                        for range_val in report.range_vals
+                    )
+            self.UI_info.widget().setText(info)
         self.UI_info.setVisible(bool(current))
         self.UI_setting -= 1
 
@@ -496,8 +589,7 @@ class Viewer(QtGui.QMainWindow):
                 continue
             report = UI_report.report
             ex = report.experiment
-            if self.discard_firstrep:
-                report = report.discard_first_repetitions()
+            report = self.report_discard(report)
             if ex.range and ex.range_var not in range_vars:
                 range_vars.append(ex.range_var)
             for UI_item in UI_items:
@@ -531,8 +623,7 @@ class Viewer(QtGui.QMainWindow):
                 continue
             report = UI_report.report
             ex = report.experiment
-            if self.discard_firstrep:
-                report = report.discard_first_repetitions()
+            report = self.report_discard(report)
             range_vals |= set(ex.range_vals)
             for UI_item in UI_items:
                 if UI_item.showing:
@@ -555,7 +646,11 @@ class Viewer(QtGui.QMainWindow):
         self.UI_table.setVerticalHeaderLabels(map(str, range_vals))
         for row, range_val in enumerate(range_vals):
             for col, (label, stat, data) in enumerate(table_data):
-                val = str(data.get(range_val, float("NaN")))
+                val = data.get(range_val, float("NaN"))
+                if isinstance(val, tuple):
+                    # interval
+                    val = " .. ".join(map(str, val))
+                val = str(val)
                 self.UI_table.setItem(row, col, QtGui.QTableWidgetItem(val))
 
         self.UI_setting -= 1
@@ -581,17 +676,35 @@ class Viewer(QtGui.QMainWindow):
         settings = QtCore.QSettings("HPAC", "ELAPS:Viewer")
         settings.setValue("geometry", self.saveGeometry())
         settings.setValue("windowState", self.saveState())
-        state = self.stats_showing, self.metric_showing, self.discard_firstrep
+        state = (self.stats_showing, self.metric_showing,
+                 self.discard_firstrep, self.discard_warmup,
+                 self.outlier_filter)
         settings.setValue("state", repr(state))
 
-    @pyqtSlot()
-    def on_truncated_timer(self):
-        """Event: truncated report timer."""
-        self.truncated_timer.stop()
+    @pyqtSlot(str)
+    def on_truncated_changed(self, path):
+        """Event: truncated report file changed."""
+        path = str(path)
+        updated = False
         for UI_report in self.UI_reportitems():
-            if UI_report.report.truncated:
+            report = UI_report.report
+            if (not report.truncated or
+                    os.path.abspath(UI_report.filename) != path):
+                continue
+            try:
+                rangeidxs = elaps.io.update_report(report, UI_report.filename)
+            except:
+                rangeidxs = None
+            if rangeidxs is None:
+                # file was replaced
                 self.report_reload(UI_report, log=False)
-        self.UI_setall()
+            elif not rangeidxs and report.truncated:
+                # no new results
+                continue
+            updated = True
+        self.truncated_watch()
+        if updated:
+            self.UI_setall()
 
     @pyqtSlot()
     def on_playmat_start(self):
@@ -630,6 +743,27 @@ class Viewer(QtGui.QMainWindow):
         self.UI_plot_set()
         self.UI_table_set()
 
+    @pyqtSlot(bool)
+    def on_discard_warmup_toggle(self, checked):
+        """Event: discard_warmup toggled."""
+        if self.UI_setting:
+            return
+        self.discard_warmup = checked
+        self.UI_info_set()
+        self.UI_plot_set()
+        self.UI_table_set()
+
+    @pyqtSlot(int)
+    def on_outlier_filter_change(self, index):
+        """Event: outlier_filter changed."""
+        if self.UI_setting:
+            return
+        outlier_filter = self.UI_outlier_filter.itemData(index)
+        self.outlier_filter = str(outlier_filter.toString()) or None
+        self.UI_info_set()
+        self.UI_plot_set()
+        self.UI_table_set()
+
     def on_reports_keypress(self, event):
         """Event: key pressed."""
         if event.key() in (QtCore.Qt.Key_Backspace, QtCore.Qt.Key_Delete):
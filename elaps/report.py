@@ -2,28 +2,204 @@
 
 from __future__ import division
 
-from math import sqrt
 from collections import Iterable
+from numbers import Number
+from itertools import chain, islice
 from copy import deepcopy
 
+import numpy as np
+
 from elaps import signature
-from elaps.experiment import Experiment
-
-stat_funs = {
-    "min": min,
-    "med": lambda l: (sum(sorted(l)[((len(l) - 1) // 2):(len(l) // 2 + 1)]) /
-                      (2 - len(l) % 2)),
-    "max": max,
-    "avg": lambda l: sum(l) / len(l),
-    "std": lambda l: sqrt(max(sum(x ** 2 for x in l) / len(l) -
-                              (sum(l) / len(l)) ** 2, 0)),
+from elaps.experiment import Experiment, RangesTable
+from elaps.sketch import Summary
+
+
+def trimmed_mean(values, proportion=.1):
+    """Mean of each row without the lowest and highest proportion."""
+    counts = (~np.isnan(values)).sum(axis=1)
+    ordered = np.sort(values, axis=1)
+    cut = (proportion * counts).astype(int)
+    cols = np.arange(values.shape[1])
+    keep = (cols >= cut[:, None]) & (cols < (counts - cut)[:, None])
+    return np.where(keep, ordered, 0).sum(axis=1) / keep.sum(axis=1)
+
+
+def median_abs_deviation(values):
+    """Median absolute deviation from the median of each row."""
+    medians = np.nanmedian(values, axis=1)
+    return np.nanmedian(abs(values - medians[:, None]), axis=1)
+
+
+def bootstrap_ci(values, level=.95, nsamples=1000, batchsize=1 << 20):
+    """Bootstrap confidence interval for the mean of each row.
+
+    Returns an array [row, 2] of lower and upper bounds.  The resampling is
+    seeded, i.e., the intervals are reproducible.  The rows are resampled one
+    at a time in batches of about batchsize values.
+    """
+    random = np.random.RandomState(0)
+    tail = 50 * (1 - level)
+    result = np.full((len(values), 2), np.nan)
+    for row, row_values in enumerate(values):
+        row_values = row_values[~np.isnan(row_values)]
+        count = len(row_values)
+        if not count:
+            continue
+        batch = max(1, batchsize // count)
+        means = np.concatenate([
+            row_values[random.randint(
+                0, count, (min(batch, nsamples - start), count)
+            )].mean(axis=1)
+            for start in range(0, nsamples, batch)
+        ])
+        result[row] = np.percentile(means, [tail, 100 - tail])
+    return result
+
+
+def mser(values, batchsize=5):
+    """Warm-up length of a series by the MSER-m truncation rule.
+
+    The series is averaged in batches of batchsize values (fewer for short
+    series); the truncation point minimizes the squared standard error of
+    the remaining batch means and is at most half of the series.
+    """
+    values = np.asarray(values, dtype=float)
+    batchsize = max(1, min(batchsize, len(values) // 10))
+    nbatches = len(values) // batchsize
+    if nbatches < 2:
+        return 0
+    means = values[:nbatches * batchsize].reshape(nbatches, -1).mean(axis=1)
+    # sums over the remaining batch means for each truncation point
+    sums = np.cumsum(means[::-1])[::-1]
+    sqsums = np.cumsum(means[::-1] ** 2)[::-1]
+    counts = np.arange(nbatches, 0, -1)
+    errors = (sqsums - sums ** 2 / counts) / counts ** 2
+    return int(np.argmin(errors[:nbatches // 2 + 1])) * batchsize
+
+
+def iqr_outliers(values, factor=1.5):
+    """Values outside each row's interquartile range fences (Tukey)."""
+    p25, p75 = np.nanpercentile(values, [25, 75], axis=1)[:, :, None]
+    fence = factor * (p75 - p25)
+    with np.errstate(invalid="ignore"):
+        return (values < p25 - fence) | (values > p75 + fence)
+
+
+def mad_outliers(values, threshold=3.5):
+    """Values whose modified z-score (by the row's MAD) exceeds threshold."""
+    medians = np.nanmedian(values, axis=1)[:, None]
+    mads = median_abs_deviation(values)[:, None]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        scores = .6745 * abs(values - medians) / mads
+        return (mads > 0) & (scores > threshold)
+
+
+def top_outliers(values, percent=5):
+    """The largest percent of each row's values."""
+    counts = (~np.isnan(values)).sum(axis=1)
+    ntop = (percent / 100 * counts).astype(int)
+    # ranks with missing values last
+    ranks = np.argsort(np.argsort(values, axis=1, kind="mergesort"), axis=1)
+    return ~np.isnan(values) & (ranks >= (counts - ntop)[:, None])
+
+
+# outlier filters over the rows of float arrays [rangeidx, rep] (NaN: missing)
+outlier_filters = {
+    "iqr": iqr_outliers,
+    "mad": mad_outliers,
+    "top": top_outliers,
+}
+
+
+# statistics over the rows of float arrays [rangeidx, rep] (NaN: missing)
+stat_arrays = {
+    "min": lambda x: np.nanmin(x, axis=1),
+    "med": lambda x: np.nanmedian(x, axis=1),
+    "max": lambda x: np.nanmax(x, axis=1),
+    "avg": lambda x: np.nanmean(x, axis=1),
+    "std": lambda x: np.nanstd(x, axis=1),
+    "p5": lambda x: np.nanpercentile(x, 5, axis=1),
+    "p25": lambda x: np.nanpercentile(x, 25, axis=1),
+    "p75": lambda x: np.nanpercentile(x, 75, axis=1),
+    "p95": lambda x: np.nanpercentile(x, 95, axis=1),
+    "p99": lambda x: np.nanpercentile(x, 99, axis=1),
+    "tmean": trimmed_mean,
+    "mad": median_abs_deviation,
+    "ci": bootstrap_ci,
+}
+
+
+def stat_array(stat, values):
+    """Apply a named statistic to each row of a masked array [rangeidx, rep].
+
+    Returns a list with one result per row (None for rows without values).
+    Minima, medians, and maxima of integers are integers where possible.
+    """
+    values = np.ma.asarray(values)
+    mask = np.ma.getmaskarray(values)
+    if values.dtype == object:
+        integral = np.vectorize(lambda v: isinstance(v, (int, long)),
+                                otypes=[bool])(values.data)
+        integral = (integral | mask).all(axis=1)
+    else:
+        integral = np.broadcast_to(values.dtype.kind in "iu", mask.shape[:1])
+    floats = np.where(mask, np.nan, values.filled(0).astype(float))
+
+    rows = ~mask.all(axis=1)
+    results = len(rows) * [None]
+    stat_vals = stat_arrays[stat](floats[rows]).tolist()
+    for rowid, value in zip(np.flatnonzero(rows), stat_vals):
+        if isinstance(value, list):
+            value = tuple(value)
+        elif (stat in ("min", "med", "max") and integral[rowid] and
+              value % 1 == 0):
+            value = int(value)
+        results[rowid] = value
+    return results
+
+
+# statistics available from quantile sketches (streaming mode)
+stat_quantiles = {
+    "min": 0, "p5": .05, "p25": .25, "med": .5, "p75": .75, "p95": .95,
+    "p99": .99, "max": 1
+}
+
+# statistics available from running moments (streaming mode, linear metrics)
+stat_moments = ("avg", "std")
+
+
+stat_funs = dict(
+    (name, lambda l, name=name: stat_array(name, [l])[0])
+    for name in stat_arrays
+)
+stat_funs.update({
     "all": lambda l: l,
     None: lambda l: l
-}
+})
 
 
 def apply_stat(stat, data):
     """Apply a statistic to the data."""
+    if stat in stat_arrays:
+        # named, vectorized
+        if isinstance(data, dict):
+            if not all(isinstance(values, Iterable) and
+                       not isinstance(values, dict)
+                       for values in data.values()):
+                return dict((key, apply_stat(stat, values))
+                            for key, values in data.items())
+            # all lists at once
+            keys = list(data)
+            rows = [list(data[key]) for key in keys]
+            maxlen = max(map(len, rows)) if rows else 0
+            values = np.ma.masked_all((len(rows), maxlen), dtype=object)
+            for rowid, row in enumerate(rows):
+                values[rowid, :len(row)] = row
+            return dict(zip(keys, stat_array(stat, values)))
+        if isinstance(data, Iterable):
+            return stat_funs[stat](list(data))
+        return stat_funs[stat]([data])
+
     if stat in stat_funs:
         # named
         stat = stat_funs[stat]
@@ -47,32 +223,549 @@ def apply_stat(stat, data):
     return stat([data])
 
 
+# character classes in report lines: whitespace, digits, and signs
+char_table = np.zeros((3, 256), dtype=bool)
+char_table[0, map(ord, " \t\n\r\v\f")] = True
+char_table[1, map(ord, "0123456789")] = True
+char_table[2, map(ord, "+-")] = True
+
+
+def parse_ints(lines, count):
+    """Parse lines containing count ints each.
+
+    lines are either strings (from a report file) or sequences of values.
+
+    Returns a boolean array indicating the valid lines and an int64 array
+    [valid line, count] of their values.
+    """
+    if not lines or not isinstance(lines[0], basestring):
+        # sequences of values
+        valid = np.array([
+            len(line) == count and
+            all(isinstance(value, (int, long)) for value in line)
+            for line in lines
+        ], dtype=bool)
+        values = [line for line, line_valid in zip(lines, valid) if line_valid]
+        return valid, np.array(values, dtype=np.int64).reshape(-1, count)
+
+    # text lines
+    text = "".join(lines)
+    if text.count("\n") != len(lines) - (text[-1:] != "\n"):
+        lines = [line.rstrip("\n") + "\n" for line in lines]
+        text = "".join(lines)
+    chars = np.frombuffer(text, dtype=np.uint8)
+    space, digit, sign = char_table[:, chars]
+    newlines = np.flatnonzero(chars == ord("\n"))
+    lineids = np.zeros(len(chars), dtype=int)
+    lineids[newlines[:len(lines) - 1] + 1] = 1
+    lineids = np.cumsum(lineids)
+
+    # tokens
+    starts = ~space
+    starts[1:] &= space[:-1]
+    nexts = np.append(digit[1:], False)
+    bad = ~(space | digit | (sign & starts & nexts))
+    counts = np.bincount(lineids[starts], minlength=len(lines))
+    badlines = np.bincount(lineids[bad], minlength=len(lines)) > 0
+    valid = (counts == count) & ~badlines
+    if not valid.all():
+        text = "".join(line for line, line_valid in zip(lines, valid)
+                       if line_valid)
+    values = np.fromstring(text, dtype=np.int64, sep=" ") if text.strip() \
+        else np.zeros(0, dtype=np.int64)
+    return valid, values.reshape(-1, count)
+
+
+def incomplete(line):
+    """Check if a report file line is incomplete (no trailing newline)."""
+    return isinstance(line, basestring) and not line.endswith("\n")
+
+
+def index_slice(idxs, length):
+    """Convert a list of indices into an equivalent slice (if possible).
+
+    Slices index NumPy arrays without copying; irregular indices are returned
+    as a list.
+    """
+    idxs = np.arange(length)[idxs].tolist()
+    if not idxs:
+        return slice(0, 0)
+    if len(idxs) == 1:
+        return slice(idxs[0], idxs[0] + 1)
+    steps = set(np.diff(idxs).tolist())
+    if len(steps) != 1 or 0 in steps:
+        return idxs
+    step = steps.pop()
+    stop = idxs[-1] + step
+    return slice(idxs[0], stop if stop >= 0 else None, step)
+
+
+def vectorize_metric(metric):
+    """Wrap a scalar metric in the vectorized metric interface.
+
+    Vectorized metrics (marked by metric.vectorized = True) receive masked
+    arrays [rangeidx, rep] and return such an array.
+    """
+    if getattr(metric, "vectorized", False):
+        return metric
+
+    def vectorized_metric(data, nthreads, **kwargs):
+        keys = [key for key, value in data.items() if value is not None]
+        arrays = [np.ma.asarray(data[key]) for key in keys]
+        shape = np.broadcast(*arrays).shape
+        values = [np.broadcast_to(array.data, shape).tolist()
+                  for array in arrays]
+        masks = [np.broadcast_to(np.ma.getmaskarray(array), shape).tolist()
+                 for array in arrays]
+        nthreads = np.broadcast_to(nthreads, shape).tolist()
+
+        result = np.ma.masked_all(shape, dtype=object)
+        for idx in np.ndindex(*shape):
+            idx_data = dict((key, None) for key in data)
+            for key, key_values, key_mask in zip(keys, values, masks):
+                for i in idx:
+                    key_values = key_values[i]
+                    key_mask = key_mask[i]
+                if not key_mask:
+                    idx_data[key] = key_values
+            if all(value is None for value in idx_data.values()):
+                continue
+            idx_nthreads = nthreads
+            for i in idx:
+                idx_nthreads = idx_nthreads[i]
+            try:
+                metric_val = metric(idx_data, nthreads=idx_nthreads, **kwargs)
+            except:
+                continue
+            if metric_val is not None:
+                result[idx] = metric_val
+        return result
+    vectorized_metric.vectorized = True
+    vectorized_metric.name = getattr(metric, "name", None)
+    vectorized_metric.__doc__ = metric.__doc__
+    return vectorized_metric
+
+
+def vectorize_selector(selector):
+    """Wrap a scalar call selector in the vectorized selector interface.
+
+    Vectorized selectors (marked by selector.vectorized = True) receive a list
+    of masked arrays [rangeidx, rep] (one per call, None if not available) or,
+    for parallel calls, a single such array and return such an array.
+    """
+    if getattr(selector, "vectorized", False):
+        return selector
+
+    def vectorized_selector(data):
+        islist = isinstance(data, list)
+        arrays = data if islist else [data]
+        nargs = len(arrays)
+        keys = [key for key, array in enumerate(arrays) if array is not None]
+        if not keys:
+            return None
+        arrays = [np.ma.asarray(arrays[key]) for key in keys]
+        shape = np.broadcast(*arrays).shape
+        values = [np.broadcast_to(array.data, shape).tolist()
+                  for array in arrays]
+        masks = [np.broadcast_to(np.ma.getmaskarray(array), shape).tolist()
+                 for array in arrays]
+
+        result = np.ma.masked_all(shape, dtype=object)
+        for idx in np.ndindex(*shape):
+            idx_data = nargs * [None]
+            for key, key_values, key_mask in zip(keys, values, masks):
+                for i in idx:
+                    key_values = key_values[i]
+                    key_mask = key_mask[i]
+                if not key_mask:
+                    idx_data[key] = key_values
+            if all(value is None for value in idx_data):
+                continue
+            try:
+                selector_val = selector(idx_data if islist else idx_data[0])
+            except:
+                continue
+            if selector_val is not None:
+                result[idx] = selector_val
+
+        # numeric results as numeric arrays
+        mask = np.ma.getmaskarray(result)
+        values = np.array(result.filled(0).tolist())
+        if values.shape == shape and values.dtype.kind in "biuf":
+            return np.ma.array(values, mask=mask)
+        return result
+    vectorized_selector.vectorized = True
+    return vectorized_selector
+
+
+class Slots(object):
+
+    """Positions of the measurements in the Sampler's output order.
+
+    The positions index the flattened measurement array [..., counterid];
+    they are computed on demand for slices of the output.
+    """
+
+    def __init__(self, shape, nreps, sumrange_lens, shuffle):
+        """Set up the positions for the given measurement array layout."""
+        self.nreps_max = shape[1]
+        self.nreps = np.array(nreps, dtype=int)
+        self.blocksize = shape[2] * shape[3]
+        self.shuffle = shuffle
+
+        # results for each (range value, repetition)
+        self.inner = np.array(sumrange_lens, dtype=int) * shape[3]
+        if shuffle:
+            # repetitions outermost
+            self.offsets = np.cumsum([0] + self.inner.tolist())
+            self.length = nreps[0] * self.offsets[-1] if nreps else 0
+        else:
+            self.offsets = np.cumsum(
+                [0] + (np.array(nreps, dtype=int) * self.inner).tolist()
+            )
+            self.length = self.offsets[-1]
+        self.length = int(self.length)
+
+    def __len__(self):
+        """Number of measurements."""
+        return self.length
+
+    def __getitem__(self, index):
+        """Positions for a slice of the output."""
+        idxs = np.arange(*index.indices(self.length))
+        if self.shuffle:
+            reps, local = np.divmod(idxs, self.offsets[-1])
+            rangeidxs = np.searchsorted(self.offsets, local, "right") - 1
+            local -= self.offsets[rangeidxs]
+        else:
+            rangeidxs = np.searchsorted(self.offsets, idxs, "right") - 1
+            reps, local = np.divmod(idxs - self.offsets[rangeidxs],
+                                    self.inner[rangeidxs])
+        return ((rangeidxs * self.nreps_max + reps) * self.blocksize +
+                local)
+
+
 class Report(object):
 
     """ELAPS:Report, result of an ELAPS:Experiment."""
 
-    def __init__(self, experiment, rawdata, fulldata=None, data=None):
-        """Initialize report."""
+    def __init__(self, experiment, rawdata=None, fulldata=None, data=None,
+                 lines=None, streaming=False, discard_first_repetitions=False):
+        """Initialize report.
+
+        The measurements are given either as rawdata (a list of lists of
+        values) or as lines (an iterable of report file lines, parsed without
+        keeping them).  With streaming, only summaries of the measurements
+        are kept (see values_summarize()); discard_first_repetitions then
+        leaves the first repetitions out of the summaries.
+        """
         if not isinstance(experiment, Experiment):
             raise TypeError("first argument must be Experiment (not %s)" %
                             type(experiment).__name__)
         self.experiment = experiment
         self.first_repetitions_discarded = None
-        try:
-            self.rawdata = tuple(map(tuple, rawdata))
-        except:
-            raise TypeError("invalid rawdata format")
+        self._views = {}
+        if lines is None:
+            try:
+                rawdata = tuple(map(tuple, rawdata))
+            except:
+                raise TypeError("invalid rawdata format")
+            lines = rawdata
+        else:
+            rawdata = None
+        self.values_fromlines(lines, streaming=streaming,
+                              discard_first_repetitions=(
+                                  discard_first_repetitions))
+        if rawdata is not None and not streaming:
+            self.rawdata = rawdata
         if fulldata:
             self.fulldata = fulldata
-        else:
-            self.fulldata_fromraw()
         if data:
             self.data = data
+
+    @property
+    def rawdata(self):
+        """Raw measurement values (generated on first access)."""
+        self.values_check()
+        if self._rawdata is None:
+            self._rawdata = self.rawdata_fromvalues()
+        return self._rawdata
+
+    @rawdata.setter
+    def rawdata(self, value):
+        """Set the raw measurement values."""
+        self._rawdata = value
+
+    @property
+    def fulldata(self):
+        """Nested fulldata structure (generated on first access)."""
+        self.values_check()
+        if self._fulldata is None:
+            self._fulldata = self.fulldata_fromvalues()
+        return self._fulldata
+
+    @fulldata.setter
+    def fulldata(self, value):
+        """Set the fulldata structure."""
+        self._fulldata = value
+
+    @property
+    def data(self):
+        """Nested reduced data structure (generated on first access)."""
+        self.values_check()
+        if self._data is None:
+            self._data = self.data_fromvalues()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        """Set the reduced data structure."""
+        self._data = value
+
+    def values_check(self):
+        """Ensure that the measurement arrays are kept (no streaming)."""
+        if self.streaming:
+            raise ValueError("Report only keeps summaries (streaming mode)")
+
+    def values_layout(self):
+        """Initialize the ranges and compute the measurement array layout.
+
+        Returns the array shape and the positions (in the flattened array
+        [..., counterid]) of the measurements in the Sampler's output order.
+        """
+        ex = self.experiment
+        self.counters = tuple(map(intern, ["cycles"] + ex.papi_counters))
+
+        # range and sumrange values
+        table = RangesTable(ex)
+        self.range_vals = table.range_vals
+        self.sumrange_vals = map(tuple, table.sumrange_vals)
+        if ex.shuffle:
+            nreps = len(self.range_vals) * [ex.nreps_at(None)]
+        else:
+            nreps = table.range_array(ex.nreps).tolist()
+
+        # array shape
+        if ex.sumrange_parallel:
+            sumrange_lens = len(self.range_vals) * [1]
         else:
-            self.data_fromfull()
+            sumrange_lens = map(len, self.sumrange_vals)
+        ncalls = len(ex.calls)
+        if ex.sumrange_parallel or ex.calls_parallel:
+            ncalls = 1
+        nreps_max = max(nreps) if nreps else 0
+        nsumrange = max(sumrange_lens) if sumrange_lens else 0
+        shape = (len(self.range_vals), nreps_max, nsumrange, ncalls,
+                 len(self.counters))
 
-    def fulldata_fromraw(self):
-        """Initialize fulldata from rawdata.
+        return shape, Slots(shape, nreps, sumrange_lens, ex.shuffle)
+
+    def values_fromlines(self, lines, chunksize=1 << 16, streaming=False,
+                         discard_first_repetitions=False):
+        """Initialize the measurement arrays from rawdata or report lines.
+
+        values is a masked array indexed by
+            [rangeidx, rep, sumrangeidx, callid, counterid]
+        Measurements missing from (truncated) rawdata are masked.
+
+        With calls_parallel, the call axis has length 1; with
+        sumrange_parallel, the sumrange and call axes have length 1.
+
+        With streaming, values is None and summaries is an array of
+        Summary objects indexed by [rangeidx, callid, counterid], where
+        callid -1 stands for the sum of all calls.  discard_first_repetitions
+        leaves each range value's first repetition (if there are several) out
+        of the summaries; reps_dropped holds the numbers of left out
+        repetitions.
+        """
+        shape, slots = self.values_layout()
+        self.streaming = streaming
+        if streaming:
+            self.values = None
+            self.summaries = np.empty((shape[0], shape[3] + 1, shape[4]),
+                                      dtype=object)
+            for idx in np.ndindex(*self.summaries.shape):
+                self.summaries[idx] = Summary()
+            self.pending = {}
+        else:
+            self.values = np.ma.MaskedArray(np.zeros(shape, dtype=np.int64),
+                                            np.ones(shape, dtype=bool))
+        self.rawvalues = self.values
+        self.error = False
+        self.truncated = True
+        self.starttime = None
+        self.endtime = None
+        self.nfilled = 0
+        self.base = None
+        self.selection = None
+        self.reps_dropped = None
+        self.outliers_removed = None
+        if streaming:
+            skipped = discard_first_repetitions & (slots.nreps > 1)
+            self.first_reps_skipped = skipped
+            if discard_first_repetitions:
+                self.reps_dropped = dict(zip(self.range_vals,
+                                             skipped.astype(int).tolist()))
+
+        # views are generated when needed
+        self._rawdata = None
+        self._fulldata = None
+        self._data = None
+        self._evaluations = {}
+
+        self.append_lines(lines, chunksize, slots)
+
+    def append_lines(self, lines, chunksize=1 << 16, slots=None):
+        """Continue parsing a truncated report with further lines.
+
+        The lines are processed in chunks of chunksize; invalid lines are
+        skipped (setting error).  A report file line without trailing
+        newline is incomplete (still being written) and ends the parsing,
+        unless it is the endtime: once all measurements are read, the file's
+        last line is complete even without newline.
+
+        Returns the indices of the range values with new measurements.
+        """
+        if not self.truncated:
+            return []
+        if self.base is not None:
+            raise ValueError("Cannot append lines to a Report view")
+        if slots is None:
+            slots = self.values_layout()[1]
+        nvalues = len(self.counters)
+        if not self.streaming:
+            flatdata = self.values.data.reshape(-1, nvalues)
+            flatmask = self.values.mask.reshape(-1, nvalues)
+        lines = iter(lines)
+        self.truncated = False
+
+        def getint(final=False):
+            """Get the next valid line with a single int."""
+            for line in lines:
+                if incomplete(line) and not final:
+                    break
+                valid, values = parse_ints([line], 1)
+                if valid[0]:
+                    return int(values[0, 0])
+                self.error = True
+            self.truncated = True
+            return None
+
+        if self.starttime is None:
+            self.starttime = getint()
+
+        # measurements
+        nfilled = self.nfilled
+        while nfilled < len(slots) and not self.truncated:
+            chunk = list(islice(lines, chunksize))
+            pending = chunk[-1:] if chunk and incomplete(chunk[-1]) else []
+            chunk = chunk[:len(chunk) - len(pending)]
+            if not chunk:
+                self.truncated = True
+                break
+            valid, values = parse_ints(chunk, nvalues)
+            values = values[:len(slots) - nfilled]
+            positions = slots[nfilled:nfilled + len(values)]
+            if self.streaming:
+                self.values_summarize(positions, values, slots)
+            else:
+                flatdata[positions] = values
+                flatmask[positions] = False
+            nfilled += len(values)
+            if nfilled == len(slots):
+                # the remaining lines contain the endtime
+                last = np.flatnonzero(valid)[len(values) - 1]
+                self.error |= not valid[:last + 1].all()
+                lines = chain(chunk[last + 1:], pending, lines)
+            else:
+                self.error |= not valid.all()
+                self.truncated |= bool(pending)
+
+        if not self.truncated:
+            self.endtime = getint(final=True)
+
+        # range values with new measurements
+        rangeidxs = np.unique(slots[self.nfilled:nfilled] //
+                              (slots.nreps_max * slots.blocksize)).tolist()
+        self.nfilled = nfilled
+
+        # update views
+        if nfilled:
+            self._rawdata = None
+            self._evaluations = {}
+            self.first_repetitions_discarded = None
+            self._views = {}
+        if rangeidxs and self._fulldata is not None:
+            self._fulldata.update(self.fulldata_fromvalues(rangeidxs))
+        if rangeidxs and self._data is not None:
+            self._data.update(self.data_fromvalues(rangeidxs))
+        return rangeidxs
+
+    def values_summarize(self, positions, values, slots):
+        """Add measurements to the summaries (streaming mode).
+
+        The summaries are fed with each repetition's measurements (summed
+        over the sumrange) once they are complete.
+        """
+        ncalls = self.summaries.shape[1] - 1
+        blocks, local = np.divmod(positions, slots.blocksize)
+        ublocks, inverse = np.unique(blocks, return_inverse=True)
+        sums = np.zeros((len(ublocks), ncalls, values.shape[1]),
+                        dtype=np.int64)
+        np.add.at(sums, (inverse, local % ncalls), values)
+        counts = np.bincount(inverse, minlength=len(ublocks))
+
+        # repetitions continued from earlier lines
+        for block in list(self.pending):
+            idx = np.searchsorted(ublocks, block)
+            if idx < len(ublocks) and ublocks[idx] == block:
+                block_sums, block_count = self.pending.pop(block)
+                sums[idx] += block_sums
+                counts[idx] += block_count
+
+        rangeidxs = ublocks // slots.nreps_max
+        complete = counts == slots.inner[rangeidxs]
+        for idx in np.flatnonzero(~complete):
+            self.pending[ublocks[idx]] = sums[idx], counts[idx]
+
+        # discarded first repetitions
+        complete &= ~((ublocks % slots.nreps_max == 0) &
+                      self.first_reps_skipped[rangeidxs])
+
+        # complete repetitions
+        for rangeidx in np.unique(rangeidxs[complete]):
+            rep_sums = sums[complete & (rangeidxs == rangeidx)]
+            rep_sums = np.concatenate(
+                [rep_sums, rep_sums.sum(axis=1)[:, None]], axis=1
+            )
+            for idx in np.ndindex(*self.summaries.shape[1:]):
+                self.summaries[(rangeidx,) + idx].update(rep_sums[(Ellipsis,) +
+                                                                  idx])
+
+    def rawdata_fromvalues(self):
+        """Generate rawdata from the measurement arrays (without errors)."""
+        if self.base is not None:
+            return self.base.rawdata
+        shape, slots = self.values_layout()
+        flatvalues = self.rawvalues.reshape(-1, shape[-1])
+        slots = slots[:]
+        slots = slots[~np.ma.getmaskarray(flatvalues)[slots, 0]]
+        rawdata = [] if self.starttime is None else [(self.starttime,)]
+        rawdata += map(tuple, flatvalues.data[slots].tolist())
+        if self.endtime is not None:
+            rawdata.append((self.endtime,))
+        return tuple(rawdata)
+
+    def reps_present(self):
+        """Boolean array [rangeidx, rep]: any measurement present."""
+        self.values_check()
+        return ~np.ma.getmaskarray(self.values)[..., 0].all(axis=(2, 3))
+
+    def fulldata_fromvalues(self, rangeidxs=None):
+        """Generate fulldata from the measurement arrays.
+
+        If rangeidxs is given, only the entries for these range values are
+        generated.
 
         Structure of fulldata (no parallelism):
          -> dict[range_value | None]
@@ -93,84 +786,136 @@ class Report(object):
          -> tuple[counterid]
         """
         ex = self.experiment
-        self.error = False
-        self.truncated = False
+        if rangeidxs is None:
+            rangeidxs = range(len(self.range_vals))
+        rangeidxs = np.asarray(rangeidxs, dtype=int)
+        values = self.values.data[rangeidxs].tolist()
+        mask = np.ma.getmaskarray(self.values)[rangeidxs, ..., 0].tolist()
 
-        def getints(count, iterator=iter(self.rawdata)):
-            try:
-                values = next(iterator)
-            except StopIteration:
-                self.truncated = True
-                return None
-            try:
-                if (all(isinstance(value, int) for value in values) and
-                        len(values) == count):
-                    return tuple(values)
-            except:
-                pass
-            self.error = True
-            return getints(count)
+        fulldata = {}
+        for rangeidx, range_val_values, range_val_mask in zip(rangeidxs,
+                                                              values, mask):
+            range_val = self.range_vals[rangeidx]
+            range_val_fdata = []
+            for rep_values, rep_mask in zip(range_val_values, range_val_mask):
+                if ex.sumrange_parallel:
+                    # only one result per range_val
+                    if not rep_mask[0][0]:
+                        range_val_fdata.append(tuple(rep_values[0][0]))
+                    continue
 
-        self.starttime = None
-        values = getints(1)
-        if values is not None:
-            self.starttime = values[0]
+                # results for each sumrange iteration
+                rep_fdata = {}
+                for sumrange_val, sumrange_values, sumrange_mask in zip(
+                        self.sumrange_vals[rangeidx], rep_values, rep_mask):
+                    if ex.calls_parallel:
+                        # only one result per sumrange
+                        if not sumrange_mask[0]:
+                            rep_fdata[sumrange_val] = tuple(sumrange_values[0])
+                        continue
 
-        nvalues = len(ex.papi_counters) + 1
+                    # results for each call
+                    sumrange_val_fdata = tuple(
+                        tuple(call_values) for call_values, call_mask
+                        in zip(sumrange_values, sumrange_mask)
+                        if not call_mask
+                    )
+                    if sumrange_val_fdata:
+                        rep_fdata[sumrange_val] = sumrange_val_fdata
+                if rep_fdata:
+                    range_val_fdata.append(rep_fdata)
+            if range_val_fdata or ex.shuffle:
+                fulldata[range_val] = tuple(range_val_fdata)
+        return fulldata
 
-        def sumrange_fdata(range_val):
-            """Evaluate data for the sumrange."""
-            if ex.sumrange_parallel:
-                # only one result per range_val
-                return getints(nvalues) or None
-
-            # results for each sumrange iteration
-            fdata = {}
-            for sumrange_val in ex.sumrange_vals_at(range_val):
-                if ex.calls_parallel:
-                    # only one result per sumrange
-                    values = getints(nvalues)
-                    if values:
-                        fdata[sumrange_val] = values
-                    continue
+    def data_fromvalues(self, rangeidxs=None):
+        """Generate data from the measurement arrays.
 
-                # results for each call
-                sumrange_val_fdata = []
-                for call in ex.calls:
-                    # one result per call
-                    values = getints(nvalues)
-                    if values:
-                        sumrange_val_fdata.append(values)
-                if sumrange_val_fdata:
-                    fdata[sumrange_val] = tuple(sumrange_val_fdata)
+        If rangeidxs is given, only the entries for these range values are
+        generated.
 
-            return fdata
+        Structure of data (no parallelism):
+         -> dict[range_val]
+         -> tuple[rep]
+         -> list[call]
+         -> dict[counter]
 
-        # full structured data
-        self.fulldata = {}
-        if ex.shuffle:
-            fulldata = {k: [] for k in ex.range_vals}
-            for rep in range(ex.nreps_at(None)):
-                for range_val in ex.range_vals:
-                    range_val_fdata = sumrange_fdata(range_val)
-                    if range_val_fdata:
-                        fulldata[range_val].append(range_val_fdata)
-            self.fulldata = {k: tuple(v) for k, v in fulldata.iteritems()}
-        else:
-            for range_val in ex.range_vals:
-                # results for each repetition
-                range_val_fdata = []
-                for rep in range(ex.nreps_at(range_val)):
-                    rep_fdata = sumrange_fdata(range_val)
-                    if rep_fdata:
-                        range_val_fdata.append(rep_fdata)
-                if range_val_fdata:
-                    self.fulldata[range_val] = tuple(range_val_fdata)
+        Structure of data (calls_parallel or sumrange_parallel):
+         -> dict[range_val]
+         -> tuple[rep]
+         -> dict[counter]
+        """
+        ex = self.experiment
+        counters = self.counters
+        flops = self.flops()
 
-        self.endtime = None
-        values = getints(1)
-        if values is not None:
-            self.endtime = values[0]
+        if rangeidxs is None:
+            rangeidxs = range(len(self.range_vals))
+        rangeidxs = np.asarray(rangeidxs, dtype=int)
+
+        # sums over the sumrange
+        sums = self.values[rangeidxs].filled(0).sum(axis=2).tolist()
+        present = self.reps_present()[rangeidxs].tolist()
+
+        data = {}
+        for rangeidx, range_val_sums, range_val_present in zip(rangeidxs, sums,
+                                                               present):
+            range_val = self.range_vals[rangeidx]
+            if not any(range_val_present) and not ex.shuffle:
+                # missing range_val data
+                continue
+            range_val_flops = [call_flops[rangeidx] for call_flops in flops]
+            range_val_data = []
+            for rep_sums, rep_present in zip(range_val_sums,
+                                             range_val_present):
+                if not rep_present:
+                    continue
+                if ex.sumrange_parallel or ex.calls_parallel:
+                    # one result per repetition
+                    rep_data = dict(zip(counters, rep_sums[0]))
+                    if all(f is not None for f in range_val_flops):
+                        rep_data[intern("flops")] = sum(range_val_flops)
+                else:
+                    # one result per call
+                    rep_data = tuple(dict(zip(counters, call_sums))
+                                     for call_sums in rep_sums)
+                    for callid, call_flops in enumerate(range_val_flops):
+                        if call_flops is not None:
+                            rep_data[callid][intern("flops")] = call_flops
+                range_val_data.append(rep_data)
+            data[range_val] = tuple(range_val_data)
+        return data
+
+    def flops(self, sumrange=False):
+        """Flops for each call and range value (summed over the sumrange).
+
+        With sumrange, the flops are given for each range value and sumrange
+        value instead, in the order of evaluate_values()' rows (None for
+        missing sumrange values).
+        """
+        ex = self.experiment
+        table = RangesTable(ex, self.range_vals)
+        if not sumrange:
+            return [
+                table.range_sums(call.flops())
+                if isinstance(call, signature.Call)
+                else len(table.range_vals) * [None]
+                for call in ex.calls
+            ]
+        nsumrange = self.values.shape[2]
+        calls_flops = []
+        for call in ex.calls:
+            call_flops = len(table.range_vals) * nsumrange * [None]
+            if isinstance(call, signature.Call):
+                flops = table.array(call.flops()).tolist()
+                for rangeidx in range(len(table.range_vals)):
+                    for sumrangeidx, point in enumerate(
+                            table.points(rangeidx)):
+                        if isinstance(flops[point], Number):
+                            call_flops[rangeidx * nsumrange +
+                                       sumrangeidx] = flops[point]
+            calls_flops.append(call_flops)
+        return calls_flops
 
     def data_fromfull(self):
         """Initialize data from fulldata.
@@ -187,11 +932,14 @@ class Report(object):
          -> dict[counter]
         """
         ex = self.experiment
-        counters = map(intern, ["cycles"] + ex.papi_counters)
+        counters = self.counters
+
+        # flops for each call and range value (summed over the sumrange)
+        calls_flops = self.flops()
 
         # reduced data
         self.data = {}
-        for range_val in ex.range_vals:
+        for rangeidx, range_val in enumerate(self.range_vals):
             # results for each range value
             if range_val not in self.fulldata:
                 # missing full range_val data
@@ -199,21 +947,7 @@ class Report(object):
             range_val_fdata = self.fulldata[range_val]
 
             # flops evaluation
-            flops = len(ex.calls) * [0]
-            for sumrange_val in ex.sumrange_vals_at(range_val):
-                for callid, call in enumerate(ex.calls):
-                    if flops[callid] is None:
-                        continue
-                    if not isinstance(call, signature.Call):
-                        flops[callid] = None
-                        continue
-                    call_flops = next(ex.ranges_eval(
-                        call.flops(), range_val, sumrange_val
-                    ))
-                    if call_flops is None:
-                        flops[callid] = None
-                    else:
-                        flops[callid] += call_flops
+            flops = [call_flops[rangeidx] for call_flops in calls_flops]
 
             # get repetition data
             range_val_data = []
@@ -247,25 +981,181 @@ class Report(object):
                 range_val_data.append(rep_data)
             self.data[range_val] = tuple(range_val_data)
 
+    def __getstate__(self):
+        """Pickle the experiment and measurements (without the views)."""
+        if self.base is not None:
+            # views are pickled through their base
+            return {"base": self.base, "selection": self.selection}
+        return dict((key, getattr(self, key)) for key in (
+            "experiment", "values", "starttime", "endtime", "error",
+            "truncated"
+        ))
+
+    def __setstate__(self, state):
+        """Initialize from pickled measurements."""
+        if "base" in state:
+            name, args = state["selection"]
+            self.__dict__.update(getattr(state["base"], name)(*args).__dict__)
+            return
+        self.__dict__.update(state)
+        self.values_layout()
+        self.streaming = False
+        self.rawvalues = self.values
+        self.nfilled = int((~np.ma.getmaskarray(self.values)[..., 0]).sum())
+        self.base = None
+        self.selection = None
+        self.reps_dropped = None
+        self.outliers_removed = None
+        self.first_repetitions_discarded = None
+        self._views = {}
+        self._rawdata = None
+        self._fulldata = None
+        self._data = None
+        self._evaluations = {}
+
     def __repr__(self):
         """Python parsable representation."""
+        if self.base is not None:
+            # views are represented through their base (whose rawdata they
+            # share)
+            name, args = self.selection
+            return "%r.%s(%s)" % (self.base, name, ", ".join(map(repr, args)))
         return "%s(%r, %r)" % (type(self).__name__, self.experiment,
                                self.rawdata)
 
     def copy(self):
-        """Generate a copy."""
-        return Report(self.experiment, self.rawdata, self.fulldata, self.data)
+        """Generate a copy (sharing the measurement arrays)."""
+        report = Report.__new__(Report)
+        report.__dict__.update(self.__dict__)
+        report.first_repetitions_discarded = None
+        report._views = {}
+        report._evaluations = {}
+        return report
+
+    def evaluate_values(self, sumrange=False):
+        """Get the measurement arrays for evaluation and their row keys.
+
+        Returns the measurements (as values) and a key for each row: the range
+        values, or, with sumrange, (range value, sumrange value) for each
+        range value and sumrange index (None for missing sumrange values).
+        The sumrange is kept as an axis of length 1.
+        """
+        self.values_check()
+        if not sumrange:
+            return self.values, list(self.range_vals)
+        if self.experiment.sumrange_parallel:
+            raise ValueError("Cannot keep the sumrange of sumrange_parallel "
+                             "Experiments")
+        values = self.values
+        nsumrange = values.shape[2]
+        values = values.transpose(0, 2, 1, 3, 4).reshape(
+            (-1, values.shape[1], 1) + values.shape[3:]
+        )
+        keys = [
+            (range_val, sumrange_vals[sumrangeidx])
+            if sumrangeidx < len(sumrange_vals) else None
+            for range_val, sumrange_vals in zip(self.range_vals,
+                                                self.sumrange_vals)
+            for sumrangeidx in range(nsumrange)
+        ]
+        return values, keys
 
-    def evaluate(self, callselector, metric, stat=None):
-        """Evaluate the report."""
+    def evaluate_data(self, sumrange=False):
+        """Generate per-call measurement arrays for metric evaluation.
+
+        Structure:
+         -> dict[counter]
+         -> list[callid] (calls_parallel or sumrange_parallel: length 1)
+         -> masked array[rangeidx, rep] | None
+
+        With sumrange, the rows are those of evaluate_values().
+        """
         ex = self.experiment
+        values = self.evaluate_values(sumrange)[0]
+        mask = np.ma.getmaskarray(values)[..., 0].all(axis=(2, 3))
+
+        # sums over the sumrange
+        sums = values.filled(0).sum(axis=2)
+
+        data = {}
+        for counterid, counter in enumerate(self.counters):
+            data[counter] = [np.ma.array(sums[:, :, callid, counterid],
+                                         mask=mask)
+                             for callid in range(sums.shape[2])]
+
+        # flops
+        calls_flops = []
+        for call_flops in self.flops(sumrange):
+            if all(f is None for f in call_flops):
+                calls_flops.append(None)
+                continue
+            flops = np.array([0 if f is None else f for f in call_flops])
+            flops_mask = np.array([f is None for f in call_flops])
+            calls_flops.append(np.ma.array(
+                np.repeat(flops[:, None], mask.shape[1], axis=1),
+                mask=mask | flops_mask[:, None]
+            ))
+        if ex.sumrange_parallel or ex.calls_parallel:
+            if all(flops is not None for flops in calls_flops):
+                data[intern("flops")] = [sum(calls_flops)]
+        else:
+            data[intern("flops")] = calls_flops
+        return data
+
+    def nthreads(self):
+        """Array [rangeidx, 1]: number of threads used."""
+        ex = self.experiment
+        nthreads = []
+        for range_val in self.range_vals:
+            range_val_nthreads = ex.nthreads_at(range_val)
+            if ex.sumrange_parallel:
+                range_val_nthreads *= len(ex.sumrange_vals_at(range_val))
+            elif ex.calls_parallel:
+                range_val_nthreads *= len(ex.calls)
+            nthreads.append(min(range_val_nthreads, ex.sampler["nt_max"]))
+        return np.array(nthreads)[:, None]
+
+    def evaluate(self, callselector, metric, stat=None, sumrange=False):
+        """Evaluate the report.
+
+        The results are indexed by range value or, with sumrange, by (range
+        value, sumrange value) (not for sumrange_parallel).
+
+        Results are cached by (callselector, metric, stat, sumrange) until
+        the measurements change; they must not be modified.
+        """
+        key = (tuple(callselector) if isinstance(callselector, list)
+               else callselector, metric, stat, sumrange)
+        try:
+            return self._evaluations[key]
+        except KeyError:
+            pass
+        except TypeError:
+            # unhashable arguments
+            return self.evaluate_uncached(callselector, metric, stat,
+                                          sumrange)
+        result = self.evaluate_uncached(callselector, metric, stat, sumrange)
+        self._evaluations[key] = result
+        return result
+
+    def evaluate_uncached(self, callselector, metric, stat=None,
+                          sumrange=False):
+        """Evaluate the report (without caching)."""
+        if self.streaming:
+            if sumrange:
+                raise ValueError("Cannot keep the sumrange in streaming mode")
+            return self.evaluate_summaries(callselector, metric, stat)
+        ex = self.experiment
+        parallel = ex.sumrange_parallel or ex.calls_parallel
 
         # set selector from callselector
-        if callselector is None:
-            # all calls
-            if ex.sumrange_parallel or ex.calls_parallel:
+        if callselector is None or (parallel and
+                                    isinstance(callselector, (int, list))):
+            # all calls (parallel calls are only measured together)
+            if parallel:
                 def callselector(x):
                     return x
+                callselector.vectorized = True
             else:
                 callselector = range(len(ex.calls))
         elif isinstance(callselector, int):
@@ -277,15 +1167,19 @@ class Report(object):
                 if any(data[v] is None for v in callselector):
                     return None
                 return sum(data[v] for v in callselector)
+            selector.vectorized = True
         elif hasattr(callselector, "__call__"):
-            # function
+            # function (scalar unless marked vectorized)
             selector = callselector
         else:
             # unknown
             raise Exception("callselector is of unknown format")
 
         # set stat
-        if stat in stat_funs:
+        if stat in stat_arrays:
+            # named stat (applied to all range values at once)
+            pass
+        elif stat in stat_funs:
             # named stat
             stat = stat_funs[stat]
         elif hasattr(stat, "__call__"):
@@ -295,54 +1189,323 @@ class Report(object):
             # unknown
             raise Exception("stat is of unknown format")
 
-        result = {}
-        for range_val, range_val_data in self.data.items():
-            range_val_result = []
+        # selected calls
+        ncalls = len(ex.calls)
+        try:
+            calls = [
+                call for callid, call in enumerate(ex.calls)
+                if parallel or selector([int(callid == i)
+                                         for i in range(ncalls)]) != 0
+            ]
+        except:
+            calls = None
 
-            # set up nthreads
-            nthreads = ex.nthreads_at(range_val)
-            if ex.sumrange_parallel:
-                nthreads *= len(ex.sumrange_vals_at(range_val))
-            elif ex.calls_parallel:
-                nthreads *= len(ex.calls)
-            nthreads = min(nthreads, ex.sampler["nt_max"])
-
-            # compute results
-            for rep, rep_data in enumerate(range_val_data):
-                if not (ex.sumrange_parallel or ex.calls_parallel):
-                    rep_data = dict(
-                        (k, [call_data[k] if k in call_data else None
-                             for call_data in rep_data])
-                        for k in rep_data[0]
-                    )
-                try:
-                    selector_data = dict((k, selector(v))
-                                         for k, v in rep_data.items())
-                    metric_val = metric(
-                        selector_data, experiment=ex, selector=selector,
-                        nthreads=nthreads
-                    )
-                except:
-                    continue
-                if metric_val is not None:
-                    range_val_result.append(metric_val)
-            if range_val_result:
-                result[range_val] = stat(range_val_result)
+        # apply selector
+        selector_data = {}
+        vectorized_selector = vectorize_selector(selector)
+        for key, value in self.evaluate_data(sumrange).items():
+            if parallel:
+                value = value[0]
+            try:
+                selector_data[key] = vectorized_selector(value)
+            except:
+                selector_data[key] = None
+
+        # apply metric
+        values, keys = self.evaluate_values(sumrange)
+        mask = np.ma.getmaskarray(values)[..., 0].all(axis=(2, 3))
+        nthreads = self.nthreads()
+        if sumrange:
+            nthreads = np.repeat(nthreads, values.shape[0] // len(nthreads),
+                                 axis=0)
+        try:
+            metric_vals = vectorize_metric(metric)(
+                selector_data, experiment=ex, selector=selector,
+                nthreads=nthreads, calls=calls
+            )
+        except:
+            return {}
+        if metric_vals is None:
+            return {}
+        metric_vals = np.ma.asarray(metric_vals)
+        metric_vals = np.ma.array(
+            np.broadcast_to(metric_vals.data, mask.shape),
+            mask=mask | np.broadcast_to(np.ma.getmaskarray(metric_vals),
+                                        mask.shape)
+        )
+
+        if stat in stat_arrays:
+            return dict(
+                (key, key_result) for key, key_result
+                in zip(keys, stat_array(stat, metric_vals))
+                if key_result is not None
+            )
+
+        result = {}
+        for key, key_vals in zip(keys, metric_vals):
+            key_result = key_vals.compressed().tolist()
+            if key_result:
+                result[key] = stat(key_result)
         return result
 
-    def discard_first_repetitions(self):
-        """Discard the first repetitions."""
-        if self.first_repetitions_discarded:
-            return self.first_repetitions_discarded
+    def evaluate_summaries(self, callselector, metric, stat):
+        """Evaluate the report's summaries (streaming mode).
+
+        Only order statistics (see stat_quantiles) of single calls or all
+        calls are supported.  Since the quantiles of the measurements are
+        passed to the metric, they are exact (up to the quantile sketches'
+        accuracy) for metrics that are monotonic in the measurements.  For
+        metrics marked linear = True (linear in a single counter), the mean
+        and standard deviation (see stat_moments) are computed from the
+        running moments.
+        """
+        ex = self.experiment
+        if isinstance(callselector, list) and len(callselector) == 1:
+            callselector = callselector[0]
+        if (callselector is None or
+                callselector == range(len(ex.calls)) or
+                ex.sumrange_parallel or ex.calls_parallel):
+            # all calls
+            column = -1
+            callids = range(len(ex.calls))
+        elif isinstance(callselector, int):
+            column = callselector
+            callids = [callselector]
+        else:
+            raise ValueError("Only single calls or all calls can be "
+                             "evaluated in streaming mode")
+        moments = stat in stat_moments
+        if moments and not getattr(metric, "linear", False):
+            raise ValueError("The statistics %s are only supported for "
+                             "linear metrics in streaming mode" %
+                             ", ".join(stat_moments))
+        if not moments and stat not in stat_quantiles:
+            raise ValueError("Only the statistics %s are supported in "
+                             "streaming mode" % ", ".join(sorted(
+                                 stat_quantiles)))
+
+        data = {}
+        for counterid, counter in enumerate(self.counters):
+            summaries = self.summaries[:, column, counterid]
+            if moments:
+                # mean and mean + standard deviation of the measurements
+                data[counter] = np.ma.masked_invalid([
+                    [summary.mean, summary.mean + summary.std]
+                    if summary.count else [np.nan, np.nan]
+                    for summary in summaries
+                ])
+            else:
+                # quantile q, 1 - q, and extrema of the measurements
+                q = stat_quantiles[stat]
+                data[counter] = np.ma.masked_invalid([
+                    summary.quantile([q, 1 - q, 0, 1])
+                    for summary in summaries
+                ])
+        calls_flops = self.flops()
+        flops = [calls_flops[callid] for callid in callids]
+        if all(f is not None for call_flops in flops for f in call_flops):
+            data[intern("flops")] = np.array(map(sum, zip(*flops)),
+                                             dtype=float)[:, None]
+
+        # apply metric
+        try:
+            metric_vals = vectorize_metric(metric)(
+                data, experiment=ex, selector=None, nthreads=self.nthreads(),
+                calls=[ex.calls[callid] for callid in callids]
+            )
+        except:
+            return {}
+        if metric_vals is None:
+            return {}
+        metric_vals = np.ma.asarray(metric_vals)
+        shape = len(self.range_vals), 2 if moments else 4
+        try:
+            metric_vals = np.ma.array(
+                np.broadcast_to(metric_vals.data, shape),
+                mask=np.broadcast_to(np.ma.getmaskarray(metric_vals), shape)
+            )
+        except ValueError:
+            return {}
+
+        if moments:
+            # the metric's deviation is that of the linear counter
+            if stat == "avg":
+                result_vals = metric_vals[:, 0]
+            else:
+                result_vals = abs(metric_vals[:, 1] - metric_vals[:, 0])
+        else:
+            # quantile 1 - q for decreasing metrics
+            decreasing = metric_vals[:, 2] > metric_vals[:, 3]
+            result_vals = np.ma.where(decreasing, metric_vals[:, 1],
+                                      metric_vals[:, 0])
+        return dict(
+            (range_val, float(value))
+            for range_val, value, masked in zip(
+                self.range_vals, result_vals.filled(0).tolist(),
+                np.ma.getmaskarray(result_vals).tolist()
+            )
+            if not masked
+        )
+
+    def view(self, name, args):
+        """Create a view sharing the measurement arrays.
+
+        name and args identify the view's creation (see select()).
+        """
         report = self.copy()
-        nreps = self.experiment.nreps
-        fulldata = {}
-        for range_val, range_val_data in self.fulldata.iteritems():
-            if len(range_val_data) > 1:
-                # do not take away last one
-                range_val_data = range_val_data[1:]
-            fulldata[range_val] = range_val_data
-        report.fulldata = fulldata
-        report.data_fromfull()
-        self.first_repetitions_discarded = report
+        report.base = self
+        report.selection = name, args
+        report._rawdata = None
+        report._fulldata = None
+        report._data = None
+        return report
+
+    def select(self, range_vals=None, reps=None, calls=None):
+        """Select range values, repetitions, and calls (as a view).
+
+        range_vals is a list of range values, reps a list (or slice) of
+        repetition indices, and calls a list of callids.  Regularly spaced
+        selections share the measurement arrays; others copy them.
+        """
+        ex = self.experiment
+        report = self.view("select", (range_vals, reps, calls))
+        values = self.values
+        if range_vals is not None:
+            rangeidxs = [self.range_vals.index(range_val)
+                         for range_val in range_vals]
+            values = values[index_slice(rangeidxs, values.shape[0])]
+            report.range_vals = tuple(range_vals)
+            report.sumrange_vals = [self.sumrange_vals[rangeidx]
+                                    for rangeidx in rangeidxs]
+        if reps is not None:
+            if not isinstance(reps, slice):
+                reps = index_slice(reps, values.shape[1])
+            values = values[:, reps]
+        if calls is not None:
+            if ex.sumrange_parallel or ex.calls_parallel:
+                raise ValueError("Cannot select calls in parallel Experiments")
+            values = values[:, :, :, index_slice(calls, values.shape[3])]
+            report.experiment = ex.copy()
+            report.experiment.calls = [ex.calls[callid] for callid in calls]
+        report.values = values
         return report
+
+    def drop_reps(self, n):
+        """Drop the first n repetitions for each range value (as a view).
+
+        n is either an int or a list with one int per range value; at least
+        one repetition is kept for each range value.  The view shares the
+        measurements (dropping unevenly copies only their mask), and its
+        reps_dropped maps each range value to the number of dropped
+        repetitions.
+        """
+        present = self.reps_present()
+        npresent = present.sum(axis=1)
+        counts = np.minimum(np.broadcast_to(n, npresent.shape),
+                            np.maximum(npresent - 1, 0))
+        report = self.view("drop_reps", (n,))
+        report.reps_dropped = dict(zip(self.range_vals, counts.tolist()))
+        relevant = npresent > 0
+        if not relevant.any():
+            return report
+        count = counts[relevant].max()
+        if ((counts[relevant] == count).all() and
+                present[relevant, :count].all()):
+            # same leading repetitions for all range values
+            report.values = self.values[:, count:]
+        else:
+            drop = present & (present.cumsum(axis=1) <= counts[:, None])
+            report.values = np.ma.array(
+                self.values.data,
+                mask=np.ma.getmaskarray(self.values) |
+                drop[:, :, None, None, None]
+            )
+        return report
+
+    def discard_first_repetitions(self):
+        """Discard the first repetitions (as a view).
+
+        In streaming mode, they can only be discarded while parsing (see
+        __init__()).
+        """
+        if self.streaming:
+            if self.reps_dropped is None:
+                raise ValueError("In streaming mode, the first repetitions "
+                                 "can only be discarded while parsing")
+            return self
+        if self.first_repetitions_discarded is None:
+            self.first_repetitions_discarded = self.drop_reps(1)
+        return self.first_repetitions_discarded
+
+    def warmup_lengths(self, batchsize=5):
+        """Array [rangeidx, callid]: number of warm-up repetitions.
+
+        The warm-up of each call's cycles is detected with mser().  With
+        calls_parallel or sumrange_parallel, there is one column for all
+        calls.
+        """
+        cycles = self.evaluate_data()["cycles"]
+        lengths = np.zeros((len(self.range_vals), len(cycles)), dtype=int)
+        for callid, call_cycles in enumerate(cycles):
+            for rangeidx, rep_cycles in enumerate(call_cycles):
+                lengths[rangeidx, callid] = mser(rep_cycles.compressed(),
+                                                 batchsize)
+        return lengths
+
+    def discard_warmup(self, batchsize=5):
+        """Discard the warm-up repetitions (as a view).
+
+        For each range value, the longest warm-up among the calls (see
+        warmup_lengths()) is dropped; the view's reps_dropped holds the
+        number of discarded repetitions.
+        """
+        return self.view_cached(
+            ("discard_warmup", batchsize),
+            lambda: self.drop_reps(
+                self.warmup_lengths(batchsize).max(axis=1).tolist()
+            )
+        )
+
+    def filter_outliers(self, method="iqr", *args):
+        """Remove repetitions with outlying cycles (as a view).
+
+        method is a key of outlier_filters, args are passed to its filter
+        (e.g., the fence factor for "iqr").  Repetitions are removed based on
+        their total cycles; the view shares the measurements (it copies only
+        their mask), and its outliers_removed maps each range value to the
+        number of removed repetitions.
+        """
+        if method not in outlier_filters:
+            raise ValueError("unknown outlier filter: %r" % method)
+        return self.view_cached(
+            ("filter_outliers", method) + args,
+            lambda: self.filter_outliers_uncached(method, *args)
+        )
+
+    def filter_outliers_uncached(self, method, *args):
+        """Remove repetitions with outlying cycles (not cached)."""
+        present = self.reps_present()
+        cycles = self.values[..., 0].filled(0).sum(axis=(2, 3))
+        cycles = np.where(present, cycles, np.nan)
+        outliers = np.zeros_like(present)
+        rows = present.any(axis=1)
+        outliers[rows] = (present[rows] &
+                          outlier_filters[method](cycles[rows], *args))
+        report = self.view("filter_outliers", (method,) + args)
+        report.outliers_removed = dict(zip(self.range_vals,
+                                           outliers.sum(axis=1).tolist()))
+        report.values = np.ma.array(
+            self.values.data,
+            mask=np.ma.getmaskarray(self.values) |
+            outliers[:, :, None, None, None]
+        )
+        return report
+
+    def view_cached(self, key, create):
+        """Get a view by key, creating it with create() if not cached.
+
+        Cached views are discarded when the measurements change.
+        """
+        if key not in self._views:
+            self._views[key] = create()
+        return self._views[key]
@@ -95,6 +95,15 @@ class Signature(list):
                                     "used in properties for %s" %
                                     (str(e).split("'")[1], arg))
 
+    def __reduce__(self):
+        """Pickle without the lambdas (recompiled from the strings)."""
+        return type(self), tuple(self), {"flopsstr": self.flopsstr}
+
+    def __setstate__(self, state):
+        """Recompile the flops lambda when unpickling."""
+        if state["flopsstr"] is not None:
+            self.init_lambdas({"flops": state["flopsstr"]})
+
     def __str__(self):
         """Format as human readable."""
         return "%s(%s)" % (self[0], ", ".join(arg.name for arg in self[1:]))
@@ -170,6 +179,16 @@ class BasicCall(list):
         args = map(repr, [self.sig] + self[1:])
         return "%s(%s)" % (type(self).__name__, ", ".join(args))
 
+    def __reduce__(self):
+        """Pickle through the constructor."""
+        state = dict(self.__dict__)
+        del state["sig"]
+        return type(self), (self.sig,) + tuple(self[1:]), state
+
+    def __setstate__(self, state):
+        """Restore additional attributes when unpickling."""
+        self.__dict__.update(state)
+
     def __copy__(self):
         """Create a shallow copy."""
         return type(self)(self.sig, *self[1:])
@@ -296,6 +315,11 @@ class Arg(object):
         args = map(repr, args)
         return "%s(%s)" % (type(self).__name__, ", ".join(args))
 
+    def __getstate__(self):
+        """Pickle without the lambdas (compiled by the Signature)."""
+        return dict((key, value) for key, value in self.__dict__.items()
+                    if key not in ("min", "max", "properties"))
+
     def __str__(self):
         """Format as human readable."""
         return str(self.name)
@@ -0,0 +1,117 @@
+"""Streaming summaries (running moments and quantile sketches)."""
+
+from __future__ import division
+
+import numpy as np
+
+
+class TDigest(object):
+
+    """Merging t-digest quantile sketch.
+
+    Values are buffered and merged into at most about compression centroids,
+    which are small near the tails (accurate extreme quantiles).
+    """
+
+    def __init__(self, compression=200):
+        """Initialize an empty sketch."""
+        self.compression = compression
+        self.means = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.buffer = []
+        self.nbuffered = 0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        """Add values."""
+        values = np.asarray(values, dtype=float).ravel()
+        if not len(values):
+            return
+        self.buffer.append(values)
+        self.nbuffered += len(values)
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+        if self.nbuffered > 10 * self.compression:
+            self.compress()
+
+    def compress(self):
+        """Merge the buffered values into the centroids."""
+        if not self.nbuffered:
+            return
+        means = np.concatenate([self.means] + self.buffer)
+        weights = np.concatenate([self.weights, np.ones(self.nbuffered)])
+        self.buffer = []
+        self.nbuffered = 0
+        order = np.argsort(means, kind="mergesort")
+        means = means[order]
+        weights = weights[order]
+
+        # group by the k1 scale function of the centroids' left quantiles
+        cumweights = np.cumsum(weights)
+        qs = (cumweights - weights) / cumweights[-1]
+        ks = self.compression / (2 * np.pi) * np.arcsin(2 * qs - 1)
+        groups = np.floor(ks - ks[0]).astype(int)
+        starts = np.flatnonzero(np.diff(groups, prepend=-1))
+        self.weights = np.add.reduceat(weights, starts)
+        self.means = np.add.reduceat(means * weights, starts) / self.weights
+
+    def quantile(self, q):
+        """Estimate quantile(s) q (in [0, 1]); extrema are exact."""
+        self.compress()
+        if not len(self.weights):
+            return np.full(np.shape(q), np.nan)
+        total = self.weights.sum()
+        positions = np.cumsum(self.weights) - self.weights / 2
+        return np.interp(np.asarray(q) * total,
+                         np.concatenate([[0], positions, [total]]),
+                         np.concatenate([[self.min], self.means, [self.max]]))
+
+
+class Summary(object):
+
+    """Running moments, extrema, and quantile sketch of a value stream."""
+
+    def __init__(self, compression=200):
+        """Initialize an empty summary."""
+        self.count = 0
+        self.mean = 0.
+        self.m2 = 0.
+        self.digest = TDigest(compression)
+
+    def update(self, values):
+        """Add values."""
+        values = np.asarray(values, dtype=float).ravel()
+        if not len(values):
+            return
+        # merge moments (Chan et al.)
+        count = len(values)
+        mean = values.mean()
+        m2 = ((values - mean) ** 2).sum()
+        total = self.count + count
+        delta = mean - self.mean
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.mean += delta * count / total
+        self.count = total
+        self.digest.update(values)
+
+    @property
+    def min(self):
+        """Minimum."""
+        return self.digest.min
+
+    @property
+    def max(self):
+        """Maximum."""
+        return self.digest.max
+
+    @property
+    def std(self):
+        """Standard deviation."""
+        if not self.count:
+            return np.nan
+        return np.sqrt(self.m2 / self.count)
+
+    def quantile(self, q):
+        """Estimate quantile(s) q (in [0, 1]); extrema are exact."""
+        return self.digest.quantile(q)
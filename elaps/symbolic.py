@@ -3,19 +3,27 @@
 from __future__ import division
 
 import __builtin__
+import __future__
 import math
+import operator
+import sys
 from numbers import Number
-from collections import Iterable, defaultdict
+from collections import Iterable, OrderedDict, defaultdict, namedtuple
 from operator import itemgetter
 from copy import deepcopy
+from fractions import Fraction
 from inspect import isgenerator
 
+import numpy as np
+
 
 class Expression(tuple):
 
     """Base class for all expressions."""
 
     interned = {}
+    interned_limit = 1 << 14
+    hashes = {}
 
     class __metaclass__(type):
         def __new__(cls, name, bases, clsdict):
@@ -28,9 +36,40 @@ class Expression(tuple):
             raise TypeError("%r takes exactly %s arguments (%s given)" %
                             (cls.__name__, cls.fixedlen, len(args)))
         id_ = (cls,) + args
-        if id_ not in cls.interned:
-            cls.interned[id_] = super(Expression, cls).__new__(cls, args)
-        return cls.interned[id_]
+        interned = Expression.interned
+        if id_ not in interned:
+            if len(interned) >= Expression.interned_limit:
+                Expression.sweep()
+            expr = super(Expression, cls).__new__(cls, args)
+            interned[id_] = expr
+            Expression.hashes[id(expr)] = hash(id_)
+        return interned[id_]
+
+    @staticmethod
+    def sweep():
+        """Drop interned Expressions that are not referenced elsewhere.
+
+        Compiled functions are dropped as well.  The table limit grows to
+        twice the number of remaining Expressions.
+        """
+        compile_cache.clear()
+        interned = Expression.interned
+        hashes = Expression.hashes
+        keys = interned.keys()
+        while keys:
+            # only referenced by the table (and getrefcount's argument)
+            garbage = list(key for key in keys
+                           if key in interned and
+                           sys.getrefcount(interned[key]) == 2)
+            del keys
+            # arguments of dropped Expressions may become unreferenced
+            keys = set((type(arg),) + arg[:] for key in garbage
+                       for arg in key[1:] if isinstance(arg, Expression))
+            while garbage:
+                del hashes[id(interned.pop(garbage.pop()))]
+        Expression.interned_limit = __builtin__.max(
+            Expression.interned_limit, 2 * len(interned)
+        )
 
     def __setattr__(self, name, value):
         """Make immutable."""
@@ -40,8 +79,15 @@ class Expression(tuple):
                              (type(self).__name__, name))
 
     def __hash__(self):
-        """Differentiate between classes."""
-        return hash(type(self)) ^ hash(self[:])
+        """Differentiate between classes (cached upon interning)."""
+        try:
+            return Expression.hashes[id(self)]
+        except KeyError:
+            return hash((type(self),) + self[:])
+
+    def __reduce__(self):
+        """Pickle such that unpickling interns the Expression."""
+        return unpickle_expression, (type(self),) + self[:]
 
     def __eq__(self, other):
         """Check equality by id."""
@@ -79,6 +125,17 @@ class Expression(tuple):
         """Substitution and simplification."""
         return simplify(self, **kwargs)
 
+    def compile(self, varnames, vectorized=False):
+        """Compile to a numeric function of the variables (in order).
+
+        With vectorized, the function evaluates element-wise on NumPy arrays.
+        Compiled functions are cached (see compile_cache).
+        """
+        varnames = tuple(getattr(var, "name", var) for var in varnames)
+        return compile_cache.lookup((self, varnames, vectorized),
+                                    compile_expression, self, varnames,
+                                    vectorized)
+
     # math operator overloading:
     def __neg__(self):
         """-Expression ."""
@@ -159,6 +216,14 @@ class Symbol(Expression):
         """Find all contained symbols: self is a symbol."""
         return set([self])
 
+    def code(self, compiler):
+        """Python code: the variable."""
+        return compiler.variable(self.name)
+
+    def bounds(self, intervals):
+        """Bounds: the variable's interval."""
+        return intervals.get(self.name)
+
 
 class Operation(Expression):
 
@@ -211,6 +276,18 @@ class Minus(Operation):
 
         return -arg
 
+    def code(self, compiler):
+        """Python code: -(x)."""
+        return "(-%s)" % compiler.code(self.expr)
+
+    def bounds(self, intervals):
+        """Bounds: [-hi, -lo]."""
+        interval_ = interval(self.expr, intervals)
+        if interval_ is None:
+            return None
+        lo, hi = interval_
+        return -hi, -lo
+
 
 class Abs(Operation):
 
@@ -238,6 +315,22 @@ class Abs(Operation):
 
         return abs(arg)
 
+    def code(self, compiler):
+        """Python code: abs(x)."""
+        return "abs(%s)" % compiler.code(self.expr)
+
+    def bounds(self, intervals):
+        """Bounds: [0, max(-lo, hi)] if the interval contains 0."""
+        interval_ = interval(self.expr, intervals)
+        if interval_ is None:
+            return None
+        lo, hi = interval_
+        if lo >= 0:
+            return lo, hi
+        if hi <= 0:
+            return -hi, -lo
+        return 0, __builtin__.max(-lo, hi)
+
 
 class Plus(Operation):
 
@@ -307,6 +400,17 @@ class Plus(Operation):
 
         return Plus(*newargs)
 
+    def code(self, compiler):
+        """Python code: (x + y + ...)."""
+        return "(%s)" % " + ".join(map(compiler.code, self))
+
+    def bounds(self, intervals):
+        """Bounds: [sum(lo), sum(hi)]."""
+        intervals_ = [interval(arg, intervals) for arg in self]
+        if None in intervals_:
+            return None
+        return tuple(map(sum, zip(*intervals_)))
+
 
 class Times(Operation):
 
@@ -369,6 +473,17 @@ class Times(Operation):
 
         return Times(*newargs)
 
+    def code(self, compiler):
+        """Python code: (x * y * ...)."""
+        return "(%s)" % " * ".join(map(compiler.code, self))
+
+    def bounds(self, intervals):
+        """Bounds: products of the intervals."""
+        intervals_ = [interval(arg, intervals) for arg in self]
+        if None in intervals_:
+            return None
+        return reduce(interval_mul, intervals_)
+
 
 class Div(Operation):
 
@@ -407,6 +522,22 @@ class Div(Operation):
 
         return nominator / denominator
 
+    def code(self, compiler):
+        """Python code: (1 / y * x) (as evaluated by simplify())."""
+        return "(1 / %s * %s)" % (compiler.code(self.denominator),
+                                  compiler.code(self.nominator))
+
+    def bounds(self, intervals):
+        """Bounds: nominator times 1 / denominator."""
+        nominator, denominator = (interval(arg, intervals) for arg in self)
+        if nominator is None or denominator is None:
+            return None
+        lo, hi = denominator
+        if lo <= 0 <= hi:
+            # division by 0
+            return -float("inf"), float("inf")
+        return interval_mul(nominator, (1 / hi, 1 / lo))
+
 
 class Power(Operation):
 
@@ -452,6 +583,38 @@ class Power(Operation):
 
         return Power(base, exponent)
 
+    def code(self, compiler):
+        """Python code: (x ** y) or (1 / x ** -y) for negative numbers y."""
+        if isinstance(self.exponent, Number) and self.exponent < 0:
+            # avoid negative integer powers of integer arrays
+            return "(1 / %s ** %s)" % (compiler.code(self.base),
+                                       compiler.code(-self.exponent))
+        return "(%s ** %s)" % tuple(map(compiler.code, self))
+
+    def bounds(self, intervals):
+        """Bounds: monotonic for positive bases or integer exponents."""
+        base, exponent = (interval(arg, intervals) for arg in self)
+        if base is None or exponent is None:
+            return None
+        lo, hi = base
+        if isinstance(self.exponent, int):
+            if lo <= 0 <= hi:
+                if self.exponent < 0:
+                    # division by 0
+                    return -float("inf"), float("inf")
+                if self.exponent % 2 == 0:
+                    # even power
+                    return 0, __builtin__.max(lo ** self.exponent,
+                                              hi ** self.exponent)
+        elif lo <= 0:
+            # not defined for all bases
+            return -float("inf"), float("inf")
+        try:
+            powers = [b ** e for b in base for e in exponent]
+        except OverflowError:
+            return -float("inf"), float("inf")
+        return __builtin__.min(powers), __builtin__.max(powers)
+
 
 class Log(Operation):
 
@@ -487,6 +650,26 @@ class Log(Operation):
 
         return log(arg, base)
 
+    def code(self, compiler):
+        """Python code: log(x, b)."""
+        if compiler.vectorized:
+            if self.base == math.e:
+                return "_np.log(%s)" % compiler.code(self.expr)
+            return "(_np.log(%s) / _np.log(%s))" % tuple(map(compiler.code,
+                                                            self))
+        return "_log(%s, %s)" % tuple(map(compiler.code, self))
+
+    def bounds(self, intervals):
+        """Bounds: monotonic for arguments > 0 and bases > 1."""
+        arg, base = (interval(arg, intervals) for arg in self)
+        if arg is None or base is None:
+            return None
+        if base[0] <= 1 or arg[1] <= 0:
+            return -float("inf"), float("inf")
+        logs = [math.log(a) / math.log(b) if a > 0 else -float("inf")
+                for a in arg for b in base]
+        return __builtin__.min(logs), __builtin__.max(logs)
+
 
 class Floor(Operation):
 
@@ -513,6 +696,20 @@ class Floor(Operation):
 
         return floor(arg)
 
+    def code(self, compiler):
+        """Python code: int(floor(x))."""
+        if compiler.vectorized:
+            return "_np.floor(%s).astype(int)" % compiler.code(self.expr)
+        return "int(_math.floor(%s))" % compiler.code(self.expr)
+
+    def bounds(self, intervals):
+        """Bounds: [floor(lo), floor(hi)]."""
+        interval_ = interval(self.expr, intervals)
+        if interval_ is None:
+            return None
+        return tuple(val if math.isinf(val) else int(math.floor(val))
+                     for val in interval_)
+
 
 class Ceil(Operation):
 
@@ -539,6 +736,20 @@ class Ceil(Operation):
 
         return ceil(arg)
 
+    def code(self, compiler):
+        """Python code: int(ceil(x))."""
+        if compiler.vectorized:
+            return "_np.ceil(%s).astype(int)" % compiler.code(self.expr)
+        return "int(_math.ceil(%s))" % compiler.code(self.expr)
+
+    def bounds(self, intervals):
+        """Bounds: [ceil(lo), ceil(hi)]."""
+        interval_ = interval(self.expr, intervals)
+        if interval_ is None:
+            return None
+        return tuple(val if math.isinf(val) else int(math.ceil(val))
+                     for val in interval_)
+
 
 class Min(Operation):
 
@@ -582,6 +793,20 @@ class Min(Operation):
 
         return min(newargs)
 
+    def code(self, compiler):
+        """Python code: min(x, y, ...)."""
+        if compiler.vectorized:
+            return reduce("_np.minimum(%s, %s)".__mod__,
+                          map(compiler.code, self))
+        return "_min(%s)" % ", ".join(map(compiler.code, self))
+
+    def bounds(self, intervals):
+        """Bounds: [min(lo), min(hi)]."""
+        intervals_ = [interval(arg, intervals) for arg in self]
+        if None in intervals_:
+            return None
+        return tuple(map(__builtin__.min, zip(*intervals_)))
+
 
 class Max(Operation):
 
@@ -625,6 +850,20 @@ class Max(Operation):
 
         return max(newargs)
 
+    def code(self, compiler):
+        """Python code: max(x, y, ...)."""
+        if compiler.vectorized:
+            return reduce("_np.maximum(%s, %s)".__mod__,
+                          map(compiler.code, self))
+        return "_max(%s)" % ", ".join(map(compiler.code, self))
+
+    def bounds(self, intervals):
+        """Bounds: [max(lo), max(hi)]."""
+        intervals_ = [interval(arg, intervals) for arg in self]
+        if None in intervals_:
+            return None
+        return tuple(map(__builtin__.max, zip(*intervals_)))
+
 
 class Sum(Operation):
 
@@ -699,17 +938,36 @@ class Sum(Operation):
         # simplify argument
         arg = simplify(self.expr, **kwargs)
 
-        if isinstance(range_, Range) and findsymbols(range_):
+        if isinstance(range_, Range) and not range_.numeric:
             # range is symbolic
             return Sum(arg, **{self.rangevar: range_})
 
         # range is not symbolic
         if isinstance(arg, Expression):
+            if isinstance(range_, Range):
+                coeffs = polynomial(arg, self.rangevar)
+                if coeffs is not None:
+                    # closed form for polynomials
+                    return simplify(Plus(*(coeff * range_.powersum(power)
+                                           for power, coeff
+                                           in enumerate(coeffs))))
             return simplify(Plus(*(arg(**{self.rangevar: val})
                                    for val in range_)))
 
         return len(range_) * arg
 
+    def code(self, compiler):
+        """Python code: _sum(lambda var: x, range)."""
+        return "_sum(%s, %s)" % compiler.loop(self)
+
+    def bounds(self, intervals):
+        """Bounds: #values times the summand's bounds."""
+        loop = interval_loop(self, intervals)
+        if loop is None:
+            return None
+        count, (lo, hi) = loop
+        return interval_mul((count, count), (lo, hi))
+
 
 class Prod(Operation):
 
@@ -783,14 +1041,32 @@ class Prod(Operation):
         # simplify argument
         arg = simplify(self.expr, **kwargs)
 
-        if isinstance(range_, Range) and range_.findsymbols():
+        if isinstance(range_, Range) and not range_.numeric:
             # range is symbolic
             return Prod(arg, **{self.rangevar: range_})
 
         # range is not symbolic
+        if not isinstance(arg, Expression):
+            return arg ** len(range_)
+
         return simplify(Times(*(arg(**{self.rangevar: val})
                                 for val in range_)))
 
+    def code(self, compiler):
+        """Python code: _prod(lambda var: x, range)."""
+        return "_prod(%s, %s)" % compiler.loop(self)
+
+    def bounds(self, intervals):
+        """Bounds: factor's bounds to the power of #values."""
+        loop = interval_loop(self, intervals)
+        if loop is None:
+            return None
+        count, (lo, hi) = loop
+        if lo >= 0:
+            return lo ** count, hi ** count
+        absmax = __builtin__.max(-lo, hi) ** count
+        return -absmax, absmax
+
 
 class Range(tuple):
 
@@ -837,12 +1113,26 @@ class Range(tuple):
                 if not isinstance(val, (Number, Expression)):
                     raise TypeError("Invalid value in range:%r" % (arg,))
             subranges.append(arg)
-        return super(Range, cls).__new__(cls, (tuple(subranges),))
+        self = super(Range, cls).__new__(cls, (tuple(subranges),))
+
+        # cache symbols and numeric status
+        symbols = set()
+        for subrange in subranges:
+            for val in subrange:
+                if isinstance(val, Expression):
+                    symbols |= val.findsymbols()
+        self.__dict__["symbols"] = frozenset(symbols)
+        self.__dict__["numeric"] = not symbols
+        return self
+
+    def __getnewargs__(self):
+        """Arguments for unpickling."""
+        return self.subranges
 
     def __setattr__(self, name, value):
         """Make immutable."""
         if hasattr(self, name):
-            raise AtributeError("can't set attribute")
+            raise AttributeError("can't set attribute")
         else:
             raise AttributeError("%r object has no attribute %r" %
                                  (type(self).__name__, name))
@@ -882,59 +1172,118 @@ class Range(tuple):
         return Range(*newsubranges)
 
     def findsymbols(self):
-        """Find all contained symbols: self is a symbol."""
-        symbols = set()
-        for subrange in self.subranges:
-            for val in subrange:
-                if isinstance(val, Expression):
-                    symbols |= val.findsymbols()
-        return symbols
+        """Find all contained symbols (cached)."""
+        return set(self.symbols)
 
     def __call__(self, **kwargs):
         """Substitute and simplify."""
         return self.simplify(**kwargs)
 
+    def to_array(self):
+        """Values in the range as a (read-only) NumPy array (cached)."""
+        if "_array" not in self.__dict__:
+            array = np.array(list(self))
+            array.flags.writeable = False
+            self.__dict__["_array"] = array
+        return self._array
+
     def __iter__(self):
         """Iterate over values in the complex range."""
-        if self.findsymbols():
+        if not self.numeric:
             raise TypeError("Not numeric: %s" % self)
         for subrange in self.subranges:
             start, step, stop = subrange
-            if step > 0:
-                # positive direction
-
-                if start <= stop:
-                    # first value
-                    yield start
-
-                # iterate over next values
-                val = start + step
-                while val <= stop:
-                    yield val
-                    val += step
-            elif step == 0:
-                # no direction
+            if all(isinstance(val, (int, long)) for val in subrange):
+                # integer subrange
+                if step > 0:
+                    values = xrange(start, stop + 1, step)
+                elif step < 0:
+                    values = xrange(start, stop - 1, step)
+                else:
+                    values = [start] if start == stop else []
+            else:
+                values = self.itersubrange(subrange)
+            for val in values:
+                yield val
+
+    def __contains__(self, value):
+        """Check if value is in the range."""
+        try:
+            self.index(value)
+        except ValueError:
+            return False
+        return True
+
+    def index(self, value):
+        """Position of the first occurrence of value in the range."""
+        if not self.numeric:
+            raise TypeError("Not numeric: %s" % self)
+        offset = 0
+        for subrange in self.subranges:
+            start, step, stop = subrange
+            if all(isinstance(val, (int, long)) for val in subrange):
+                # integer subrange: compute the position
+                if step == 0:
+                    length = int(start == stop)
+                    pos = 0 if value == start else -1
+                else:
+                    length = max(0, 1 + (stop - start) // step)
+                    pos = -1
+                    if isinstance(value, (int, long, float)):
+                        pos = (value - start) // step
+                        if start + pos * step != value:
+                            pos = -1
+                if 0 <= pos < length:
+                    return offset + int(pos)
+            else:
+                # other numeric subrange: scan its values
+                length = 0
+                for val in self.itersubrange(subrange):
+                    if val == value:
+                        return offset + length
+                    length += 1
+            offset += length
+        raise ValueError("%r is not in range" % (value,))
+
+    @staticmethod
+    def itersubrange(subrange):
+        """Iterate over values in a numeric subrange."""
+        start, step, stop = subrange
+        if step > 0:
+            # positive direction
+
+            if start <= stop:
+                # first value
+                yield start
+
+            # iterate over next values
+            val = start + step
+            while val <= stop:
+                yield val
+                val += step
+        elif step == 0:
+            # no direction
 
-                if start == stop:
-                    # only value
-                    yield start
-            elif step < 0:
-                # negative direction
+            if start == stop:
+                # only value
+                yield start
+        elif step < 0:
+            # negative direction
 
-                if start >= stop:
-                    # first value
-                    yield start
+            if start >= stop:
+                # first value
+                yield start
 
-                # iterate over next values
-                val = start + step
-                while val >= stop:
-                    yield val
-                    val += step
+            # iterate over next values
+            val = start + step
+            while val >= stop:
+                yield val
+                val += step
 
     def __len__(self):
         """Length of the range."""
         result = 0
-        if self.findsymbols():
+        if not self.numeric:
             raise TypeError("Not numeric: %s" % self)
         for subrange in self.subranges:
             start, step, stop = subrange
@@ -952,7 +1301,7 @@ class Range(tuple):
 
     def min(self):
         """compute the minimum."""
-        if self.findsymbols():
+        if not self.numeric:
             raise TypeError("Not numeric: %s" % self)
         # empty range: None
         if not self.subranges:
@@ -981,7 +1330,7 @@ class Range(tuple):
 
     def max(self):
         """Compute the maximum."""
-        if self.findsymbols():
+        if not self.numeric:
             raise TypeError("Not numeric: %s" % self)
         # empty range: None
         if not self.subranges:
@@ -1008,6 +1357,27 @@ class Range(tuple):
 
         return result
 
+    def powersum(self, power):
+        """Compute the sum of the values' powers in closed form.
+
+        Subranges with non-integer bounds or steps are summed by iteration.
+        """
+        if not self.numeric:
+            raise TypeError("Not numeric: %s" % self)
+        result = 0
+        for subrange in self.subranges:
+            if not all(isinstance(val, (int, long)) for val in subrange):
+                # len() and iteration may disagree for floats
+                result += sum(val ** power for val in Range(subrange))
+                continue
+            # values: start + step * k for k in 0, ..., count - 1
+            start, step, stop = subrange
+            count = len(Range(subrange))
+            result += sum(binomial(power, k) * start ** (power - k) *
+                          step ** k * faulhaber(k, count)
+                          for k in range(power + 1))
+        return result
+
     def __eq__(self, other):
         """Compare with other Range."""
         return (type(self) == type(other) and
@@ -1034,9 +1404,191 @@ class Range(tuple):
                            ", ".join(map(repr, self.subranges)))
 
 
+class Compiler(object):
+
+    """Translation of Expressions to Python functions."""
+
+    def __init__(self, varnames, vectorized=False):
+        """Initialize for the function arguments' names."""
+        self.vectorized = vectorized
+        self.args = ["_%d" % i for i in range(len(varnames))]
+        self.names = dict(zip(varnames, self.args))
+        self.nloops = 0
+        self.namespace = {
+            "_np": np, "_math": math, "_log": log,
+            "_min": __builtin__.min, "_max": __builtin__.max,
+            "_sum": self.loop_sum, "_prod": self.loop_prod
+        }
+
+    def compile(self, expr):
+        """Compile an expression to a function."""
+        source = "lambda %s: %s" % (", ".join(self.args), self.code(expr))
+        code = compile(source, "<%s>" % (expr,), "eval",
+                       __future__.division.compiler_flag, True)
+        return eval(code, self.namespace)
+
+    def code(self, expr):
+        """Generate Python code for a value or Expression."""
+        if isinstance(expr, Expression):
+            if not hasattr(expr, "code"):
+                raise TypeError("Can't compile %r" % (expr,))
+            return expr.code(self)
+        if (type(expr) in (int, long) or
+                type(expr) == float and not math.isinf(expr) and
+                not math.isnan(expr)):
+            return repr(expr)
+        if isinstance(expr, Number):
+            return self.constant(expr)
+        raise TypeError("Can't compile %r" % (expr,))
+
+    def constant(self, value):
+        """Name for a constant in the generated code."""
+        name = "_c%d" % len(self.namespace)
+        self.namespace[name] = value
+        return name
+
+    def variable(self, name):
+        """Name of a variable in the generated code."""
+        if name not in self.names:
+            raise NameError("Unknown variable %r" % (name,))
+        return self.names[name]
+
+    def loop(self, expr):
+        """Code for the body and range of a Sum or Prod."""
+        range_ = expr.range_
+        if isinstance(range_, Range):
+            symbols = [symbol.name for symbol in range_.findsymbols()]
+            if not symbols:
+                rangecode = self.constant(tuple(range_))
+            elif self.vectorized:
+                raise TypeError("Can't vectorize symbolic range %s" %
+                                (range_,))
+            else:
+                # evaluate range at run time
+                rangecode = "%s(%s)" % (
+                    self.constant(lambda *vals:
+                                  range_(**dict(zip(symbols, vals)))),
+                    ", ".join(map(self.variable, symbols))
+                )
+        else:
+            rangecode = "(%s)" % "".join(self.code(val) + ", "
+                                         for val in range_)
+
+        # bind rangevar in body
+        local = "_k%d" % self.nloops
+        self.nloops += 1
+        names = self.names
+        self.names = dict(names)
+        self.names[expr.rangevar] = local
+        body = "lambda %s: %s" % (local, self.code(expr.expr))
+        self.names = names
+
+        return body, rangecode
+
+    @staticmethod
+    def loop_sum(function, range_):
+        """Sum a function over a range."""
+        return sum(function(val) for val in range_)
+
+    @staticmethod
+    def loop_prod(function, range_):
+        """Multiply a function over a range."""
+        return reduce(operator.mul, (function(val) for val in range_), 1)
+
+
+def compile_expression(expr, varnames, vectorized=False):
+    """Compile an Expression (uncached, see Expression.compile())."""
+    try:
+        return Compiler(varnames, vectorized).compile(expr)
+    except TypeError:
+        if not vectorized:
+            raise
+        # not vectorizable: element-wise Python function
+        return vectorize(expr.compile(varnames), len(varnames))
+
+
+def vectorize(function, nargs):
+    """Apply a scalar function element-wise to NumPy arrays."""
+    if not nargs:
+        return function
+    ufunc = np.frompyfunc(function, nargs, 1)
+
+    def vectorized(*args):
+        """Element-wise application."""
+        result = ufunc(*args)
+        if isinstance(result, np.ndarray):
+            # infer the numeric dtype
+            return np.array(result.tolist())
+        return result
+
+    return vectorized
+
+
+CacheInfo = namedtuple("CacheInfo", ("hits", "misses", "maxsize", "currsize"))
+
+
+class LRUCache(object):
+
+    """Least recently used cache with hit and miss statistics."""
+
+    def __init__(self, maxsize=1 << 14):
+        """Initialize an empty cache."""
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, key, function, *args, **kwargs):
+        """Look up a key or store function(*args, **kwargs) for it."""
+        try:
+            value = self.data.pop(key)
+            self.hits += 1
+        except KeyError:
+            self.misses += 1
+            value = function(*args, **kwargs)
+            if len(self.data) >= self.maxsize:
+                self.data.popitem(last=False)
+        self.data[key] = value
+        return value
+
+    def info(self):
+        """Hit and miss statistics."""
+        return CacheInfo(self.hits, self.misses, self.maxsize, len(self.data))
+
+    def clear(self):
+        """Empty the cache and reset the statistics."""
+        self.data.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+simplify_cache = LRUCache()
+substitute_cache = LRUCache()
+compile_cache = LRUCache(1 << 10)
+
+
+def unpickle_expression(cls, *args):
+    """Recreate an interned Expression when unpickling."""
+    return Expression.__new__(cls, *args)
+
+
+def cachekey(expr, kwargs):
+    """Key for an Expression and substitution (None if unhashable)."""
+    try:
+        key = expr, frozenset((name, type(val), val)
+                              for name, val in kwargs.iteritems())
+        hash(key)
+        return key
+    except TypeError:
+        return None
+
+
 def substitute(expr, **kwargs):
     """Substitute if Expression."""
     if isinstance(expr, (Expression, Range)):
+        key = cachekey(expr, kwargs)
+        if key is not None:
+            return substitute_cache.lookup(key, expr.substitute, **kwargs)
         return expr.substitute(**kwargs)
     if isinstance(expr, (list, tuple)):
         return type(expr)(substitute(e, **kwargs) for e in expr)
@@ -1046,6 +1598,9 @@ def substitute(expr, **kwargs):
 def simplify(expr, **kwargs):
     """(Substitute and) simplify if Expression."""
     if isinstance(expr, (Expression, Range)):
+        key = cachekey(expr, kwargs)
+        if key is not None:
+            return simplify_cache.lookup(key, expr.simplify, **kwargs)
         return expr.simplify(**kwargs)
     if isinstance(expr, (list, tuple)):
         return type(expr)(simplify(e, **kwargs) for e in expr)
@@ -1061,6 +1616,152 @@ def findsymbols(expr):
     return set()
 
 
+def dependson(expr, var):
+    """Check if expr contains the variable var."""
+    return any(symbol.name == var for symbol in findsymbols(expr))
+
+
+def bounds(expr, **intervals):
+    """Bounds for expr with variables in intervals (or None).
+
+    The intervals are (min, max) pairs or numbers.  The bounds are
+    guaranteed but not necessarily tight.
+    """
+    intervals = dict((name, val if isinstance(val, tuple) else (val, val))
+                     for name, val in intervals.iteritems())
+    return interval(expr, intervals)
+
+
+def interval(expr, intervals):
+    """Bounds for expr with variables in the intervals dict (or None)."""
+    if isinstance(expr, Expression):
+        if not hasattr(expr, "bounds"):
+            return None
+        return expr.bounds(intervals)
+    if isinstance(expr, Number):
+        return expr, expr
+    return None
+
+
+def interval_mul(interval1, interval2):
+    """Multiply two intervals (0 * inf = 0)."""
+    products = [val1 * val2 if val1 and val2 else 0
+                for val1 in interval1 for val2 in interval2]
+    return __builtin__.min(products), __builtin__.max(products)
+
+
+def interval_loop(expr, intervals):
+    """#values and bounds of the argument for a Sum or Prod (or None)."""
+    range_ = expr.range_
+    if isinstance(range_, Range):
+        if not range_.numeric:
+            # substitute variables with fixed values
+            range_ = range_(**dict((name, lo) for name, (lo, hi)
+                                   in intervals.iteritems() if lo == hi))
+            if not range_.numeric:
+                return None
+        if all(isinstance(val, (int, long))
+               for subrange in range_.subranges for val in subrange):
+            count = len(range_)
+            if not count:
+                return 0, (0, 0)
+            rangeinterval = range_.min(), range_.max()
+        else:
+            # len() and iteration may disagree for floats
+            vals = list(range_)
+            count = len(vals)
+            if not count:
+                return 0, (0, 0)
+            rangeinterval = __builtin__.min(vals), __builtin__.max(vals)
+    else:
+        count = len(range_)
+        if not count:
+            return 0, (0, 0)
+        valintervals = [interval(val, intervals) for val in range_]
+        if None in valintervals:
+            return None
+        rangeinterval = (__builtin__.min(lo for lo, _ in valintervals),
+                         __builtin__.max(hi for _, hi in valintervals))
+    intervals = dict(intervals)
+    intervals[expr.rangevar] = rangeinterval
+    interval_ = interval(expr.expr, intervals)
+    if interval_ is None:
+        return None
+    return count, interval_
+
+
+def polynomial(expr, var):
+    """Coefficients of expr as a polynomial in var (or None)."""
+    if isinstance(expr, Symbol) and expr.name == var:
+        return [0, 1]
+    if not dependson(expr, var):
+        return [expr]
+    if isinstance(expr, Minus):
+        coeffs = polynomial(expr.expr, var)
+        return coeffs and [-coeff for coeff in coeffs]
+    if isinstance(expr, (Plus, Times)):
+        coeffss = [polynomial(arg, var) for arg in expr]
+        if None in coeffss:
+            return None
+        if isinstance(expr, Plus):
+            return reduce(polynomial_add, coeffss)
+        return reduce(polynomial_mul, coeffss)
+    if (isinstance(expr, Power) and isinstance(expr.exponent, int) and
+            expr.exponent >= 0):
+        coeffs = polynomial(expr.base, var)
+        return coeffs and reduce(polynomial_mul, expr.exponent * [coeffs], [1])
+    if isinstance(expr, Div) and not dependson(expr.denominator, var):
+        coeffs = polynomial(expr.nominator, var)
+        return coeffs and [coeff / expr.denominator for coeff in coeffs]
+    return None
+
+
+def polynomial_add(coeffs1, coeffs2):
+    """Add two polynomials' coefficients."""
+    if len(coeffs1) < len(coeffs2):
+        coeffs1, coeffs2 = coeffs2, coeffs1
+    return ([coeff1 + coeff2 for coeff1, coeff2 in zip(coeffs1, coeffs2)] +
+            coeffs1[len(coeffs2):])
+
+
+def polynomial_mul(coeffs1, coeffs2):
+    """Multiply two polynomials' coefficients."""
+    result = (len(coeffs1) + len(coeffs2) - 1) * [0]
+    for power1, coeff1 in enumerate(coeffs1):
+        for power2, coeff2 in enumerate(coeffs2):
+            result[power1 + power2] += coeff1 * coeff2
+    return result
+
+
+def binomial(n, k):
+    """Binomial coefficient n choose k."""
+    result = 1
+    for i in range(__builtin__.min(k, n - k)):
+        result = result * (n - i) // (i + 1)
+    return result
+
+
+bernoulli_numbers = [Fraction(1)]
+
+
+def bernoulli(n):
+    """Bernoulli number B_n (with B_1 = -1/2)."""
+    while len(bernoulli_numbers) <= n:
+        m = len(bernoulli_numbers)
+        bernoulli_numbers.append(-sum(binomial(m + 1, k) * b
+                                      for k, b in enumerate(bernoulli_numbers))
+                                 / (m + 1))
+    return bernoulli_numbers[n]
+
+
+def faulhaber(power, count):
+    """Compute sum(k ** power for k in range(count)) in closed form."""
+    result = sum(binomial(power + 1, i) * bernoulli(i) *
+                 Fraction(count) ** (power + 1 - i)
+                 for i in range(power + 1)) / (power + 1)
+    return int(result)
+
+
 # math overloads
 
 def min(*args, **kwargs):
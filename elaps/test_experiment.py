@@ -62,6 +62,91 @@ class TestExperiment(unittest.TestCase):
         ex = Experiment(note="1234", range=("i", range(10)))
         self.assertEqual(eval(repr(ex)), ex)
 
+    def test_cache(self):
+        """Test for the derived state cache."""
+        n1, n2, n3 = self.ns[:3]
+        sig = Signature("name", Dim("m"), Dim("n"),
+                        cData("A", "ldA * n"), Ld("ldA", "m"))
+        ex = Experiment(calls=[sig(n1, n2, "X", n1)])
+
+        self.assertEqual(ex.get_operand("X")["dims"], (n1, n2))
+        self.assertIn(("operand", "X"), ex._cache)
+
+        # direct modification
+        ex.call.n = n3
+        self.assertEqual(ex.get_operand("X")["dims"], (n1, n3))
+        ex.call.A = "Y"
+        self.assertEqual(ex.operands, ("Y",))
+        ex.update_vary()
+        self.assertEqual(ex.vary.keys(), ["Y"])
+
+        # caches are not part of the experiment's state
+        ex2 = ex.copy()
+        self.assertIsNot(ex2._cache, ex._cache)
+        self.assertEqual(ex, ex2)
+        self.assertNotIn("_cache", repr(ex))
+
+    def test_ranges_table(self):
+        """Test for RangesTable."""
+        i, j = self.i, self.j
+        n1, n2 = self.ns[:2]
+        ex = Experiment(range=[i, range(1, n1 + 1)],
+                        sumrange=[j, Range("1:i", i=i)])
+
+        table = RangesTable(ex)
+        self.assertEqual(len(table), n1 * (n1 + 1) // 2)
+        self.assertEqual(table.array(i * j).tolist(),
+                         [i_ * j_ for i_ in range(1, n1 + 1)
+                          for j_ in range(1, i_ + 1)])
+        self.assertEqual(table.range_sums(j),
+                         [i_ * (i_ + 1) // 2 for i_ in range(1, n1 + 1)])
+        self.assertEqual(table.range_array(n2 * i).tolist(),
+                         [n2 * i_ for i_ in range(1, n1 + 1)])
+        point = table.offsets[n1 - 1]
+        self.assertEqual(table.value(i + j, point), n1 + 1)
+
+        # beyond int64
+        big = 10 ** 6
+        self.assertEqual(table.array(big * i * big * j * big).tolist(),
+                         [big ** 3 * i_ * j_ for i_ in range(1, n1 + 1)
+                          for j_ in range(1, i_ + 1)])
+        self.assertEqual(table.range_sums(big ** 3 * j), [
+            big ** 3 * i_ * (i_ + 1) // 2 for i_ in range(1, n1 + 1)
+        ])
+
+    def test_nresults(self):
+        """Test for nresults()."""
+        i, j = self.i, self.j
+        n1, n2 = self.ns[:2]
+        sig = Signature("name", Dim("m"))
+        ex = Experiment(calls=[sig(1), sig(2)], range=[i, range(1, n1 + 1)],
+                        nreps=n2, sumrange=[j, Range("1:i", i=i)])
+
+        self.assertEqual(ex.nresults(), 2 * n2 * n1 * (n1 + 1) // 2)
+        ex.calls_parallel = True
+        self.assertEqual(ex.nresults(), n2 * n1 * (n1 + 1) // 2)
+        ex.sumrange_parallel = True
+        self.assertEqual(ex.nresults(), n2 * n1)
+
+    def test_ranges_eval_minmax(self):
+        """Test for ranges_eval_minmax()."""
+        i, j = self.i, self.j
+        n1, n2 = self.ns[:2]
+        ex = Experiment(range=[i, range(1, n1 + 1)],
+                        sumrange=[j, Range("1:i", i=i)])
+
+        self.assertEqual(ex.ranges_intervals(), {"i": (1, n1), "j": (1, n1)})
+        self.assertEqual(ex.ranges_eval_minmax(n2 * i + j), (n2 + 1,
+                                                             (n2 + 1) * n1))
+        self.assertEqual(ex.ranges_eval_minmax(n2 * i, dosumrange=False),
+                         (n2, n2 * n1))
+        # non-monotonic
+        self.assertEqual(ex.ranges_eval_minmax((i - 1) * (i - n1)), (
+            min((val - 1) * (val - n1) for val in range(1, n1 + 1)), 0
+        ))
+        self.assertEqual(ex.ranges_eval_minmax(i - j), (0, n1 - 1))
+        self.assertEqual(ex.ranges_bounds(i + self.k), None)
+
     def test_infer_lds(self):
         """Test for infer_ld[s]()."""
         n1, n2, n3, n4, n5 = self.ns[:5]
@@ -415,6 +500,11 @@ class TestExperimentSetters(TestExperiment):
         ex.set_nthreads(1, check_only=True)
         self.assertEqual(ex.nthreads, nt_max)
 
+        # non-monotonic
+        ex.range = [i, range(1, 9)]
+        ex.set_nthreads("min(i * (9 - i) - 7, %d)" % nt_max)
+        self.assertEqual(ex.nthreads, Min(i * (9 - i) - 7, nt_max))
+
     def test_set_nreps(self):
         """Test for set_nreps()."""
         ex, i = self.ex, self.i
@@ -427,6 +517,11 @@ class TestExperimentSetters(TestExperiment):
         ex.set_nreps("2 * i")
         self.assertEqual(ex.nreps, 2 * i)
 
+        # non-monotonic
+        ex.range = [i, range(1, 11)]
+        ex.set_nreps("i * i - i + 1")
+        self.assertEqual(ex.nreps, i * i - i + 1)
+
         # empty
         self.assertRaises(ValueError, ex.set_nreps, "")
         ex.set_nreps("", force=True)
@@ -865,7 +960,7 @@ class TestExperimentCmds(unittest.TestCase):
         ex.call.ldA = ldA = random.randint(100, 200)
         ex.call.ldB = ldB = random.randint(100, 200)
         ex.call.ldC = ldC = random.randint(100, 200)
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
         cmds = [cmd for cmd in cmds if cmd and cmd[0][0] != "#"]
         self.assertEqual(cmds, [
             ["smalloc", "X", ldA * n],
@@ -892,7 +987,7 @@ class TestExperimentCmds(unittest.TestCase):
         ex.vary["Z"]["with"].update(["rep", "j"])
         ex.infer_lds()
 
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
 
         self.assertIn(["smalloc", "X", nreps * m * n], cmds)
         idx = random.randint(0, nreps - 1)
@@ -927,7 +1022,7 @@ class TestExperimentCmds(unittest.TestCase):
         ex.vary["X"]["with"].add("rep")
         ex.infer_lds()
 
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
 
         self.assertIn(["smalloc", "X", nreps * m * n + (nreps - 1) * m], cmds)
         rangeidx = random.randint(0, lenrange - 1)
@@ -951,7 +1046,7 @@ class TestExperimentCmds(unittest.TestCase):
 
         ex.infer_lds()
 
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
 
         rangeidx = random.randint(0, lenrange - 1)
         sumrangeidx = random.randint(0, lensumrange - 1)
@@ -971,7 +1066,7 @@ class TestExperimentCmds(unittest.TestCase):
         ex.vary["X"]["along"] = 1
         ex.infer_lds()
 
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
 
         self.assertIn(["smalloc", "X", nreps * m * n], cmds)
         repidx = random.randint(0, nreps - 1)
@@ -990,7 +1085,7 @@ class TestExperimentCmds(unittest.TestCase):
         ex.vary["X"]["offset"] = offset
         ex.infer_lds()
 
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
 
         self.assertIn(["smalloc", "X", nreps * m * n + (nreps - 1) * offset],
                       cmds)
@@ -1006,7 +1101,7 @@ class TestExperimentCmds(unittest.TestCase):
         ex.vary["X"]["with"].add("rep")
         ex.infer_lds()
 
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
 
         idx = random.randint(0, nreps - 1)
         self.assertIn(["name", m, n, "X_%d" % idx, m, "Y", m, "Z", n], cmds)
@@ -1022,7 +1117,7 @@ class TestExperimentCmds(unittest.TestCase):
         ex.nreps = nreps
         ex.calls_parallel = True
 
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
 
         self.assertEqual(cmds.count(["{omp"]), nreps)
         self.assertEqual(cmds.count(["}"]), nreps)
@@ -1031,7 +1126,7 @@ class TestExperimentCmds(unittest.TestCase):
         ex.sumrange = [j, range(lensumrange)]
         ex.sumrange_parallel = True
 
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
 
         self.assertEqual(cmds.count(["{omp"]), nreps)
         self.assertEqual(cmds.count(["}"]), nreps)
@@ -1043,17 +1138,80 @@ class TestExperimentCmds(unittest.TestCase):
 
         sig = ("name", "char*", "int*", "double*", "double*")
         ex.call = BasicCall(sig, "N", 100, 1.5, [10000])
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
         self.assertIn(["name", "N", 100, 1.5, [10000]], cmds)
 
         # now with a range
         lenrange = random.randint(1, 10)
         ex.range = [i, range(lenrange)]
         ex.call = BasicCall(sig, "N", i - 1, 1.5, [i * i])
-        cmds = ex.generate_cmds()
+        cmds = list(ex.generate_cmds())
         idx = random.randint(0, lenrange - 1)
         self.assertIn(["name", "N", idx - 1, 1.5, [idx * idx]], cmds)
 
+    def test_randomize(self):
+        """Test for operand randomization per range value."""
+        ex = self.ex
+        i = self.i
+        n = self.n
+
+        lenrange = random.randint(1, 10)
+        ex.range = [i, range(1, lenrange + 1)]
+        ex.range_randomize_data = True
+        ex.call.m = i
+        ex.vary["X"]["with"].add(i)
+        ex.infer_lds()
+
+        cmds = list(ex.generate_cmds())
+
+        idx = random.randint(1, lenrange)
+        self.assertIn([" sgerand", idx * n, 1, "X", idx * n], cmds)
+        size = lenrange * n
+        self.assertIn([" cgerand", n * n, 1, "Z", n * n], cmds)
+        self.assertIn(["smalloc", "X", size], cmds)
+
+    def test_malloc_size(self):
+        """Test for exact malloc sizes of non-varying operands."""
+        ex = self.ex
+        i = self.i
+        n = self.n
+
+        lenrange = random.randint(1, 10)
+        ex.range = [i, range(1, lenrange + 1)]
+        ex.call.m = i * (lenrange + 1 - i)
+        ex.infer_lds()
+
+        size = max(val * (lenrange + 1 - val)
+                   for val in range(1, lenrange + 1)) * n
+        self.assertIn(["smalloc", "X", size], list(ex.generate_cmds()))
+        self.assertIn(["smalloc", "X", size], list(ex.generate_cmds(1)))
+
+    def test_compact(self):
+        """Test repetitions as Sampler loops."""
+        ex = self.ex
+        m = self.m
+        n = self.n
+
+        nreps = random.randint(2, 10)
+        ex.nreps = nreps
+        ex.vary["X"]["with"].add("rep")
+        ex.infer_lds()
+
+        cmds = list(ex.generate_cmds(compact=True))
+
+        self.assertIn(["{for", "rep", 0, nreps], cmds)
+        self.assertEqual(cmds.count(["name", m, n, "X_${rep}", m, "Y", m,
+                                     "Z", n]), 1)
+        self.assertEqual(cmds.count(["}"]), 1)
+        self.assertEqual(cmds.count(["go"]), 1)
+
+        # shuffled: all range values in one loop
+        ex.shuffle = True
+        cmds = list(ex.generate_cmds(compact=True))
+
+        self.assertIn(["{for", "rep", 0, nreps], cmds)
+        self.assertEqual(cmds[-2:], [["go"], ["}"]])
+
 
 class TestExperimentSubmit(TestExperimentCmds):
 
@@ -0,0 +1,236 @@
+#!/usr/bin/env python
+"""Unittest for export.py."""
+
+import os
+import sys
+import csv
+import glob
+import random
+import shutil
+import unittest
+from StringIO import StringIO
+
+try:
+    import elaps
+except:
+    import sys
+    sys.path.append(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+
+try:
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+try:
+    import pandas
+    import tables
+except ImportError:
+    pandas = None
+
+from elaps import symbolic
+from elaps.signature import Signature, Dim
+from elaps.experiment import Experiment
+from elaps.report import Report
+from elaps.export import *
+from elaps.bin import export as export_bin
+
+
+class TestExport(unittest.TestCase):
+
+    """Tests for the Report export."""
+
+    def setUp(self):
+        """Set up Experiment."""
+        self.ex = Experiment(sampler={
+            "backend_name": "",
+            "backend_header": "",
+            "backend_prefix": "prefix{nt}",
+            "backend_suffix": "",
+            "backend_footer": "",
+            "kernels": {},
+            "nt_max": 10,
+            "exe": "executable",
+            "papi_counters_max": 2
+        })
+        self.i = symbolic.Symbol("i")
+        self.j = symbolic.Symbol("j")
+        self.filebase = "test_export.py_tmp"
+
+    def tearDown(self):
+        """Delete temporary files."""
+        for filename in glob.glob(self.filebase + "*"):
+            if os.path.isdir(filename):
+                shutil.rmtree(filename)
+            else:
+                os.remove(filename)
+
+    def test_report_chunks(self):
+        """Test for report_chunks()."""
+        ex, i, j = self.ex, self.i, self.j
+
+        lenrange = random.randint(1, 10)
+        nreps = random.randint(1, 5)
+        rows = [
+            (range_val, rep, sumrange_val, callid)
+            for range_val in range(1, lenrange + 1)
+            for rep in range(nreps)
+            for sumrange_val in range(range_val)
+            for callid in range(2)
+        ]
+        vals = dict((row, random.randint(1, 1000)) for row in rows)
+
+        ex.range = [i, range(1, lenrange + 1)]
+        ex.sumrange = [j, symbolic.Range("0:i - 1", i=i)]
+        ex.nreps = nreps
+        sig = Signature("name", Dim("m"), Dim("n"), flops="m * n")
+        ex.calls = [sig(i, j), Signature("other")()]
+        rawdata = [[0]] + [[vals[row]] for row in rows] + [[1]]
+        report = Report(ex, rawdata)
+
+        chunksize = random.randint(1, 20)
+        chunks = list(report_chunks(report, "name", chunksize))
+        self.assertTrue(all(len(chunk["rep"]) <= chunksize
+                            for chunk in chunks))
+        self.assertEqual(chunks[0].keys(), [
+            "report", "range_val", "rep", "sumrange_val", "callid", "call",
+            "cycles", "flops"
+        ])
+        exported = [
+            row for chunk in chunks
+            for row in zip(*[column.tolist() for column in chunk.values()])
+        ]
+        self.assertEqual(len(exported), len(rows))
+        for row, exported_row in zip(rows, exported):
+            range_val, rep, sumrange_val, callid = row
+            self.assertEqual(exported_row[:7], (
+                "name", range_val, rep, sumrange_val, callid,
+                ex.calls[callid][0], vals[row]
+            ))
+            if callid == 0:
+                self.assertEqual(exported_row[7], range_val * sumrange_val)
+
+        # dropped repetitions are not exported
+        chunks = list(report_chunks(report.drop_reps(1)))
+        self.assertEqual(sum(len(chunk["rep"]) for chunk in chunks),
+                         len(rows) - (nreps > 1) * len(rows) // nreps)
+
+    def report(self):
+        """Create a Report with a counter and random measurements."""
+        ex = self.ex
+        nreps = random.randint(1, 10)
+        vals = [[random.randint(1, 1000) for _ in range(2)]
+                for _ in range(nreps)]
+
+        ex.call = Signature("name")()
+        ex.nreps = nreps
+        ex.papi_counters = ["C1"]
+        rawdata = [[0]] + vals + [[1]]
+        return Report(ex, rawdata), vals
+
+    def test_export_csv(self):
+        """Test for export_report() to CSV."""
+        report, vals = self.report()
+
+        filename = self.filebase + ".csv"
+        export_report(report, filename, name="name", chunksize=3)
+        with open(filename) as fin:
+            lines = list(csv.reader(fin))
+        self.assertEqual(lines[0],
+                         ["report", "rep", "callid", "call", "cycles", "C1"])
+        self.assertEqual(lines[1:], [
+            ["name", str(rep), "0", "name"] + map(str, rep_vals)
+            for rep, rep_vals in enumerate(vals)
+        ])
+
+        self.assertRaises(ValueError, export_report, report,
+                          self.filebase + ".unknown")
+
+    @unittest.skipUnless(pyarrow, "requires pyarrow")
+    def test_export_parquet(self):
+        """Test for export_report() to Parquet."""
+        report, vals = self.report()
+
+        filename = self.filebase + ".parquet"
+        export_report(report, filename, name="name", chunksize=3)
+        table = pyarrow.parquet.read_table(filename)
+        self.assertEqual(table.column_names,
+                         ["report", "rep", "callid", "call", "cycles", "C1"])
+        self.assertEqual(zip(*[table.column(column).to_pylist()
+                               for column in table.column_names]), [
+            ("name", rep, 0, "name") + tuple(rep_vals)
+            for rep, rep_vals in enumerate(vals)
+        ])
+
+    @unittest.skipUnless(pandas, "requires pandas and PyTables")
+    def test_export_hdf5(self):
+        """Test for export_report() to HDF5."""
+        report, vals = self.report()
+
+        filename = self.filebase + ".h5"
+        export_report(report, filename, name="name", chunksize=3)
+        frame = pandas.read_hdf(filename, "report")
+        self.assertEqual(list(frame.columns),
+                         ["report", "rep", "callid", "call", "cycles", "C1"])
+        self.assertEqual(map(tuple, frame.values.tolist()), [
+            ("name", rep, 0, "name") + tuple(rep_vals)
+            for rep, rep_vals in enumerate(vals)
+        ])
+
+    def export_main(self, *args):
+        """Run the export script with arguments (returns its output)."""
+        argv, stdout, stderr = sys.argv, sys.stdout, sys.stderr
+        sys.argv = ["elaps-export", "-j", "1"] + list(args)
+        sys.stdout = sys.stderr = StringIO()
+        try:
+            export_bin.main()
+            return sys.stdout.getvalue()
+        finally:
+            sys.argv, sys.stdout, sys.stderr = argv, stdout, stderr
+
+    def test_main(self):
+        """Test for the export script."""
+        report, vals = self.report()
+        indir = self.filebase + "_in"
+        outdir = self.filebase + "_out"
+        os.makedirs(os.path.join(indir, "sub"))
+        filenames = [os.path.join(indir, "a.elr"),
+                     os.path.join(indir, "sub", "b.elr")]
+        for filename in filenames:
+            with open(filename, "w") as fout:
+                fout.write("%r\n" % report.experiment)
+                for line in report.rawdata:
+                    fout.write(" ".join(map(str, line)) + "\n")
+
+        self.assertEqual(list(export_bin.report_files([indir])), [
+            (filenames[0], "a.elr"),
+            (filenames[1], os.path.join("sub", "b.elr"))
+        ])
+        self.assertEqual(list(export_bin.report_files([filenames[1]])),
+                         [(filenames[1], "b.elr")])
+
+        # directory structure is kept in the output directory
+        self.export_main("-o", outdir, indir)
+        with open(os.path.join(outdir, "sub", "b.csv")) as fin:
+            lines = list(csv.reader(fin))
+        self.assertEqual(lines[1:], [
+            ["b", str(rep), "0", "name"] + map(str, rep_vals)
+            for rep, rep_vals in enumerate(vals)
+        ])
+        self.assertTrue(os.path.isfile(os.path.join(outdir, "a.csv")))
+
+        # name collision
+        self.assertRaises(SystemExit, self.export_main, "-o", outdir,
+                          filenames[0], indir)
+
+        # not a Report
+        filename = os.path.join(indir, "notes.txt")
+        open(filename, "w").close()
+        with self.assertRaises(SystemExit) as context:
+            self.export_main(filename)
+        self.assertEqual(context.exception.code, 2)
+        self.assertFalse(os.path.exists(os.path.join(indir, "notes.csv")))
+
+
+if __name__ == "__main__":
+    unittest.main()
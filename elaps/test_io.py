@@ -94,6 +94,121 @@ class TestLoaders(unittest.TestCase):
 
         load_report(filename)
 
+    def test_load_report_cache(self):
+        """Test for load_report() through the cache file."""
+        ex = Experiment(calls=[Signature("name", Dim("m"))(10)], sampler={
+            "backend_name": "",
+            "backend_header": "",
+            "backend_prefix": "prefix{nt}",
+            "backend_suffix": "",
+            "backend_footer": "",
+            "kernels": {},
+            "nt_max": 10,
+            "exe": "executable"
+        })
+        ex.nreps = 3
+        filename = self.filebase + ".elr"
+        cachefile = "%s.%s" % (filename, defines.report_cache_extension)
+
+        with open(filename, "w") as fout:
+            fout.write("%r\n1\n2\n3\n4\n5\n" % ex)
+
+        report = load_report(filename)
+        self.assertTrue(os.path.isfile(cachefile))
+        report2 = load_report(filename)
+        self.assertEqual(report2.experiment, report.experiment)
+        self.assertEqual(report2.rawdata, report.rawdata)
+        self.assertEqual(report2.data, report.data)
+
+        # outdated cache
+        with open(filename, "w") as fout:
+            fout.write("%r\n1\n2\n3\n4\n5\n6\n" % ex)
+        self.assertEqual(load_report(filename).endtime, 5)
+
+        # no trailing newline after the endtime
+        os.remove(cachefile)
+        with open(filename, "w") as fout:
+            fout.write("%r\n1\n2\n3\n4\n5" % ex)
+        report = load_report(filename)
+        self.assertFalse(report.truncated)
+        self.assertEqual(report.endtime, 5)
+        self.assertTrue(os.path.isfile(cachefile))
+        self.assertFalse(load_report(filename).truncated)
+
+        # streaming without the first repetition
+        report = load_report(filename, discard_first_repetitions=True,
+                             streaming=True)
+        summary = report.summaries[0, -1, 0]
+        self.assertEqual((summary.count, summary.min), (2, 3))
+
+    def test_update_report(self):
+        """Test for update_report()."""
+        ex = Experiment(calls=[Signature("name", Dim("m"))(10)], sampler={
+            "backend_name": "",
+            "backend_header": "",
+            "backend_prefix": "prefix{nt}",
+            "backend_suffix": "",
+            "backend_footer": "",
+            "kernels": {},
+            "nt_max": 10,
+            "exe": "executable"
+        })
+        ex.nreps = 3
+        filename = self.filebase + ".elr"
+
+        with open(filename, "w") as fout:
+            fout.write("%r\n1\n2\n3" % ex)
+        report = load_report(filename)
+        self.assertTrue(report.truncated)
+        self.assertEqual(len(report.data[None]), 1)
+
+        with open(filename, "a") as fout:
+            fout.write("4\n4\n5\n")
+        self.assertEqual(update_report(report, filename), [0])
+        self.assertFalse(report.truncated)
+        self.assertEqual(report.endtime, 5)
+        self.assertEqual(report.data, load_report(filename).data)
+
+        # replaced file
+        with open(filename, "w") as fout:
+            fout.write("%r\n1\n2\n3\n" % ex)
+        report = load_report(filename)
+        with open(filename, "w") as fout:
+            fout.write("%r\n1\n" % ex)
+        self.assertIsNone(update_report(report, filename))
+
+    def test_report_progress(self):
+        """Test for ReportProgress."""
+        ex = Experiment(calls=[Signature("name", Dim("m"))(10)], sampler={
+            "backend_name": "",
+            "backend_header": "",
+            "backend_prefix": "prefix{nt}",
+            "backend_suffix": "",
+            "backend_footer": "",
+            "kernels": {},
+            "nt_max": 10,
+            "exe": "executable"
+        })
+        ex.nreps = 5
+        filename = self.filebase + ".elr"
+
+        tracker = ReportProgress(filename)
+        self.assertIsNone(tracker.update())
+
+        with open(filename, "w") as fout:
+            fout.write("%r\n1\n2\n3\n4" % ex)
+        self.assertEqual(tracker.update(), 2)
+        self.assertEqual(tracker.nresults, 5)
+
+        with open(filename, "a") as fout:
+            fout.write("\n5\n")
+        self.assertEqual(tracker.update(chunksize=2), 4)
+
+        # replaced file
+        with open(filename, "w") as fout:
+            fout.write("%r\n1\n" % ex)
+        self.assertEqual(tracker.update(), 0)
+
     def test_load_metric(self):
         """Test for load_metric()."""
         metric = load_metric("efficiency")
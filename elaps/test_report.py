@@ -3,6 +3,9 @@
 
 import random
 import unittest
+import pickle
+
+import numpy as np
 
 try:
     import elaps
@@ -14,8 +17,9 @@ except:
     )
 
 from elaps.signature import *
+from elaps.symbolic import Symbol
 from elaps.experiment import Experiment
-from elaps.report import Report
+from elaps.report import Report, vectorize_metric, bootstrap_ci
 
 
 class TestReport(unittest.TestCase):
@@ -58,6 +62,62 @@ class TestReport(unittest.TestCase):
         report = Report(ex, rawdata)
         self.assertTrue(report.truncated)
 
+    def test_values(self):
+        """Test for the measurement arrays."""
+        ex, i = self.ex, self.i
+
+        lenrange = random.randint(2, 10)
+        nreps = random.randint(2, 10)
+        vals = [[random.randint(1, 1000), random.randint(1, 1000)]
+                for _ in range(lenrange * nreps)]
+
+        ex.call = Signature("name")()
+        ex.range = [i, range(lenrange)]
+        ex.nreps = nreps
+        ex.papi_counters = ["C1"]
+        rawdata = [[0]] + vals[:-1]
+
+        report = Report(ex, rawdata)
+        self.assertTrue(report.truncated)
+        self.assertEqual(report.counters, ("cycles", "C1"))
+        self.assertEqual(report.values.shape, (lenrange, nreps, 1, 1, 2))
+        rangeidx, rep = divmod(random.randint(0, lenrange * nreps - 2), nreps)
+        self.assertEqual(report.values[rangeidx, rep, 0, 0].tolist(),
+                         vals[rangeidx * nreps + rep])
+        self.assertEqual(report.values.count(), 2 * (lenrange * nreps - 1))
+        self.assertTrue(report.values.mask[-1, -1].all())
+        self.assertEqual(len(report.fulldata[lenrange - 1]), nreps - 1)
+
+    def test_lines(self):
+        """Test for parsing report file lines."""
+        ex, i = self.ex, self.i
+
+        lenrange = random.randint(1, 10)
+        nreps = random.randint(1, 10)
+        vals = [(random.randint(1, 1000), random.randint(1, 1000))
+                for _ in range(lenrange * nreps)]
+
+        ex.call = Signature("name")()
+        ex.range = [i, range(lenrange)]
+        ex.nreps = nreps
+        ex.papi_counters = ["C1"]
+        lines = ["0\n"] + ["%d  %d\n" % val for val in vals] + ["1\n"]
+        errline = random.randint(1, len(lines) - 2)
+        lines.insert(errline, random.choice(["x\n", "1\n", "1 2 3\n"]))
+
+        report = Report(ex, lines=lines)
+        self.assertTrue(report.error)
+        self.assertFalse(report.truncated)
+        self.assertEqual(report.starttime, 0)
+        self.assertEqual(report.endtime, 1)
+        self.assertEqual(report.rawdata, ((0,),) + tuple(vals) + ((1,),))
+
+        # small chunks
+        report2 = Report(ex, lines=[])
+        report2.values_fromlines(lines, random.randint(1, 10))
+        self.assertEqual(report2.rawdata, report.rawdata)
+        self.assertEqual(report2.data, report.data)
+
     def test_range(self):
         """Test for Experiment with range."""
         ex, i = self.ex, self.i
@@ -275,11 +335,261 @@ class TestReport(unittest.TestCase):
         metricdata = report.evaluate(0, metric)
         self.assertEqual(metricdata, {None: [val]})
 
+        # function callselectors (called with scalars)
+        val2 = random.randint(1, 1000)
+        ex.calls = [Signature("name")(), Signature("other")()]
+        report = Report(ex, [[0], [val], [val2], [1]])
+        self.assertEqual(report.evaluate(lambda d: max(d), metric, "med"),
+                         {None: max(val, val2)})
+        self.assertEqual(report.evaluate(lambda d: d[0] - d[1], metric),
+                         {None: [val - val2]})
+
         # parallel
+        ex.call = Signature("name")()
         ex.sumrange_parallel = True
         report = Report(ex, rawdata)
         metricdata = report.evaluate(None, metric)
         self.assertEqual(metricdata, {None: [val]})
+        self.assertEqual(report.evaluate(lambda x: 2 * x, metric),
+                         {None: [2 * val]})
+
+        # parallel with a range: callids select all calls
+        lenrange = random.randint(2, 10)
+        vals = [random.randint(1, 1000) for _ in range(lenrange)]
+        ex.range = [self.i, range(lenrange)]
+        ex.calls = [Signature("name")(), Signature("other")()]
+        ex.sumrange_parallel = False
+        ex.calls_parallel = True
+        report = Report(ex, [[0]] + [[val] for val in vals] + [[1]])
+        result = dict((range_val, [val]) for range_val, val in enumerate(vals))
+        self.assertEqual(report.evaluate(0, metric), result)
+        self.assertEqual(report.evaluate([0, 1], metric), result)
+
+    def test_evaluate_sumrange(self):
+        """Test for evaluate() keeping the sumrange."""
+        ex, i, j = self.ex, self.i, self.j
+
+        lenrange = random.randint(1, 10)
+        nreps = random.randint(1, 5)
+        vals = dict(((range_val, rep, sumrange_val), random.randint(1, 1000))
+                    for range_val in range(1, lenrange + 1)
+                    for rep in range(nreps)
+                    for sumrange_val in range(range_val))
+
+        ex.range = [i, range(1, lenrange + 1)]
+        ex.sumrange = [j, symbolic.Range("0:i - 1", i=i)]
+        ex.nreps = nreps
+        sig = Signature("name", Dim("m"), Dim("n"), flops="m * n")
+        ex.call = sig(i, j)
+        rawdata = [[0]] + [[vals[key]] for key in sorted(vals)] + [[1]]
+
+        def cycles(data, **kwargs):
+            return data.get("cycles")
+
+        def flops(data, **kwargs):
+            return data.get("flops")
+
+        report = Report(ex, rawdata)
+        self.assertEqual(report.evaluate(None, cycles, "all", True), dict(
+            ((range_val, sumrange_val),
+             [vals[range_val, rep, sumrange_val] for rep in range(nreps)])
+            for range_val in range(1, lenrange + 1)
+            for sumrange_val in range(range_val)
+        ))
+        self.assertEqual(report.evaluate(0, flops, "med", sumrange=True), dict(
+            ((range_val, sumrange_val), range_val * sumrange_val)
+            for range_val in range(1, lenrange + 1)
+            for sumrange_val in range(range_val)
+        ))
+
+        # sumrange_parallel
+        ex.sumrange_parallel = True
+        report = Report(ex, [[0]] + lenrange * nreps * [[1]] + [[1]])
+        self.assertRaises(ValueError, report.evaluate, None, cycles, "med",
+                          True)
+
+    def test_evaluate_vectorized(self):
+        """Test for evaluate() with vectorized metrics."""
+        ex, i = self.ex, self.i
+
+        lenrange = random.randint(1, 10)
+        nreps = random.randint(1, 10)
+        vals = [random.randint(1, 1000) for _ in range(lenrange * nreps)]
+
+        ex.calls = [Signature("name")(), Signature("name")()]
+        ex.range = [i, range(lenrange)]
+        ex.nreps = nreps
+        rawdata = [[0]] + [[val] for val in vals for _ in range(2)] + [[1]]
+
+        def metric(data, nthreads, **kwargs):
+            self.assertEqual(data["cycles"].shape, (lenrange, nreps))
+            self.assertEqual(nthreads.shape, (lenrange, 1))
+            return data["cycles"]
+        metric.vectorized = True
+
+        report = Report(ex, rawdata)
+        metricdata = report.evaluate([0, 1], metric)
+        self.assertEqual(metricdata, dict(
+            (range_val, [2 * val
+                         for val in vals[range_val * nreps:
+                                         (range_val + 1) * nreps]])
+            for range_val in range(lenrange)
+        ))
+
+        # scalar metric through vectorize_metric()
+        def scalar_metric(data, nthreads, **kwargs):
+            self.assertIsInstance(nthreads, int)
+            return data.get("cycles")
+
+        self.assertEqual(report.evaluate([0, 1], scalar_metric), metricdata)
+        self.assertTrue(vectorize_metric(scalar_metric).vectorized)
+        self.assertEqual(vectorize_metric(metric), metric)
+
+    def test_evaluate_cached(self):
+        """Test for the caching in evaluate()."""
+        ex = self.ex
+
+        nreps = random.randint(2, 10)
+        vals = [random.randint(1, 1000) for _ in range(nreps)]
+
+        ex.call = Signature("name")()
+        ex.nreps = nreps
+        lines = ["0\n"] + ["%d\n" % val for val in vals] + ["1\n"]
+
+        ncalls = [0]
+
+        def metric(data, **kwargs):
+            ncalls[0] += 1
+            return data.get("cycles")
+        metric.vectorized = True
+
+        report = Report(ex, lines=lines[:-2])
+        self.assertEqual(report.evaluate(0, metric), {None: vals[:-1]})
+        self.assertEqual(report.evaluate(0, metric), {None: vals[:-1]})
+        self.assertEqual(report.evaluate([0], metric), {None: vals[:-1]})
+        self.assertEqual(ncalls[0], 2)
+        report.evaluate(0, metric, "min")
+        report.evaluate(0, metric, "min")
+        self.assertEqual(ncalls[0], 3)
+
+        # new measurements
+        report.append_lines(lines[-2:])
+        self.assertEqual(report.evaluate(0, metric), {None: vals})
+        self.assertEqual(ncalls[0], 4)
+
+        # discarded first repetitions
+        report2 = report.discard_first_repetitions()
+        self.assertEqual(report2.evaluate(0, metric), {None: vals[1:]})
+        self.assertEqual(ncalls[0], 5)
+
+    def test_evaluate_stats(self):
+        """Test for evaluate() with statistics."""
+        ex, i = self.ex, self.i
+
+        lenrange = random.randint(1, 10)
+        nreps = random.randint(1, 10)
+        vals = [random.randint(1, 1000) for _ in range(lenrange * nreps)]
+
+        ex.call = Signature("name")()
+        ex.range = [i, range(lenrange)]
+        ex.nreps = nreps
+        rawdata = [[0]] + [[val] for val in vals] + [[1]]
+
+        def metric(data, **kwargs):
+            return data.get("cycles")
+        metric.vectorized = True
+
+        report = Report(ex, rawdata)
+        range_val = random.randint(0, lenrange - 1)
+        range_vals = vals[range_val * nreps:(range_val + 1) * nreps]
+        for stat, value in (
+                ("min", min(range_vals)),
+                ("max", max(range_vals)),
+                ("med", np.median(range_vals)),
+                ("avg", np.mean(range_vals)),
+                ("std", np.std(range_vals)),
+                ("p25", np.percentile(range_vals, 25)),
+                ("p95", np.percentile(range_vals, 95)),
+                ("mad", np.median(abs(np.array(range_vals) -
+                                      np.median(range_vals))))
+        ):
+            self.assertAlmostEqual(
+                report.evaluate(0, metric, stat)[range_val], value
+            )
+        self.assertIsInstance(report.evaluate(0, metric, "min")[range_val],
+                              int)
+        lower, upper = report.evaluate(0, metric, "ci")[range_val]
+        self.assertTrue(lower <= np.mean(range_vals) <= upper)
+
+        # batched resampling
+        values = np.array([range_vals + [np.nan], len(range_vals) * [1] +
+                           [np.nan]], dtype=float)
+        self.assertTrue(np.array_equal(bootstrap_ci(values, batchsize=1),
+                                       bootstrap_ci(values)))
+
+    def test_streaming(self):
+        """Test for streaming mode."""
+        ex, i, j = self.ex, self.i, self.j
+
+        lenrange = random.randint(1, 10)
+        lensumrange = random.randint(1, 10)
+        nreps = random.randint(1, 100)
+
+        ex.calls = [Signature("name")(), Signature("name")()]
+        ex.range = [i, range(lenrange)]
+        ex.sumrange = [j, range(lensumrange)]
+        ex.nreps = nreps
+        lines = (["0\n"] +
+                 ["%d\n" % random.randint(1, 1000)
+                  for _ in range(lenrange * nreps * lensumrange * 2)] +
+                 ["1\n"])
+
+        def metric(data, **kwargs):
+            return data.get("cycles")
+        metric.vectorized = True
+
+        report = Report(ex, lines=lines)
+        cut = random.randint(0, len(lines))
+        report2 = Report(ex, lines=lines[:cut], streaming=True)
+        report2.append_lines(lines[cut:])
+        self.assertFalse(report2.truncated)
+        self.assertIsNone(report2.values)
+        self.assertRaises(ValueError, getattr, report2, "data")
+        for callselector in (None, 0, [1]):
+            for stat in ("min", "max"):
+                self.assertEqual(report2.evaluate(callselector, metric, stat),
+                                 report.evaluate(callselector, metric, stat))
+        self.assertRaises(ValueError, report2.evaluate, None, metric, "avg")
+
+        # moments of linear metrics
+        def linear_metric(data, **kwargs):
+            return 2 * data.get("cycles") + 1
+        linear_metric.vectorized = True
+        linear_metric.linear = True
+        for stat in ("avg", "std"):
+            result = report.evaluate(1, linear_metric, stat)
+            result2 = report2.evaluate(1, linear_metric, stat)
+            self.assertEqual(result2.keys(), result.keys())
+            for range_val in result:
+                self.assertAlmostEqual(result2[range_val], result[range_val])
+
+        self.assertRaises(ValueError, report2.discard_first_repetitions)
+
+        # first repetitions discarded while parsing
+        report3 = Report(ex, lines=lines, streaming=True,
+                         discard_first_repetitions=True)
+        self.assertIs(report3.discard_first_repetitions(), report3)
+        for stat in ("min", "max"):
+            self.assertEqual(
+                report3.evaluate(None, metric, stat),
+                report.discard_first_repetitions().evaluate(None, metric, stat)
+            )
+        self.assertEqual(report3.summaries[0, -1, 0].count, max(nreps - 1, 1))
+
+        summary = report2.summaries[0, -1, 0]
+        self.assertEqual(summary.count, nreps)
+        self.assertAlmostEqual(summary.mean,
+                               report.evaluate(None, metric, "avg")[0])
 
     def test_discrard_frist_repetitions(self):
         """Test discard_first_repetitions()."""
@@ -299,5 +609,161 @@ class TestReport(unittest.TestCase):
         self.assertEqual(report2.rawdata, report.rawdata)
         self.assertEqual(len(report2.fulldata[None]), nreps - 1)
 
+    def test_select(self):
+        """Test select()."""
+        ex, i = self.ex, self.i
+
+        lenrange = random.randint(2, 10)
+        nreps = random.randint(2, 10)
+        vals = [[random.randint(1, 1000) for _ in range(2)]
+                for _ in range(lenrange * nreps)]
+
+        ex.calls = [Signature("name")(), Signature("name")()]
+        ex.range = [i, range(lenrange)]
+        ex.nreps = nreps
+        rawdata = [[0]] + [[val] for rep in vals for val in rep] + [[1]]
+
+        report = Report(ex, rawdata)
+        range_vals = range(1, lenrange, 2)
+        report2 = report.select(range_vals, slice(1, None), [1])
+        self.assertTrue(np.may_share_memory(report2.values, report.values))
+        self.assertEqual(report2.range_vals, tuple(range_vals))
+        self.assertEqual(report2.experiment.calls, ex.calls[1:])
+        self.assertEqual(report2.rawdata, report.rawdata)
+        self.assertEqual(report2.data, dict(
+            (range_val, tuple(
+                ({"cycles": rep[1]},)
+                for rep in vals[range_val * nreps + 1:
+                                (range_val + 1) * nreps]
+            ))
+            for range_val in range_vals
+        ))
+
+        # pickling
+        self.assertEqual(pickle.loads(pickle.dumps(report2)).data,
+                         report2.data)
+
+        # representation
+        report3 = report.select(calls=[1])
+        self.assertEqual(eval(repr(report3)).data, report3.data)
+
+    def test_drop_reps(self):
+        """Test drop_reps()."""
+        ex, i = self.ex, self.i
+
+        lenrange = random.randint(2, 10)
+        nreps = random.randint(2, 10)
+        vals = [random.randint(1, 1000) for _ in range(lenrange * nreps)]
+
+        ex.call = Signature("name")()
+        ex.range = [i, range(lenrange)]
+        ex.nreps = nreps
+        rawdata = [[0]] + [[val] for val in vals] + [[1]]
+
+        report = Report(ex, rawdata)
+        ns = [random.randint(0, nreps) for _ in range(lenrange)]
+        report2 = report.drop_reps(ns)
+        self.assertTrue(np.may_share_memory(report2.values, report.values))
+        self.assertEqual(report2.data, dict(
+            (range_val, tuple(
+                ({"cycles": val},)
+                for val in vals[range_val * nreps + min(n, nreps - 1):
+                                (range_val + 1) * nreps]
+            ))
+            for range_val, n in enumerate(ns)
+        ))
+        self.assertEqual(report2.reps_dropped, dict(
+            (range_val, min(n, nreps - 1)) for range_val, n in enumerate(ns)
+        ))
+        self.assertEqual(eval(repr(report2)).data, report2.data)
+
+    def test_discard_warmup(self):
+        """Test discard_warmup()."""
+        ex, i = self.ex, self.i
+
+        lenrange = random.randint(2, 10)
+        nreps = random.randint(20, 50)
+        warmups = [random.randint(0, nreps // 4) for _ in range(lenrange)]
+        vals = [
+            [100 + 1000 * max(warmup - rep, 0) for rep in range(nreps)]
+            for warmup in warmups
+        ]
+
+        ex.calls = [Signature("name")(), Signature("name")()]
+        ex.range = [i, range(lenrange)]
+        ex.nreps = nreps
+        rawdata = [[0]] + [[val] for range_vals in vals
+                           for val in range_vals for _ in range(2)] + [[1]]
+
+        report = Report(ex, rawdata)
+        lengths = report.warmup_lengths(batchsize=1)
+        self.assertEqual(lengths.tolist(), [2 * [w] for w in warmups])
+
+        report2 = report.discard_warmup(batchsize=1)
+        self.assertIs(report.discard_warmup(batchsize=1), report2)
+        self.assertEqual(report2.reps_dropped, dict(enumerate(warmups)))
+        self.assertEqual(report2.data, dict(
+            (range_val, tuple(({"cycles": val}, {"cycles": val})
+                              for val in range_vals[warmup:]))
+            for range_val, (warmup, range_vals) in enumerate(zip(warmups,
+                                                                 vals))
+        ))
+
+
+    def test_filter_outliers(self):
+        """Test filter_outliers()."""
+        ex, i = self.ex, self.i
+
+        lenrange = random.randint(2, 10)
+        nreps = random.randint(10, 20)
+        vals = [[100 + rep % 3 for rep in range(nreps)]
+                for _ in range(lenrange)]
+        outliers = [random.sample(range(nreps), random.randint(0, nreps // 4))
+                    for _ in range(lenrange)]
+        for range_vals, range_outliers in zip(vals, outliers):
+            for rep in range_outliers:
+                range_vals[rep] = random.randint(10000, 20000)
+
+        ex.call = Signature("name")()
+        ex.range = [i, range(lenrange)]
+        ex.nreps = nreps
+        rawdata = [[0]] + [[val] for range_vals in vals
+                           for val in range_vals] + [[1]]
+
+        report = Report(ex, rawdata)
+        for method in ("iqr", "mad"):
+            report2 = report.filter_outliers(method)
+            self.assertIs(report.filter_outliers(method), report2)
+            self.assertTrue(np.may_share_memory(report2.values,
+                                                report.values))
+            self.assertEqual(report2.outliers_removed, dict(
+                (range_val, len(range_outliers))
+                for range_val, range_outliers in enumerate(outliers)
+            ))
+            self.assertEqual(report2.data, dict(
+                (range_val, tuple(
+                    ({"cycles": val},) for rep, val in enumerate(range_vals)
+                    if rep not in range_outliers
+                ))
+                for range_val, (range_vals, range_outliers)
+                in enumerate(zip(vals, outliers))
+            ))
+
+        # top percent
+        def metric(data, **kwargs):
+            return data.get("cycles")
+
+        report2 = report.filter_outliers("top", 10)
+        self.assertEqual(report2.outliers_removed,
+                         dict((range_val, nreps // 10)
+                              for range_val in range(lenrange)))
+        self.assertEqual(report2.evaluate(None, metric, "max"), dict(
+            (range_val, sorted(range_vals)[nreps - nreps // 10 - 1])
+            for range_val, range_vals in enumerate(vals)
+        ))
+
+        self.assertRaises(ValueError, report.filter_outliers, "unknown")
+
+
 if __name__ == "__main__":
     unittest.main()
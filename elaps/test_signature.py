@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 """Unittest for signature.py."""
 
+import pickle
 import unittest
 
 try:
@@ -184,6 +185,15 @@ class TestCall(unittest.TestCase):
         call.n = 1234
         self.assertEqual(call.flops(), 1234 ** 4)
 
+    def test_pickle(self):
+        """Test for pickling."""
+        sig = self.sig
+
+        call = pickle.loads(pickle.dumps(sig(1234, "X", 5), 2))
+        self.assertEqual(call, sig(1234, "X", 5))
+        self.assertEqual(call.flops(), 1234 ** 4)
+        self.assertEqual(call.sig.A.min(*call), 5 * 1234 + 5)
+
     def test_str(self):
         sig = self.sig
 
@@ -0,0 +1,67 @@
+#!/usr/bin/env python
+"""Unittest for sketch.py."""
+
+import random
+import unittest
+
+import numpy as np
+
+try:
+    import elaps
+except:
+    import os
+    import sys
+    sys.path.append(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    )
+
+from elaps.sketch import TDigest, Summary
+
+
+class TestTDigest(unittest.TestCase):
+
+    """Tests for TDigest."""
+
+    def test_quantile(self):
+        """Test for quantile()."""
+        values = np.random.lognormal(size=random.randint(1000, 10000))
+
+        digest = TDigest()
+        for chunk in np.array_split(values, random.randint(1, 100)):
+            digest.update(chunk)
+        digest.compress()
+        self.assertLessEqual(len(digest.means), digest.compression)
+        self.assertEqual(digest.weights.sum(), len(values))
+
+        qs = [.01, .05, .25, .5, .75, .95, .99]
+        ranks = [(values < value).mean() for value in digest.quantile(qs)]
+        for q, rank in zip(qs, ranks):
+            self.assertAlmostEqual(rank, q, delta=.01)
+        self.assertEqual(digest.quantile(0), values.min())
+        self.assertEqual(digest.quantile(1), values.max())
+
+    def test_empty(self):
+        """Test for an empty sketch."""
+        self.assertTrue(np.isnan(TDigest().quantile(.5)))
+
+
+class TestSummary(unittest.TestCase):
+
+    """Tests for Summary."""
+
+    def test_moments(self):
+        """Test for the running moments."""
+        values = np.random.normal(size=random.randint(1, 1000))
+
+        summary = Summary()
+        for chunk in np.array_split(values, random.randint(1, len(values))):
+            summary.update(chunk)
+        self.assertEqual(summary.count, len(values))
+        self.assertAlmostEqual(summary.mean, values.mean())
+        self.assertAlmostEqual(summary.std, values.std())
+        self.assertEqual(summary.min, values.min())
+        self.assertEqual(summary.max, values.max())
+
+
+if __name__ == "__main__":
+    unittest.main()
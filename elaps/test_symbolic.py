@@ -4,10 +4,13 @@
 from __future__ import division
 
 import __builtin__
+import pickle
 import random
 import math
 import unittest
 
+import numpy as np
+
 try:
     import elaps
 except:
@@ -43,6 +46,32 @@ class TestSymbolic(unittest.TestCase):
         self.assertNotEqual(id(A), id(Expression("A")))
         self.assertRaises(AttributeError, setattr, A, "a", 1)
 
+    def test_sweep(self):
+        """Test for dropping unreferenced interned Expressions."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        expr = Times(Plus(A, n1), B)
+        exprhash = hash(expr)
+        Expression.sweep()
+        self.assertIs(Times(Plus(A, n1), B), expr)
+        self.assertEqual(hash(expr), exprhash)
+        self.assertEqual(hash(expr), hash((Times, Plus(A, n1), B)))
+
+        del expr
+        simplify_cache.clear()
+        substitute_cache.clear()
+        Expression.sweep()
+        self.assertNotIn((Plus, A, n1), Expression.interned)
+        self.assertIn((Symbol, "A"), Expression.interned)
+
+    def test_pickle(self):
+        """Test for pickling (preserving interning)."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        expr = Plus(Times(n1, A), Min(B, n2), Sum(C, C=Range((1, 1, A))))
+        self.assertIs(pickle.loads(pickle.dumps(A, 2)), A)
+        self.assertIs(pickle.loads(pickle.dumps(expr, 2)), expr)
+
 
 class TestSymbol(TestSymbolic):
 
@@ -455,6 +484,15 @@ class TestSum(TestSymbolic):
 
         self.assertEquals(Sum(n1, A=range(n2))(), n1 * n2)
 
+        # closed form
+        range_ = Range("%d:%d,%d:-3:%d" % (n1, n2, n3, -n1))
+        for expr in [A, A ** 3 - n1 * A, (A + B) ** 2 * C, (A - n2) / B]:
+            self.assertAlmostEqual(Sum(expr, A=range_)(B=n1, C=n2),
+                                   sum(expr(A=val, B=n1, C=n2)
+                                       for val in range_))
+        self.assertEqual(Sum(A ** 2, A=Range("1:1000000"))(),
+                         333333833333500000)
+
     def test_str(self):
         """Test for __str__()."""
         A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
@@ -502,6 +540,7 @@ class TestProd(TestSymbolic):
         self.assertEqual(Prod(A, B=range(n1))(), (A ** n1)())
         self.assertEqual(Prod(A * B, A=range(n1))(),
                          Times(*(A * B for A in range(n1)))())
+        self.assertEqual(Prod(n1, A=Range((1, 1, n2)))(), n1 ** n2)
 
     def test_str(self):
         """Test for __str__()."""
@@ -511,6 +550,116 @@ class TestProd(TestSymbolic):
                          "prod(A + B, A=(0, 1, 2))")
 
 
+class TestCompile(TestSymbolic):
+
+    """Tests for Expression.compile()."""
+
+    def test_compile(self):
+        """Test for compile()."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        exprs = [
+            A * B + n3, A / n3 - B, A ** 2, A ** -2, abs(B - A),
+            floor(A / n3), ceil(A / n3), min(A, B, n3), max(A, 2 * B),
+            log(A), log(A, 2), Sum(A * C, C=Range("1:5")),
+            Prod(C + B, C=range(3)), Sum(C, C=Range((1, 1, A)))
+        ]
+        for expr in exprs:
+            self.assertEqual(expr.compile("AB")(n1, n2), expr(A=n1, B=n2))
+
+        function = (A * B).compile([B, A])
+        hits = compile_cache.info().hits
+        self.assertIs((A * B).compile("BA"), function)
+        self.assertEqual(compile_cache.info().hits, hits + 1)
+        self.assertEqual(function(n1, n2), n1 * n2)
+
+        self.assertRaises(NameError, (A + C).compile, "AB")
+
+    def test_vectorized(self):
+        """Test for compile(vectorized=True)."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        a = np.array([n1, n2, n3])
+        b = np.array([n3, n1, n2])
+        exprs = [
+            A * B + n3, A / n3 - B, A ** -2, floor(A / n3), min(A, B, n3),
+            log(A, 2), Sum(A * C, C=Range("1:5")), Sum(C, C=Range((1, 1, A)))
+        ]
+        for expr in exprs:
+            values = expr.compile("AB", vectorized=True)(a, b)
+            self.assertEqual(values.tolist(),
+                             [expr(A=a_, B=b_) for a_, b_ in zip(a, b)])
+
+
+class TestBounds(TestSymbolic):
+
+    """Tests for bounds()."""
+
+    def test_bounds(self):
+        """Test for bounds()."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        exprs = [
+            A * B - n3 * A, (A - n2) ** 2, (A - n2) ** 3, A ** -2,
+            A / (B + 1), floor(A / n3), ceil(A / n3), min(A, B), max(A, 2 * B),
+            log(A, 2), abs(A - n2), Sum(A * C, C=Range("1:5")),
+            Prod(B, C=range(3)), Sum(C, C=Range((1, 1, n1)))
+        ]
+        for expr in exprs:
+            lo, hi = bounds(expr, A=(1, 20), B=(n1, n1 + 5))
+            values = [expr(A=a, B=b) for a in range(1, 21)
+                      for b in range(n1, n1 + 6)]
+            self.assertLessEqual(lo, __builtin__.min(values))
+            self.assertGreaterEqual(hi, __builtin__.max(values))
+
+        self.assertEqual(bounds(A * B + n1, A=(1, n2), B=n3),
+                         (n3 + n1, n2 * n3 + n1))
+        self.assertEqual(bounds((A - n2) ** 2, A=(0, 2 * n2)), (0, n2 ** 2))
+        self.assertEqual(bounds(1 / A, A=(-1, 1)),
+                         (-float("inf"), float("inf")))
+        self.assertEqual(bounds(A + B, A=n1), None)
+
+        # float steps
+        lo, hi = bounds(Sum(C, C=Range((0, .1, 1))))
+        self.assertLessEqual(lo, 0)
+        self.assertGreaterEqual(hi, sum(Range((0, .1, 1))))
+
+
+class TestSimplifyCache(TestSymbolic):
+
+    """Tests for the memoization of simplify()."""
+
+    def test_simplify(self):
+        """Test for cached simplify()."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        result = simplify(n1 * B + n1 * n2)
+        simplify_cache.clear()
+        expr = Times(A + B, n1)
+        self.assertEqual(simplify(expr, A=n2), result)
+        info = simplify_cache.info()
+        self.assertEqual(info.currsize, info.misses)
+
+        self.assertEqual(simplify(expr, A=n2), result)
+        self.assertEqual(simplify_cache.info().hits, info.hits + 1)
+        self.assertEqual(simplify_cache.info().misses, info.misses)
+
+        self.assertIsInstance(simplify(expr, A=1.0, B=1), float)
+        self.assertIsInstance(simplify(expr, A=1, B=1), int)
+
+        self.assertEqual(simplify(A, A=[n1]), [n1])
+
+    def test_lru(self):
+        """Test for LRUCache."""
+        cache = LRUCache(2)
+        self.assertEqual(cache.lookup(1, str, 1), "1")
+        self.assertEqual(cache.lookup(2, str, 2), "2")
+        self.assertEqual(cache.lookup(1, str, 0), "1")
+        self.assertEqual(cache.lookup(3, str, 3), "3")
+        self.assertEqual(cache.lookup(2, str, 0), "0")
+        self.assertEqual(cache.info(), CacheInfo(1, 4, 2, 2))
+
+
 class TestRange(TestSymbolic):
 
     """Tests for Range."""
@@ -575,6 +724,79 @@ class TestRange(TestSymbolic):
         self.assertEqual(list(Range("1:10,20:-2:0")),
                          range(1, 11) + range(20, -1, -2))
 
+    def test_powersum(self):
+        """Test for powersum()."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        self.assertRaises(TypeError, Range((A, n2, n3)).powersum, 1)
+
+        range_ = Range("1:%d,%d:-%d:%d" % (n1, n2, n3, -n1))
+        for power in range(5):
+            self.assertEqual(range_.powersum(power),
+                             sum(val ** power for val in range_))
+
+        # float steps
+        range_ = Range((0, .1, 1))
+        for power in range(5):
+            self.assertAlmostEqual(range_.powersum(power),
+                                   sum(val ** power for val in range_))
+        j = Symbol("j")
+        self.assertAlmostEqual(simplify(Sum(j * j, j=range_)),
+                               sum(val * val for val in range_))
+
+    def test_numeric(self):
+        """Test for cached symbols and numeric status."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        range_ = Range((A, n2, B * n3))
+        self.assertEqual(range_.symbols, set([A, B]))
+        self.assertFalse(range_.numeric)
+        self.assertRaises(TypeError, range_.to_array)
+        self.assertRaises(TypeError, range_.index, n1)
+        self.assertTrue(range_(A=n1, B=n2).numeric)
+
+    def test_to_array(self):
+        """Test for to_array()."""
+        range_ = Range("1:10,20:-2:0,0.5:0.25:1.5")
+        array = range_.to_array()
+        self.assertEqual(array.tolist(), list(range_))
+        self.assertIs(range_.to_array(), array)
+        self.assertFalse(array.flags.writeable)
+
+    def test_contains(self):
+        """Test for in and index()."""
+        range_ = Range("1:10,20:-2:0")
+
+        self.assertIn(4, range_)
+        self.assertIn(20, range_)
+        self.assertNotIn(11, range_)
+        self.assertNotIn(5.5, range_)
+        self.assertEqual(range_.index(1), 0)
+        self.assertEqual(range_.index(20), 10)
+        self.assertEqual(range_.index(2), 1)
+        self.assertRaises(ValueError, range_.index, 11)
+        self.assertEqual(range_.index(2.0), 1)
+
+        # huge ranges are not materialized
+        range_ = Range((0, 3, 10 ** 12), (5, 5, 5))
+        self.assertIn(3 * 10 ** 11, range_)
+        self.assertNotIn(10 ** 12 - 2, range_)
+        self.assertEqual(range_.index(3 * 10 ** 11), 10 ** 11)
+        self.assertEqual(range_.index(5), 10 ** 12 // 3 + 1)
+        self.assertRaises(ValueError, range_.index, 1)
+
+        range_ = Range("0:0.5:2")
+        self.assertIn(1.5, range_)
+        self.assertEqual(range_.index(1.5), 3)
+        self.assertNotIn(1.25, range_)
+
+    def test_pickle(self):
+        """Test for pickling."""
+        A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3
+
+        range_ = Range((n1, 1, n2), (n3, 1, n3))
+        self.assertEqual(pickle.loads(pickle.dumps(range_, 2)), range_)
+
     def test_len(self):
         """Test for len(R)."""
         A, B, C, n1, n2, n3 = self.A, self.B, self.C, self.n1, self.n2, self.n3